@@ -0,0 +1,24 @@
+"""Headless rendering example.
+
+This example renders a scene offscreen, without any window, and saves the
+image as a PNG file. It requires an EGL or OSMesa driver.
+
+"""
+import os
+# the OpenGL platform must be set before importing galry
+os.environ.setdefault('PYOPENGL_PLATFORM', 'osmesa')
+import numpy as np
+from galry import *
+from matplotlib.pyplot import imsave
+
+# create the scene
+scene = SceneCreator()
+x = np.linspace(-.9, .9, 1000)
+y = .5 * np.sin(20 * x) * np.exp(-x ** 2 * 4)
+scene.add_visual(PlotVisual, x=x, y=y, color=(1., 1., 1., 1.))
+
+# render the scene in a 400x300 RGBA array
+image = render_to_array(scene.get_scene(), size=(400, 300))
+
+# save the image
+imsave('offscreen.png', image)
@@ -0,0 +1,30 @@
+"""Highlight the point under the cursor in a large scatter plot."""
+
+from galry import *
+from numpy.random import *
+
+# We generate 1,000,000 points randomly according to a standard normal random
+# variable.
+x, y = randn(2, 1000000)
+plot(x, y, ',', color=(1., 1., 1., .25), name='points')
+
+# This marker highlights the picked point. It is not pickable itself.
+plot([0.], [0.], 'o', ms=10, color='r', name='picked', visible=False,
+    pickable=False)
+
+def hover(figure, parameter):
+    picking = figure.get_processor('picking')
+    # The spatial index of the points is built at the first call, and
+    # then each query only looks at the points around the cursor.
+    picked = picking.pick(*parameter['mouse_position'], visuals=['points'])
+    if picked is None:
+        figure.set_data(visual='picked', visible=False)
+    else:
+        name, index = picked
+        figure.set_data(visual='picked', visible=True,
+            position=np.array([picking.get_position(name, index)]))
+
+# Moving the mouse without pressing any button.
+action('Move', hover)
+
+show()
@@ -16,7 +16,7 @@ plot(x, y1, 'oy')
 
 # sine thick wave
 y2 = sin(10 * x)
-plot(x, y2, thickness=.01, color='r.5')
+plot(x, y2, thickness=3, color='r.5')
 
 # static text
 text("Hello World!", coordinates=(0, .9), is_static=True)
@@ -10,6 +10,7 @@ from galry import *
 # initial values
 t = np.linspace(-1., 1., 1000)
 x = .1 * np.random.randn(1000)
+dt = t[1] - t[0]
 
 # this function returns 10 new values at each call
 def get_new_data():
@@ -17,18 +18,19 @@ def get_new_data():
 
 # this function updates the plot at each call
 def anim(fig, _):
-    # append new data to the signal
-    global x
-    x = np.hstack((x[10:], get_new_data()))
+    # time of the new samples
+    global t
+    t = t[-1] + dt * np.arange(1, 11)
     
-    # create the new 1000x2 position array with x, y values at each row
-    position = np.vstack((t, x)).T
+    # append the 10 new (t, x) values to the signal: only these values are
+    # uploaded on the GPU, the oldest ones are discarded
+    fig.append(position=np.vstack((t, get_new_data())).T)
     
-    # update the position of the plot
-    fig.set_data(position=position)
+    # follow the signal
+    fig.process_interaction('SetPosition', (t[-1] - 1., 0.))
 
-# plot the signal
-plot(t, x)
+# plot the signal, using a circular buffer
+plot(t, x, streaming=True)
 
 # animate the plot: anim is called every 25 milliseconds
 animate(anim, dt=.025)
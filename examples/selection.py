@@ -0,0 +1,25 @@
+"""Select points in a large scatter plot with a box or a lasso.
+
+Press SHIFT and drag with the left button to select the points in a box, or
+press ALT and drag with the left button to draw a lasso.
+
+"""
+
+from galry import *
+from numpy.random import *
+
+# We generate 1,000,000 points randomly according to a standard normal random
+# variable.
+x, y = randn(2, 1000000)
+
+# The selected points are displayed in red.
+plot(x, y, ',', color=(1., 1., 1., .25), selection_color='r', name='points')
+
+def show_selection(figure, parameter):
+    selection = figure.get_processor('selection')
+    print "%d points selected" % len(selection.get_selection('points'))
+
+# Print the number of selected points when a key is pressed.
+action('KeyPress', show_selection, key='S')
+
+show()
@@ -4,6 +4,6 @@ from numpy import *
 n = 10000
 x = linspace(-1., 1., n)
 
-plot(x, np.sin(10*x), thickness=.02)
+plot(x, np.sin(10*x), thickness=4)
 
 show()
@@ -13,6 +13,10 @@ from cursors import *
 from icons import *
 from tools import *
 from datanormalizer import *
+from datadecimator import *
+from datasource import *
+from imagepyramid import *
+from pointindex import *
 from useractions import *
 from visuals import *
 from processors import *
@@ -20,6 +24,7 @@ from interactionmanager import *
 from bindingmanager import *
 from scene import *
 from glrenderer import *
+from offscreen import *
 from paintmanager import *
 from managers import *
 from galrywidget import *
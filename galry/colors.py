@@ -1,7 +1,8 @@
 import re
 import numpy as np
+from galry.tools import hsv_to_rgb
 
-__all__ = ['get_color', 'get_next_color']
+__all__ = ['get_color', 'get_next_color', 'get_colormap']
 
 HEX = '0123456789abcdef'
 HEX2 = dict((a+b, (HEX.index(a)*16 + HEX.index(b)) / 255.) \
@@ -97,3 +98,45 @@ if __name__ == '__main__':
     
    
 
+
+
+# Colormaps
+# ---------
+# Control points (value, (r, g, b)), linearly interpolated. The 'rainbow'
+# colormap is a gradient in the HSV space.
+COLORMAPS = {
+    'gray': [(0., (0., 0., 0.)), (1., (1., 1., 1.))],
+    'hot': [(0., (0., 0., 0.)), (.375, (1., 0., 0.)), (.75, (1., 1., 0.)),
+            (1., (1., 1., 1.))],
+    'cool': [(0., (0., 1., 1.)), (1., (1., 0., 1.))],
+    'jet': [(0., (0., 0., .5)), (.125, (0., 0., 1.)), (.375, (0., 1., 1.)),
+            (.625, (1., 1., 0.)), (.875, (1., 0., 0.)), (1., (.5, 0., 0.))],
+}
+# Initial and final HSV colors of the 'rainbow' colormap.
+RAINBOW = (np.array([.67, .91, .65]), np.array([0., 1., 1.]))
+
+def get_colormap(name='rainbow', n=256):
+    """Return a colormap as a lookup table.
+    
+    Arguments:
+      * name='rainbow': the name of the colormap, 'rainbow' or one of the
+        keys of `COLORMAPS`.
+      * n=256: the number of colors.
+      
+    Returns:
+      * colormap: a `(1, n, 3)` array with RGB components in [0, 1], which
+        can be used as a 1D texture.
+      
+    """
+    x = np.linspace(0., 1., n).reshape((-1, 1))
+    if name == 'rainbow':
+        col0, col1 = RAINBOW
+        return hsv_to_rgb((col0 + (col1 - col0) * x).reshape((1, n, 3)))
+    if name not in COLORMAPS:
+        raise ValueError("Unknown colormap '%s'." % name)
+    values = [value for value, _ in COLORMAPS[name]]
+    colors = np.array([color for _, color in COLORMAPS[name]])
+    colormap = np.empty((1, n, 3))
+    for i in xrange(3):
+        colormap[0,:,i] = np.interp(x.ravel(), values, colors[:,i])
+    return colormap
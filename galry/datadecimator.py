@@ -0,0 +1,126 @@
+import numpy as np
+
+__all__ = ['DataDecimator']
+
+class DataDecimator(object):
+    """Level-of-detail min/max decimation of time series.
+
+    A multi-resolution pyramid is built for every row (i.e. every plot): the
+    level k contains the minimum and maximum of consecutive blocks of 2^k
+    samples. For a given x range, the envelope of the visible samples is
+    then obtained with at most `2 * ncolumns` points per row, independently
+    of the number of samples in the signal.
+
+    The x values of every row are assumed to be sorted in increasing order.
+
+    """
+    def __init__(self, x, y, ncolumns=2048):
+        """Build the pyramid.
+
+        Arguments:
+          * x, y: 2D arrays with one plot per row, as returned by
+            `process_coordinates`.
+          * ncolumns=2048: the maximum number of columns in an envelope. The
+            envelope always contains `2 * ncolumns` points per row, so that
+            its size does not depend on the visible range.
+
+        """
+        self.x = np.asarray(x, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        if self.x.ndim == 1:
+            self.x = self.x.reshape((1, -1))
+            self.y = self.y.reshape((1, -1))
+        self.nrows, self.nsamples = self.y.shape
+        self.ncolumns = ncolumns
+        self.build()
+
+    def build(self):
+        """Compute the min/max pyramid."""
+        # level 0 contains the samples themselves
+        self.levels = [(self.y, self.y)]
+        ymin, ymax = self.y, self.y
+        while ymin.shape[1] > self.ncolumns:
+            # pad to an even number of blocks by repeating the last one
+            if ymin.shape[1] % 2:
+                ymin = np.hstack((ymin, ymin[:, -1:]))
+                ymax = np.hstack((ymax, ymax[:, -1:]))
+            ymin = np.minimum(ymin[:, ::2], ymin[:, 1::2])
+            ymax = np.maximum(ymax[:, ::2], ymax[:, 1::2])
+            self.levels.append((ymin, ymax))
+
+    def get_size(self):
+        """Return the number of points in an envelope."""
+        return self.nrows * 2 * self.ncolumns
+
+    def get_row_envelope(self, row, x0=None, x1=None, ncolumns=None):
+        """Return the envelope of a row between x0 and x1, as a
+        `(2 * self.ncolumns, 2)` array."""
+        if ncolumns is None:
+            ncolumns = self.ncolumns
+        ncolumns = max(1, min(ncolumns, self.ncolumns))
+        size = 2 * self.ncolumns
+        x = self.x[row]
+        n = self.nsamples
+
+        # visible samples, including one sample on each side so that lines
+        # cross the borders of the view
+        i0 = 0 if x0 is None else np.searchsorted(x, x0, side='right') - 1
+        i1 = n if x1 is None else np.searchsorted(x, x1, side='left') + 1
+        i0, i1 = max(0, i0), min(n, i1)
+        if i1 - i0 < 1:
+            i0, i1 = max(0, min(i0, n - 1)), max(1, min(i0 + 1, n))
+
+        envelope = np.empty((size, 2), dtype=np.float32)
+
+        # few samples: no need to decimate
+        if i1 - i0 <= size:
+            k = i1 - i0
+            envelope[:k, 0] = x[i0:i1]
+            envelope[:k, 1] = self.y[row, i0:i1]
+            # pad by repeating the last point (degenerate segments)
+            envelope[k:] = envelope[k - 1]
+            return envelope
+
+        # find the deepest level with at least ncolumns blocks
+        level = 0
+        while ((level + 1 < len(self.levels)) and
+               ((i1 - i0) >> (level + 1)) >= ncolumns):
+            level += 1
+        ymin, ymax = self.levels[level]
+        b0, b1 = i0 >> level, min(((i1 - 1) >> level) + 1, ymin.shape[1])
+
+        # group the blocks into ncolumns columns
+        edges = np.linspace(0, b1 - b0, ncolumns + 1).astype(np.int64)
+        starts = edges[:-1]
+        cmin = np.minimum.reduceat(ymin[row, b0:b1], starts)
+        cmax = np.maximum.reduceat(ymax[row, b0:b1], starts)
+
+        # x coordinates of the first and last sample in each column
+        xa = x[np.clip((b0 + starts) << level, 0, n - 1)]
+        xb = x[np.clip(((b0 + edges[1:]) << level) - 1, 0, n - 1)]
+
+        k = 2 * ncolumns
+        envelope[:k:2, 0] = xa
+        envelope[:k:2, 1] = cmin
+        envelope[1:k:2, 0] = xb
+        envelope[1:k:2, 1] = cmax
+        envelope[k:] = envelope[k - 1]
+        return envelope
+
+    def get_envelope(self, x0=None, x1=None, ncolumns=None):
+        """Return the envelope of all rows between x0 and x1.
+
+        Arguments:
+          * x0, x1: the x range, in the coordinate system of the data. None
+            means no bound.
+          * ncolumns=None: the number of columns, typically the width of the
+            window in pixels. It is capped to `self.ncolumns`.
+
+        Returns:
+          * position: a `(self.get_size(), 2)` array with the envelopes of
+            all rows, one after the other.
+
+        """
+        return np.vstack([self.get_row_envelope(row, x0, x1, ncolumns)
+            for row in xrange(self.nrows)])
+
@@ -0,0 +1,129 @@
+import numpy as np
+
+__all__ = ['DataSource', 'PositionSource', 'NormalizedSource', 'is_lazy',
+           'LOAD_CHUNK_SIZE']
+
+# Number of rows converted and uploaded at once when loading a lazy or
+# memory-mapped attribute.
+LOAD_CHUNK_SIZE = 1 << 20
+
+def is_lazy(data):
+    """Return whether data should be read by chunks instead of being
+    converted at once, i.e. whether it is a memory-mapped array or a
+    lazy source."""
+    return isinstance(data, (np.memmap, DataSource))
+
+class DataSource(object):
+    """Lazy source of attribute data.
+
+    It wraps an array, typically a `np.memmap` of a file larger than the
+    memory, and behaves like a read-only `(size, ndim)` float32 array: only
+    the rows which are accessed are read and converted to float32. The
+    array is never copied as a whole.
+
+    """
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, data):
+        """Wrap an array of shape `(size,)` or `(size, ndim)`."""
+        self.data = data
+        self.shape = data.shape
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def get_rows(self, onset, offset):
+        """Return the rows `[onset, offset)` as a float32 array."""
+        return np.array(self.data[onset:offset], dtype=np.float32)
+
+    def get_bounds(self):
+        """Return the minimum and the maximum of every column, as two
+        arrays. The rows are read by chunks."""
+        mins, maxs = [], []
+        for onset in xrange(0, len(self), LOAD_CHUNK_SIZE):
+            rows = self.get_rows(onset, min(onset + LOAD_CHUNK_SIZE,
+                len(self)))
+            rows = rows.reshape((rows.shape[0], -1))
+            mins.append(rows.min(axis=0))
+            maxs.append(rows.max(axis=0))
+        return np.min(mins, axis=0), np.max(maxs, axis=0)
+
+    def __getitem__(self, key):
+        # the rows are read first, then the other indices are applied
+        if isinstance(key, tuple):
+            rows = self[key[0]]
+            if isinstance(key[0], slice):
+                return rows[(slice(None),) + key[1:]]
+            return rows[key[1:]]
+        if isinstance(key, slice):
+            onset, offset, step = key.indices(len(self))
+            if step == 1:
+                return self.get_rows(onset, max(onset, offset))
+            # rare case, all rows are read
+            return np.asarray(self)[key]
+        return self.get_rows(key, key + 1)[0]
+
+    def __array__(self, dtype=None):
+        # explicit conversion, e.g. for serialization: the full array is
+        # loaded in memory
+        return np.asarray(self.get_rows(0, len(self)), dtype=dtype)
+
+class PositionSource(DataSource):
+    """Lazy `(size, 2)` position array of plots, built from x and y arrays
+    of shape `(nplots, nsamples)` (the arrays returned by
+    `process_coordinates`). x can be None, in which case the samples are
+    regularly spaced in [0, 1]."""
+    def __init__(self, x, y):
+        if not is_lazy(y):
+            y = np.asarray(y)
+        if x is not None and not is_lazy(x):
+            x = np.asarray(x)
+        if y.ndim == 1:
+            y = y.reshape((1, -1))
+        if x is not None:
+            if x.ndim == 1:
+                x = x.reshape((1, -1))
+            assert x.shape == y.shape
+            x = x.reshape(-1)
+        self.nplots, self.nsamples = y.shape
+        self.x = x
+        self.y = y.reshape(-1)
+        self.shape = (self.y.shape[0], 2)
+
+    def get_rows(self, onset, offset):
+        rows = np.empty((offset - onset, 2), dtype=np.float32)
+        if self.x is None:
+            # implicit x coordinates, computed from the sample index
+            samples = np.arange(onset, offset) % self.nsamples
+            rows[:, 0] = samples / float(max(self.nsamples - 1, 1))
+        else:
+            rows[:, 0] = self.x[onset:offset]
+        rows[:, 1] = self.y[onset:offset]
+        return rows
+
+class NormalizedSource(DataSource):
+    """Lazy `(size, 2)` position array normalized with a `DataNormalizer`
+    when its rows are read, so that the source is not copied to be
+    normalized."""
+    def __init__(self, source, normalizer):
+        self.source = source
+        self.normalizer = normalizer
+        self.shape = source.shape
+
+    def get_rows(self, onset, offset):
+        rows = self.source.get_rows(onset, offset)
+        rows[:, 0] = self.normalizer.normalize_x(rows[:, 0])
+        rows[:, 1] = self.normalizer.normalize_y(rows[:, 1])
+        return rows
@@ -57,6 +57,10 @@ DEFAULT_AUTODESTRUCT = 1000
 # Display the FPS or not.
 DISPLAY_FPS = DEBUG == True
 
+# Maximum number of frames per second when the view is updated after user
+# actions. The updates requested in between are coalesced. None for no limit.
+MAX_FPS = 60
+
 # Default manager classes.
 DEFAULT_MANAGERS = dict(
     paint_manager=PaintManager,
@@ -105,7 +109,13 @@ class GalryWidget(QGLWidget):
         # FPS counter, used for debugging
         self.fps_counter = FpsCounter()
         self.display_fps = DISPLAY_FPS
+        # frame rate limit and time of the last rendering
+        self.max_fps = MAX_FPS
+        self.last_paint = 0.
+        self.update_pending = False
         self.activate3D = None
+        # profiling of the rendering
+        self.profile = False
 
         # widget creation parameters
         self.bindings = None
@@ -150,6 +160,7 @@ class GalryWidget(QGLWidget):
         self.paint_manager.set_rendering_options(
                         activate3D=self.activate3D,
                         constrain_ratio=self.constrain_ratio,
+                        profile=self.profile,
                         )
         
         self.autosave = autosave
@@ -270,6 +281,7 @@ class GalryWidget(QGLWidget):
         This method calls the `paint_all` method of the PaintManager.
         
         """
+        self.last_paint = timeit.default_timer()
         if self.just_initialized:
             self.process_interaction('Initialize', do_update=False)
         # paint fps
@@ -292,6 +304,12 @@ class GalryWidget(QGLWidget):
         """Display the FPS on the top-left of the screen."""
         self.paint_manager.update_fps(int(self.fps_counter.get_fps()))
         
+    def get_profile_stats(self):
+        """Return the rendering profiling statistics, when the widget has
+        been created with `profile=True`. See `GLRenderer.get_profile_stats`.
+        """
+        return self.paint_manager.get_profile_stats()
+        
     def resizeGL(self, width, height):
         self.w, self.h = width, height
         self.paint_manager.resizeGL(width, height)
@@ -582,7 +600,40 @@ class GalryWidget(QGLWidget):
                 (event is not None or prev_event is not None))
                 
         if do_update:
+            self.update_view()
+            
+    def update_view(self, force=False):
+        """Paint the view again if the scene has changed.
+        
+        The view is painted at most `max_fps` times per second: the updates
+        requested before the next frame are coalesced into a single
+        rendering.
+        
+        Arguments:
+          * force=False: whether to paint the view even if nothing has
+            changed in the scene.
+        
+        """
+        if not force and not self.paint_manager.is_dirty():
+            return
+        # a rendering is already scheduled
+        if self.update_pending:
+            return
+        delay = 0.
+        if self.max_fps:
+            delay = (self.last_paint + 1. / self.max_fps -
+                timeit.default_timer())
+        if delay <= 0:
             self.updateGL()
+        else:
+            self.update_pending = True
+            QtCore.QTimer.singleShot(int(np.ceil(delay * 1000)),
+                self.update_delayed)
+            
+    def update_delayed(self):
+        """Paint the view after a delay, see `update_view`."""
+        self.update_pending = False
+        self.updateGL()
 
             
     # Miscellaneous
@@ -686,7 +737,9 @@ def create_custom_widget(bindings=None,
                          show_grid=False,
                          display_fps=False,
                          activate3D=False,
+                         profile=False,
                          animation_interval=None,
+                         max_fps=MAX_FPS,
                          momentum=False,
                          autosave=None,
                          getfocus=True,
@@ -703,9 +756,16 @@ def create_custom_widget(bindings=None,
         than [-1,1]^2 by default (but it can be customized in 
         interactionmanager.MAX_VIEWBOX).
       * display_fps=False: whether to display the FPS.
+      * profile=False: whether to profile the rendering (CPU time of each
+        step and GPU time of each visual). The statistics are returned by
+        `get_profile_stats()`, and displayed below the FPS if
+        `display_fps` is True.
       * animation_interval=None: if not None, a special widget with automatic
         timer update is created. This variable then refers to the time interval
         between two successive updates (in seconds).
+      * max_fps=60: the maximum number of frames per second when the view is
+        updated after user actions or animation steps, or None for no limit.
+        The view is only painted again when the scene has changed.
       * **companion_classes: keyword arguments with the companion classes.
     
     """
@@ -751,6 +811,8 @@ def create_custom_widget(bindings=None,
             self.activate3D = activate3D
             self.momentum = momentum
             self.display_fps = display_fps
+            self.profile = profile
+            self.max_fps = max_fps
             self.initialize_companion_classes()
             if animation_interval is not None:
                 self.initialize_timer(dt=animation_interval)
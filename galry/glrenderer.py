@@ -11,10 +11,13 @@ except:
             return self.mock
     gl = _gl()
 from collections import OrderedDict
+import ctypes
+import hashlib
+import os
 import numpy as np
 import sys
 from galry import enforce_dtype, DataNormalizer, log_info, log_debug, \
-    log_warn, RefVar
+    log_warn, RefVar, FrameProfiler, DataSource, LOAD_CHUNK_SIZE
 
     
 __all__ = ['GLVersion', 'GLRenderer']
@@ -57,6 +60,51 @@ class GLVersion(object):
         else:
             return ''
     
+    @staticmethod
+    def get_current_context():
+        """Return an identifier of the current OpenGL context, or None if
+        it cannot be obtained."""
+        try:
+            from OpenGL import platform
+            context = platform.GetCurrentContext()
+        except Exception:
+            return None
+        return getattr(context, 'value', context)
+        
+    @staticmethod
+    def get_integer(name):
+        """Return the value of an integer GL parameter, or None if it is not
+        supported by the driver."""
+        try:
+            value = gl.glGetIntegerv(name)
+            if value is None:
+                return None
+            return int(np.ravel(value)[0])
+        except Exception:
+            return None
+        
+    @staticmethod
+    def get_max_elements_vertices():
+        """Return the recommended maximum number of vertices in a draw
+        call."""
+        return GLVersion.get_integer(gl.GL_MAX_ELEMENTS_VERTICES)
+        
+    @staticmethod
+    def get_free_memory():
+        """Return the available video memory in bytes, or None if the
+        driver does not expose it (NVX_gpu_memory_info and ATI_meminfo
+        extensions)."""
+        # GL_GPU_MEMORY_INFO_CURRENT_AVAILABLE_VIDMEM_NVX, GL_VBO_FREE_MEMORY_ATI
+        for name in (0x9049, 0x87FB):
+            # clear previous errors
+            while gl.glGetError():
+                pass
+            value = GLVersion.get_integer(name)
+            if value:
+                # value in KB
+                return value * 1024
+        return None
+    
     
 # Low-level OpenGL functions to initialize/load variables
 # -------------------------------------------------------
@@ -83,17 +131,27 @@ class Attribute(object):
             gl.glEnableVertexAttribArray(location)
         
     @staticmethod
-    def set_attribute(location, ndim):
-        """Specify the type of the attribute before rendering."""
-        gl.glVertexAttribPointer(location, ndim, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
+    def set_attribute(location, ndim, offset=0):
+        """Specify the type of the attribute before rendering. The
+        attribute can start at a given offset (in bytes) in the buffer."""
+        pointer = ctypes.c_void_p(offset) if offset else None
+        gl.glVertexAttribPointer(location, ndim, gl.GL_FLOAT, gl.GL_FALSE, 0,
+            pointer)
+    
+    @staticmethod
+    def set_divisor(location, divisor):
+        """Set the number of instances sharing the same value of an
+        attribute, 0 for a per-vertex attribute."""
+        Instancing.get_function('glVertexAttribDivisor')(location, divisor)
     
     @staticmethod
     def convert_data(data, index=False):
-        """Force 32-bit floating point numbers for data."""
+        """Force 32-bit floating point numbers for data, and unsigned 32-bit
+        integers for indices."""
         if not index:
             return enforce_dtype(data, np.float32)
         else:
-            return np.array(data, np.int32)
+            return np.asarray(data, dtype=np.uint32)
         
     
     @staticmethod
@@ -104,6 +162,13 @@ class Attribute(object):
         gltype = Attribute.get_gltype(index)
         gl.glBufferData(gltype, data, gl.GL_DYNAMIC_DRAW)
         
+    @staticmethod
+    def allocate(nbytes, index=False):
+        """Allocate uninitialized memory in the buffer, which must have been
+        bound before."""
+        gltype = Attribute.get_gltype(index)
+        gl.glBufferData(gltype, int(nbytes), None, gl.GL_DYNAMIC_DRAW)
+        
     @staticmethod
     def update(data, onset=0, index=False):
         """Update data in the currently bound buffer."""
@@ -130,6 +195,20 @@ class Uniform(object):
     array_suffix = {True: 'v', False: ''}
     # glUniform[Matrix]D[f][v]
     
+    # GL functions, by name
+    functions = {}
+    
+    @staticmethod
+    def get_function(template, *args):
+        """Return a glUniform* function from its name template and its
+        arguments. The name is only built the first time."""
+        key = (template,) + args
+        function = Uniform.functions.get(key, None)
+        if function is None:
+            function = getattr(gl, template % args)
+            Uniform.functions[key] = function
+        return function
+    
     @staticmethod
     def convert_data(data):
         if isinstance(data, np.ndarray):
@@ -148,8 +227,8 @@ class Uniform(object):
     def load_scalar(location, data):
         data = Uniform.convert_data(data)
         is_float = (type(data) == float) or (type(data) == np.float32)
-        funname = 'glUniform1%s' % Uniform.float_suffix[is_float]
-        getattr(gl, funname)(location, data)
+        Uniform.get_function('glUniform1%s',
+            Uniform.float_suffix[is_float])(location, data)
 
     @staticmethod
     def load_vector(location, data):
@@ -157,16 +236,16 @@ class Uniform(object):
             data = Uniform.convert_data(data)
             is_float = (type(data[0]) == float) or (type(data[0]) == np.float32)
             ndim = len(data)
-            funname = 'glUniform%d%s' % (ndim, Uniform.float_suffix[is_float])
-            getattr(gl, funname)(location, *data)
+            Uniform.get_function('glUniform%d%s', ndim,
+                Uniform.float_suffix[is_float])(location, *data)
     
     @staticmethod
     def load_array(location, data):
         data = Uniform.convert_data(data)
         is_float = (data.dtype == np.float32)
         size, ndim = data.shape
-        funname = 'glUniform%d%sv' % (ndim, Uniform.float_suffix[is_float])
-        getattr(gl, funname)(location, size, data)
+        Uniform.get_function('glUniform%d%sv', ndim,
+            Uniform.float_suffix[is_float])(location, size, data)
         
     @staticmethod
     def load_matrix(location, data):
@@ -175,10 +254,12 @@ class Uniform(object):
         n, m = data.shape
         # TODO: arrays of matrices?
         if n == m:
-            funname = 'glUniformMatrix%d%sv' % (n, Uniform.float_suffix[is_float])
+            function = Uniform.get_function('glUniformMatrix%d%sv', n,
+                Uniform.float_suffix[is_float])
         else:
-            funname = 'glUniformMatrix%dx%d%sv' % (n, m, Uniform.float_suffix[is_float])
-        getattr(gl, funname)(location, 1, False, data)
+            function = Uniform.get_function('glUniformMatrix%dx%d%sv', n, m,
+                Uniform.float_suffix[is_float])
+        function(location, 1, False, data)
 
 
 class Texture(object):
@@ -213,11 +294,22 @@ class Texture(object):
         
         return buffer
         
+    # texture targets, by number of dimensions
+    targets = {}
+    
+    @staticmethod
+    def get_target(ndim):
+        """Return the texture target for a given number of dimensions."""
+        target = Texture.targets.get(ndim, None)
+        if target is None:
+            target = getattr(gl, "GL_TEXTURE_%dD" % ndim)
+            Texture.targets[ndim] = target
+        return target
+    
     @staticmethod
     def bind(buffer, ndim):
         """Bind a texture buffer."""
-        textype = getattr(gl, "GL_TEXTURE_%dD" % ndim)
-        gl.glBindTexture(textype, buffer)
+        gl.glBindTexture(Texture.get_target(ndim), buffer)
     
     @staticmethod
     def get_info(data):
@@ -234,10 +326,29 @@ class Texture(object):
         component_type = getattr(gl, ["GL_INTENSITY8", None, "GL_RGB", "GL_RGBA"] \
                                             [ncomponents - 1])
         return ndim, ncomponents, component_type
+        
+    # float textures: (internal format, format) by number of components,
+    # 0x8818 is GL_LUMINANCE32F_ARB
+    float_formats = {1: (0x8818, gl.GL_LUMINANCE),
+                     3: (gl.GL_RGB32F, gl.GL_RGB),
+                     4: (gl.GL_RGBA32F, gl.GL_RGBA)}
+    
+    @staticmethod
+    def get_formats(data, floating=False):
+        """Return the texture internal format, format and type of texture
+        data."""
+        ndim, ncomponents, component_type = Texture.get_info(data)
+        if floating:
+            internal_format, format = Texture.float_formats[ncomponents]
+            return ndim, internal_format, format, gl.GL_FLOAT
+        return ndim, component_type, component_type, gl.GL_UNSIGNED_BYTE
 
     @staticmethod    
-    def convert_data(data):
-        """convert data in a array of uint8 in [0, 255]."""
+    def convert_data(data, floating=False):
+        """convert data in a array of uint8 in [0, 255], or in an array of
+        float32 for float textures."""
+        if floating:
+            return np.asarray(data, dtype=np.float32)
         if data.dtype == np.float32 or data.dtype == np.float64:
             return np.array(255 * data, dtype=np.uint8)
         elif data.dtype == np.uint8:
@@ -281,40 +392,52 @@ class Texture(object):
         # gl.glDrawBuffer(gl.GL_FRONT)
             
     @staticmethod
-    def load(data):
+    def load(data, floating=False):
         """Load texture data in a bound texture buffer."""
         # convert data in a array of uint8 in [0, 255]
-        data = Texture.convert_data(data)
+        data = Texture.convert_data(data, floating=floating)
         shape = data.shape
         # get texture info
-        ndim, ncomponents, component_type = Texture.get_info(data)
+        ndim, internal_format, format, type = Texture.get_formats(data,
+            floating=floating)
         textype = getattr(gl, "GL_TEXTURE_%dD" % ndim)
         # print ndim, shape, data.shape
         # load data in the buffer
         if ndim == 1:
-            gl.glTexImage1D(textype, 0, component_type, shape[1], 0, component_type,
-                            gl.GL_UNSIGNED_BYTE, data)
+            gl.glTexImage1D(textype, 0, internal_format, shape[1], 0, format,
+                            type, data)
         elif ndim == 2:
             # width, height == shape[1], shape[0]: Thanks to the Confusion Club
-            gl.glTexImage2D(textype, 0, component_type, shape[1], shape[0], 0,
-                            component_type, gl.GL_UNSIGNED_BYTE, data)
+            gl.glTexImage2D(textype, 0, internal_format, shape[1], shape[0], 0,
+                            format, type, data)
         
     @staticmethod
-    def update(data):
+    def update(data, floating=False):
         """Update a texture."""
         # convert data in a array of uint8 in [0, 255]
-        data = Texture.convert_data(data)
+        data = Texture.convert_data(data, floating=floating)
         shape = data.shape
         # get texture info
-        ndim, ncomponents, component_type = Texture.get_info(data)
+        ndim, internal_format, format, type = Texture.get_formats(data,
+            floating=floating)
         textype = getattr(gl, "GL_TEXTURE_%dD" % ndim)
         # update buffer
         if ndim == 1:
             gl.glTexSubImage1D(textype, 0, 0, shape[1],
-                               component_type, gl.GL_UNSIGNED_BYTE, data)
+                               format, type, data)
         elif ndim == 2:
             gl.glTexSubImage2D(textype, 0, 0, 0, shape[1], shape[0],
-                               component_type, gl.GL_UNSIGNED_BYTE, data)
+                               format, type, data)
+
+    @staticmethod
+    def update_region(data, row=0, col=0, floating=False):
+        """Update a rectangular region of a bound 2D texture, with its upper
+        left corner at a given row and column."""
+        data = Texture.convert_data(data, floating=floating)
+        ndim, internal_format, format, type = Texture.get_formats(data,
+            floating=floating)
+        gl.glTexSubImage2D(gl.GL_TEXTURE_2D, 0, int(col), int(row),
+                           data.shape[1], data.shape[0], format, type, data)
 
     @staticmethod
     def delete(*buffers):
@@ -322,6 +445,97 @@ class Texture(object):
         gl.glDeleteTextures(buffers)
 
 
+class VertexArray(object):
+    """Contains OpenGL functions related to vertex array objects."""
+    @staticmethod
+    def is_supported():
+        """Return whether VAOs are supported by the driver."""
+        return bool(hasattr(gl, 'glGenVertexArrays') and gl.glGenVertexArrays)
+    
+    @staticmethod
+    def create():
+        """Create a new VAO."""
+        return gl.glGenVertexArrays(1)
+        
+    @staticmethod
+    def bind(vao):
+        """Bind a VAO."""
+        gl.glBindVertexArray(vao)
+        
+    @staticmethod
+    def unbind():
+        """Unbind the current VAO."""
+        gl.glBindVertexArray(0)
+        
+    @staticmethod
+    def delete(*vaos):
+        """Delete VAOs."""
+        if vaos:
+            gl.glDeleteVertexArrays(len(vaos), vaos)
+
+
+class Instancing(object):
+    """Contains OpenGL functions related to instanced rendering, which
+    requires OpenGL 3.3 or the ARB_instanced_arrays extension."""
+    @staticmethod
+    def get_function(name):
+        """Return an OpenGL function, or its ARB version, or None if the
+        driver supports neither."""
+        for name in (name, name + 'ARB'):
+            fun = getattr(gl, name, None)
+            if fun:
+                return fun
+        return None
+    
+    @staticmethod
+    def is_supported():
+        """Return whether instanced rendering is supported by the driver."""
+        return bool(Instancing.get_function('glDrawArraysInstanced') and
+            Instancing.get_function('glVertexAttribDivisor'))
+
+
+class TimerQuery(object):
+    """Contains OpenGL functions related to timer queries, used to measure
+    the GPU time spent on rendering."""
+    @staticmethod
+    def is_supported():
+        """Return whether timer queries are supported by the driver."""
+        return bool(hasattr(gl, 'GL_TIME_ELAPSED') and
+            hasattr(gl, 'glGenQueries') and gl.glGenQueries)
+    
+    @staticmethod
+    def create():
+        """Create a new query object."""
+        return gl.glGenQueries(1)
+        
+    @staticmethod
+    def begin(query):
+        """Start measuring the GPU time."""
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, query)
+        
+    @staticmethod
+    def end():
+        """Stop measuring the GPU time."""
+        gl.glEndQuery(gl.GL_TIME_ELAPSED)
+        
+    @staticmethod
+    def get_result(query):
+        """Return the elapsed time in seconds, or None if the result is not
+        available yet."""
+        available = gl.glGetQueryObjectiv(query, gl.GL_QUERY_RESULT_AVAILABLE)
+        if not int(np.ravel(available)[0]):
+            return None
+        # result in nanoseconds
+        result = gl.glGetQueryObjectuiv(query, gl.GL_QUERY_RESULT)
+        return int(np.ravel(result)[0]) * 1e-9
+        
+    @staticmethod
+    def delete(*queries):
+        """Delete query objects."""
+        if queries:
+            gl.glDeleteQueries(len(queries), queries)
+
+
 class FrameBuffer(object):
     """Contains OpenGL functions related to FBO."""
     @staticmethod
@@ -358,27 +572,74 @@ class FrameBuffer(object):
         
 # Shader manager
 # --------------
+# Programs shared by all visuals with the same shader sources in a given
+# OpenGL context: {(context, hash): [program, vs, fs, refcount]}.
+PROGRAM_CACHE = {}
+# Last user of every cached program: {(context, hash): visual renderer}.
+# Uniforms are part of the program state, so a visual needs to load its
+# uniforms again when another visual has used the same program since.
+PROGRAM_USERS = {}
+# Last value uploaded in every uniform of the cached programs, so that only
+# the uniforms which differ are uploaded when another visual uses the
+# program: {(context, hash): {location: value}}.
+PROGRAM_UNIFORMS = {}
+# Directory where linked program binaries are saved, to skip compilation
+# in later sessions (glGetProgramBinary). Can be overriden by the renderer
+# option `program_binary_dir`. Deactivated when None.
+PROGRAM_BINARY_DIR = None
+# Textures shared by several visuals in a given OpenGL context, like font
+# atlases: {(context, name): [buffer, version, refcount]}. The version of the
+# data last loaded in the texture is None when unknown.
+TEXTURE_CACHE = {}
+
+def get_program_hash(vertex_shader, fragment_shader):
+    """Return the hash of a pair of shader sources."""
+    return hashlib.sha1(vertex_shader + '\0' + fragment_shader).hexdigest()
+
 class ShaderManager(object):
     """Handle vertex and fragment shaders.
     
+    Programs are cached: visuals with identical shader sources share the
+    same program, which is compiled and linked only once, and deleted
+    when the last visual using it is cleaned up.
+    
     TODO: integrate in the renderer the shader code creation module.
     
     """
     
     # Initialization methods
     # ----------------------
-    def __init__(self, vertex_shader, fragment_shader):
-        """Compile shaders and create a program."""
+    def __init__(self, vertex_shader, fragment_shader, binary_dir=None):
+        """Compile shaders and create a program, or get the program from the
+        cache."""
         # add headers
         vertex_shader = GLVersion.version_header() + vertex_shader
         fragment_shader = GLVersion.version_header() + fragment_shader
         # set shader source
         self.vertex_shader = vertex_shader
         self.fragment_shader = fragment_shader
-        # compile shaders
-        self.compile()
-        # create program
-        self.program = self.create_program()
+        if binary_dir is None:
+            binary_dir = PROGRAM_BINARY_DIR
+        self.binary_dir = binary_dir
+        self.hash = get_program_hash(vertex_shader, fragment_shader)
+        self.key = (GLVersion.get_current_context(), self.hash)
+        cached = PROGRAM_CACHE.get(self.key, None)
+        if cached is not None and gl.glIsProgram(cached[0]):
+            log_debug("Using cached program %s." % self.hash)
+            self.program, self.vs, self.fs = cached[:3]
+            cached[3] += 1
+            return
+        self.vs = self.fs = None
+        # load the binary program saved by a previous session
+        self.program = self.load_binary()
+        if self.program is None:
+            # compile shaders
+            self.compile()
+            # create program
+            self.program = self.create_program()
+            self.save_binary()
+        PROGRAM_CACHE[self.key] = [self.program, self.vs, self.fs, 1]
+        PROGRAM_UNIFORMS[self.key] = {}
 
     def compile_shader(self, source, shader_type):
         """Compile a shader (vertex or fragment shader).
@@ -420,6 +681,12 @@ class ShaderManager(object):
         program = gl.glCreateProgram()
         gl.glAttachShader(program, self.vs)
         gl.glAttachShader(program, self.fs)
+        if self.binary_dir:
+            try:
+                gl.glProgramParameteri(program,
+                    gl.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, gl.GL_TRUE)
+            except Exception:
+                pass
         gl.glLinkProgram(program)
 
         result = gl.glGetProgramiv(program, gl.GL_LINK_STATUS)
@@ -434,6 +701,66 @@ class ShaderManager(object):
         self.program = program
         return program
         
+    # Binary programs
+    # ---------------
+    def get_binary_path(self):
+        """Return the path of the binary program file. The binary formats
+        depend on the driver, so that the renderer information is part of
+        the file name."""
+        info = GLVersion.get_renderer_info()
+        driver = hashlib.sha1('%s %s' % (info['renderer_name'],
+            info['opengl_version'])).hexdigest()[:8]
+        return os.path.join(self.binary_dir,
+            '%s-%s.glprogram' % (self.hash, driver))
+        
+    def load_binary(self):
+        """Create a program from a saved binary, or return None."""
+        if not self.binary_dir:
+            return None
+        path = self.get_binary_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                binary_format, = np.fromfile(f, dtype=np.uint32, count=1)
+                binary = np.fromfile(f, dtype=np.uint8)
+            program = gl.glCreateProgram()
+            gl.glProgramBinary(program, int(binary_format), binary,
+                len(binary))
+        except Exception as e:
+            log_debug("Unable to load the program binary: %s" % str(e))
+            return None
+        # the binary is rejected when the driver has changed
+        if not gl.glGetProgramiv(program, gl.GL_LINK_STATUS):
+            log_debug("The program binary %s is not valid anymore." % path)
+            gl.glDeleteProgram(program)
+            return None
+        log_debug("Loaded program binary %s." % path)
+        return program
+        
+    def save_binary(self):
+        """Save the linked program in the binary directory, if the driver
+        supports it."""
+        if not self.binary_dir:
+            return
+        try:
+            length = gl.glGetProgramiv(self.program,
+                gl.GL_PROGRAM_BINARY_LENGTH)
+            if not length:
+                return
+            binary = np.empty(length, dtype=np.uint8)
+            binary_format = np.zeros(1, dtype=np.uint32)
+            binary_length = np.zeros(1, dtype=np.int32)
+            gl.glGetProgramBinary(self.program, length, binary_length,
+                binary_format, binary)
+            if not os.path.exists(self.binary_dir):
+                os.makedirs(self.binary_dir)
+            with open(self.get_binary_path(), 'wb') as f:
+                binary_format.tofile(f)
+                binary[:binary_length[0]].tofile(f)
+        except Exception as e:
+            log_debug("Unable to save the program binary: %s" % str(e))
+        
     def get_attribute_location(self, name):
         """Return the location of an attribute after the shaders have compiled."""
         return gl.glGetAttribLocation(self.program, name)
@@ -445,6 +772,26 @@ class ShaderManager(object):
   
     # Activation methods
     # ------------------
+    def set_user(self, user):
+        """Record the object using the program, typically a visual renderer.
+        Return True if the program was used by another object since the
+        last call, in which case the uniforms need to be loaded again."""
+        if PROGRAM_USERS.get(self.key, None) is user:
+            return False
+        PROGRAM_USERS[self.key] = user
+        return True
+        
+    def set_uniform_value(self, location, data):
+        """Record the value of a uniform of the program. Return False if the
+        uniform has this value already, in which case it does not need to be
+        uploaded."""
+        values = PROGRAM_UNIFORMS.setdefault(self.key, {})
+        value = values.get(location, None)
+        if value is not None and np.array_equal(value, data):
+            return False
+        values[location] = np.array(data, copy=True)
+        return True
+        
     def activate_shaders(self):
         """Activate shaders for the rest of the rendering call."""
         # try:
@@ -468,13 +815,14 @@ class ShaderManager(object):
     # ---------------
     def detach_shaders(self):
         """Detach shaders from the program."""
-        if gl.glIsProgram(self.program):
+        # there are no shaders with programs loaded from a binary
+        if gl.glIsProgram(self.program) and self.vs is not None:
             gl.glDetachShader(self.program, self.vs)
             gl.glDetachShader(self.program, self.fs)
             
     def delete_shaders(self):
         """Delete the vertex and fragment shaders."""
-        if gl.glIsProgram(self.program):
+        if gl.glIsProgram(self.program) and self.vs is not None:
             gl.glDeleteShader(self.vs)
             gl.glDeleteShader(self.fs)
 
@@ -484,25 +832,111 @@ class ShaderManager(object):
             gl.glDeleteProgram(self.program)
         
     def cleanup(self):
-        """Clean up all shaders."""
+        """Clean up all shaders, when no other visual uses the program."""
+        cached = PROGRAM_CACHE.get(self.key, None)
+        if cached is not None and cached[0] == self.program:
+            cached[3] -= 1
+            if cached[3] > 0:
+                return
+            del PROGRAM_CACHE[self.key]
+            PROGRAM_USERS.pop(self.key, None)
+            PROGRAM_UNIFORMS.pop(self.key, None)
         self.detach_shaders()
         self.delete_shaders()
         self.delete_program()
         
         
+# Dirty rows
+# ----------
+# Maximum number of clean rows between two dirty intervals for them to be
+# merged into a single upload.
+DIRTY_GAP = 64
+
+def get_row_intervals(rows, size):
+    """Return the list of `(onset, offset)` intervals covering rows.
+    
+    Arguments:
+      * rows: a slice, or an array of row indices.
+      * size: the total number of rows.
+      
+    Returns:
+      * intervals: a list of non-overlapping intervals, sorted.
+    
+    """
+    if isinstance(rows, slice):
+        start, stop, step = rows.indices(size)
+        if step == 1:
+            if start >= stop:
+                return []
+            return [(start, stop)]
+        rows = np.arange(start, stop, step)
+    rows = np.unique(np.asarray(rows, dtype=np.int64) % size)
+    if not len(rows):
+        return []
+    # break the sorted rows where the gap is too large
+    breaks = np.nonzero(np.diff(rows) > 1)[0]
+    onsets = np.hstack((rows[0], rows[breaks + 1]))
+    offsets = np.hstack((rows[breaks], rows[-1])) + 1
+    return zip(onsets, offsets)
+    
+def merge_intervals(intervals, gap=None):
+    """Merge sorted or unsorted `(onset, offset)` intervals when the gap
+    between them is less than `gap` rows."""
+    if gap is None:
+        gap = DIRTY_GAP
+    merged = []
+    for onset, offset in sorted(intervals):
+        if merged and onset <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], offset)
+        else:
+            merged.append([onset, offset])
+    return [tuple(interval) for interval in merged]
+    
+
 # Slicing classes
 # ---------------
-MAX_VBO_SIZE = 65000
+# Maximum number of vertices in a buffer object. When None, it is
+# obtained from the renderer option `max_vbo_size` or from the driver limits.
+MAX_VBO_SIZE = None
+# Used when the driver limits cannot be queried. Buffers are never sliced
+# in smaller pieces than this.
+DEFAULT_MAX_VBO_SIZE = 65000
+
+def get_max_vbo_size(max_elements_vertices=None, free_memory=None,
+    vertex_size=None):
+    """Return the maximum number of vertices in a buffer object.
+    
+    Arguments:
+      * max_elements_vertices=None: the recommended maximum number of
+        vertices returned by the driver.
+      * free_memory=None: the available video memory in bytes.
+      * vertex_size=None: the number of bytes per vertex.
+    
+    """
+    if MAX_VBO_SIZE is not None:
+        return MAX_VBO_SIZE
+    maxsize = max(max_elements_vertices or 0, DEFAULT_MAX_VBO_SIZE)
+    # a single buffer should not use more than a quarter of the available
+    # memory
+    if free_memory and vertex_size:
+        maxsize = min(maxsize, max(DEFAULT_MAX_VBO_SIZE,
+            free_memory // (4 * vertex_size)))
+    return maxsize
 
 class Slicer(object):
     """Handle attribute slicing, necessary because of the size
     of buffer objects which is limited on some GPUs."""
+    def __init__(self, maxsize=None):
+        # maximum number of vertices in a slice
+        self.maxsize = maxsize
+    
     @staticmethod
     def _get_slices(size, maxsize=None):
         """Return a list of slices for a given dataset size.
         
         Arguments:
           * size: the size of the dataset, i.e. the number of points.
+          * maxsize=None: the maximum size of a slice.
           
         Returns:
           * slices: a list of pairs `(position, slice_size)` where `position`
@@ -511,7 +945,7 @@ class Slicer(object):
         
         """
         if maxsize is None:
-            maxsize = MAX_VBO_SIZE
+            maxsize = get_max_vbo_size()
         if maxsize > 0:
             nslices = int(np.ceil(size / float(maxsize)))
         else:
@@ -583,7 +1017,7 @@ class Slicer(object):
         if not doslice:
             maxsize = 2 * size
         else:
-            maxsize = None
+            maxsize = self.maxsize
         self.size = size
         # if not hasattr(self, 'bounds'):
             # self.bounds = np.array([0, size], dtype=np.int32)
@@ -643,11 +1077,26 @@ class SlicedAttribute(object):
         Attribute.delete(*self.buffers)
     
     def load(self, data):
-        """Load data on all sliced buffers."""
+        """Load data on all sliced buffers.
+        
+        Large slices are uploaded by chunks of `LOAD_CHUNK_SIZE` rows, so that
+        memory-mapped arrays and lazy sources (`DataSource`) are never
+        converted as a whole in memory.
+        
+        """
         for buffer, (pos, size) in zip(self.buffers, self.slicer.slices):
             # WARNING: putting self.location instead of None ==> SEGFAULT on Linux with Nvidia drivers
             Attribute.bind(buffer, None)
-            Attribute.load(data[pos:pos + size,...])
+            size = min(size, len(data) - pos)
+            if size <= LOAD_CHUNK_SIZE and not isinstance(data, DataSource):
+                Attribute.load(data[pos:pos + size,...])
+                continue
+            # allocate the buffer, then stream the chunks
+            ndim = data.shape[1] if len(data.shape) == 2 else 1
+            Attribute.allocate(size * ndim * 4)
+            for onset in xrange(0, size, LOAD_CHUNK_SIZE):
+                offset = min(onset + LOAD_CHUNK_SIZE, size)
+                Attribute.update(data[pos + onset:pos + offset,...], onset)
 
     def bind(self, slice=None):
         if slice is None:
@@ -657,11 +1106,15 @@ class SlicedAttribute(object):
     def update(self, data, mask=None):
         """Update data on all sliced buffers."""
         # NOTE: the slicer needs to be updated if the size of the data changes
-        # default mask
+        # no mask: update all sub-buffers
         if mask is None:
-            mask = np.ones(self.slicer.size, dtype=np.bool)
-        # is the current subVBO within the given [onset, offset]?
-        within = False
+            for buffer, (pos, size) in zip(self.buffers, self.slicer.slices):
+                Attribute.bind(buffer, self.location)
+                for onset in xrange(0, size, LOAD_CHUNK_SIZE):
+                    offset = min(onset + LOAD_CHUNK_SIZE, size)
+                    Attribute.update(data[pos + onset:pos + offset,...],
+                        onset)
+            return
         # update VBOs
         for buffer, (pos, size) in zip(self.buffers, self.slicer.slices):
             subdata = data[pos:pos + size,...]
@@ -674,6 +1127,21 @@ class SlicedAttribute(object):
                 Attribute.bind(buffer, self.location)
                 Attribute.update(subdata[subonset:suboffset + 1,...], subonset)
 
+    def update_rows(self, data, onset=0):
+        """Update the rows `[onset, onset + len(data))` of the attribute.
+        
+        Only the sub-buffers intersecting these rows are updated, and only
+        the corresponding bytes are uploaded. Rows shared by two successive
+        slices are uploaded in both.
+        
+        """
+        offset = onset + len(data)
+        for buffer, (pos, size) in zip(self.buffers, self.slicer.slices):
+            a, b = max(onset, pos), min(offset, pos + size)
+            if a < b:
+                Attribute.bind(buffer, self.location)
+                Attribute.update(data[a - onset:b - onset,...], a - pos)
+
     
 # Painter class
 # -------------
@@ -696,6 +1164,12 @@ class Painter(object):
     @staticmethod
     def draw_indexed_arrays(primtype, size):
         gl.glDrawElements(primtype, size, gl.GL_UNSIGNED_INT, None)
+        
+    @staticmethod
+    def draw_instanced_arrays(primtype, offset, size, instances):
+        """Render several instances of an array of primitives."""
+        Instancing.get_function('glDrawArraysInstanced')(primtype, offset,
+            size, instances)
 
 
 # Visual renderer
@@ -712,12 +1186,39 @@ class GLVisualRenderer(object):
         self.scene = renderer.scene
         # register the visual dictionary
         self.visual = visual
+        # lookup tables of variables, built when first needed
+        self.invalidate_variables()
+        # update methods, by shader type
+        self.updaters = {
+            'attribute': self.update_attribute,
+            'index': self.update_index,
+            'texture': self.update_texture,
+            'uniform': self.update_uniform,
+        }
         self.framebuffer = visual.get('framebuffer', None)
         # self.beforeclear = visual.get('beforeclear', None)
         # options
         self.options = visual.get('options', {})
         # hold all data changes until the next rendering pass happens
         self.data_updating = {}
+        # hold all appended rows for streaming visuals
+        self.data_appending = []
+        # dirty row intervals of attributes updated with set_data(rows=...)
+        self.data_dirty = {}
+        # {name: version} incremented when the data of a variable changes,
+        # so that data derived from it on the CPU (like picking indices) can
+        # be computed again
+        self.data_versions = {}
+        # texture regions updated with set_data(texture_tiles=...)
+        self.texture_tiles = []
+        # one VAO per slice, created at the first rendering
+        self.use_vao = renderer.use_vao
+        self.vaos = None
+        # two timer queries used alternately when profiling, so that the
+        # result of the previous frame is read while the current one is
+        # measured
+        self.timer_queries = None
+        self.timer_index = 0
         self.textures_to_copy = []
         # set the primitive type from its name
         self.set_primitive_type(self.visual['primitive_type'])
@@ -728,7 +1229,7 @@ class GLVisualRenderer(object):
         self.use_slice = True
         # self.previous_size = None
         # set the slicer
-        self.slicer = Slicer()
+        self.slicer = Slicer(self.get_max_vbo_size())
         # used when slicing needs to be deactivated (like for indexed arrays)
         self.noslicer = Slicer()
         # get size and bounds
@@ -739,9 +1240,30 @@ class GLVisualRenderer(object):
         self.slicer.set_bounds(bounds)
         self.noslicer.set_size(size, doslice=False)
         self.noslicer.set_bounds(bounds)
+        # instanced visuals: the attributes with a divisor contain one row
+        # per instance, and the other ones describe the shared mesh
+        self.instances = self.visual.get('instances', None)
+        self.instance_slicer = Slicer()
+        # when the driver does not support instancing, all attributes are
+        # stored in buffers containing one copy of the mesh per instance
+        self.emulate_instances = (self.instances is not None and
+            not renderer.use_instancing)
+        self.reload_instances = False
+        if self.instances is not None:
+            self.slicer = self.noslicer
+            self.set_instances(self.instances)
+        # attributes reading the buffer of another attribute at an offset,
+        # which rules out slicing
+        self.use_offsets = any([var.get('source', None)
+            for var in self.get_variables('attribute')])
+        if self.use_offsets:
+            self.slicer = self.noslicer
+        # streaming visuals: each primitive is a circular buffer
+        self.initialize_streaming(bounds)
         # compile and link the shaders
         self.shader_manager = ShaderManager(self.visual['vertex_shader'],
-                                            self.visual['fragment_shader'])
+            self.visual['fragment_shader'],
+            binary_dir=renderer.get_renderer_option('program_binary_dir'))
                                             
         # DEBUG
         # log_info(self.shader_manager.vertex_shader)
@@ -752,6 +1274,7 @@ class GLVisualRenderer(object):
         self.initialize_variables()
         self.initialize_fbocopy()
         self.load_variables()
+        self.reload_instances = False
         
     def set_primitive_type(self, primtype):
         """Set the primitive type from its name (without the GL_ prefix)."""
@@ -761,6 +1284,21 @@ class GLVisualRenderer(object):
         """Get a visual parameter."""
         return self.visual.get(name, None)
     
+    def get_max_vbo_size(self):
+        """Return the maximum number of vertices in a buffer object for
+        this visual."""
+        # explicit renderer option
+        maxsize = self.renderer.get_renderer_option('max_vbo_size')
+        if maxsize:
+            return maxsize
+        # number of bytes per vertex
+        vertex_size = sum([4 * np.prod(var.get('ndim', 1))
+            for var in self.get_variables('attribute')])
+        return get_max_vbo_size(
+            getattr(self.renderer, 'max_elements_vertices', None),
+            getattr(self.renderer, 'free_memory', None),
+            vertex_size)
+    
     
     # Variable methods
     # ----------------
@@ -775,26 +1313,46 @@ class GLVisualRenderer(object):
             return None
         return visuals[0]
         
+    def initialize_lookups(self):
+        """Build the lookup tables of the variables, by shader type and by
+        name."""
+        self.variables_by_type = {}
+        self.variables_by_name = {}
+        for var in self.visual.get('variables', []):
+            self.variables_by_type.setdefault(var['shader_type'], []).append(var)
+            self.variables_by_name.setdefault(var.get('name', ''), var)
+        
+    def invalidate_variables(self):
+        """Forget the lookup tables, to be called when the list of variables
+        of the visual changes."""
+        self.variables_by_type = None
+        self.variables_by_name = None
+        
     def get_variables(self, shader_type=None):
         """Return all variables defined in the visual."""
         if not shader_type:
             return self.visual.get('variables', [])
         else:
-            return [var for var in self.get_variables() \
-                            if var['shader_type'] == shader_type]
+            if self.variables_by_type is None:
+                self.initialize_lookups()
+            return self.variables_by_type.get(shader_type, [])
         
     def get_variable(self, name, visual=None):
         """Return a variable by its name, and for any given visual which 
         is specified by its name."""
-        # get the variables list
-        if visual is None:
-            variables = self.get_variables()
-        else:
-            variables = self.get_visual(visual)['variables']
-        variables = [v for v in variables if v.get('name', '') == name]
-        if not variables:
-            return None
-        return variables[0]
+        # variable of another visual
+        if visual is not None:
+            renderer = self.renderer.visual_renderers.get(visual, None)
+            if renderer is not None:
+                return renderer.get_variable(name)
+            variables = [v for v in self.get_visual(visual)['variables']
+                if v.get('name', '') == name]
+            if not variables:
+                return None
+            return variables[0]
+        if self.variables_by_name is None:
+            self.initialize_lookups()
+        return self.variables_by_name.get(name, None)
         
     def resolve_reference(self, refvar):
         """Resolve a reference variable: return its true value (a Numpy array).
@@ -810,6 +1368,8 @@ class GLVisualRenderer(object):
     
     def initialize_variables(self):
         """Initialize all variables, after the shaders have compiled."""
+        # the lookup tables are built again from the current variables
+        self.invalidate_variables()
         # find out whether indexing is used or not, because in this case
         # the slicing needs to be deactivated
         if self.get_variables('index'):
@@ -853,6 +1413,16 @@ class GLVisualRenderer(object):
             target = self.resolve_reference(variable['data'])
             variable['sliced_attribute'] = SlicedAttribute(self.slicer, location,
                 buffers=target['sliced_attribute'].buffers)
+        # attribute sharing the buffers of another attribute of the visual
+        elif variable.get('source', None):
+            target = self.get_variable(variable['source'])
+            variable['sliced_attribute'] = SlicedAttribute(self.slicer,
+                location, buffers=target['sliced_attribute'].buffers)
+        # per-instance attributes, or all attributes when instancing is
+        # emulated
+        elif variable.get('divisor', 0) or self.emulate_instances:
+            variable['sliced_attribute'] = SlicedAttribute(
+                self.instance_slicer, location)
         else:
             # initialize the sliced buffers
             variable['sliced_attribute'] = SlicedAttribute(self.slicer, location)
@@ -869,11 +1439,25 @@ class GLVisualRenderer(object):
             variable['buffer'] = target['buffer']
             variable['location'] = target['location']
         else:
-            variable['buffer'] = Texture.create(variable['ndim'],
-                mipmap=variable.get('mipmap', None),
-                minfilter=variable.get('minfilter', None),
-                magfilter=variable.get('magfilter', None),
-                )
+            # shared textures are created once per OpenGL context
+            cached = None
+            if variable.get('shared', None) is not None:
+                variable['shared_key'] = (GLVersion.get_current_context(),
+                    variable['shared'])
+                cached = TEXTURE_CACHE.get(variable['shared_key'], None)
+            if cached is not None and gl.glIsTexture(cached[0]):
+                log_debug("Using shared texture %s." % variable['shared'])
+                variable['buffer'] = cached[0]
+                cached[2] += 1
+            else:
+                variable['buffer'] = Texture.create(variable['ndim'],
+                    mipmap=variable.get('mipmap', None),
+                    minfilter=variable.get('minfilter', None),
+                    magfilter=variable.get('magfilter', None),
+                    )
+                if 'shared_key' in variable:
+                    TEXTURE_CACHE[variable['shared_key']] = [
+                        variable['buffer'], None, 1]
             # NEW
             # get the location of the sampler uniform
             location = self.shader_manager.get_uniform_location(name)
@@ -954,6 +1538,8 @@ class GLVisualRenderer(object):
                     # # normalize data with the specified viewbox, None by default
                     # # meaning that the natural bounds of the data are used.
                     # data = self.normalizers[name].normalize(viewbox)
+            if self.emulate_instances:
+                data = self.get_instanced_data(variable, data)
             variable['sliced_attribute'].load(data)
         
     def load_index(self, name, data=None):
@@ -987,8 +1573,15 @@ class GLVisualRenderer(object):
             return
             
         if data is not None:
+            # skip shared textures already loaded with the same data
+            cached = TEXTURE_CACHE.get(variable.get('shared_key', None), None)
+            if cached is not None:
+                version = variable.get('version', None)
+                if version is not None and cached[1] == version:
+                    return
+                cached[1] = version
             Texture.bind(variable['buffer'], variable['ndim'])
-            Texture.load(data)
+            Texture.load(data, floating=variable.get('floating', None))
             
     def load_uniform(self, name, data=None):
         """Load data for an uniform variable."""
@@ -1002,7 +1595,9 @@ class GLVisualRenderer(object):
         
         if data is None:
             data = variable.get('data', None)
-        if data is not None:
+        # skip the upload if the program has this value already
+        if data is not None and self.shader_manager.set_uniform_value(
+                location, data):
             ndim = variable['ndim']
             size = variable.get('size', None)
             # one value
@@ -1039,7 +1634,7 @@ class GLVisualRenderer(object):
             if shader_type == 'compound' or shader_type == 'varying' or shader_type == 'framebuffer':
                 pass
             else:
-                getattr(self, 'update_%s' % shader_type)(name, data, **kwargs)
+                self.updaters[shader_type](name, data, **kwargs)
     
     def update_attribute(self, name, data):#, bounds=None):
         """Update data for an attribute variable."""
@@ -1065,23 +1660,34 @@ class GLVisualRenderer(object):
         
         # print name, oldshape, data.shape
         
+        if self.emulate_instances:
+            self.update_instanced_attribute(name, data)
+            return
+        
         # handle size changing
         if data.shape[0] != oldshape[0]:
             log_debug(("Creating new buffers for variable %s, old size=%s,"
                 "new size=%d") % (name, oldshape[0], data.shape[0]))
-            # update the size only when not using index arrays
-            if self.use_index:
-                newsize = self.slicer.size
+            # per-instance attribute: the number of instances changes
+            if variable.get('divisor', 0):
+                self.set_instances(data.shape[0])
             else:
-                newsize = data.shape[0]
-            # update the slicer size and bounds
-            self.slicer.set_size(newsize, doslice=not(self.use_index))
-            
-            # HACK: update the bounds only if there are no bounds basically
-            # (ie. 2 bounds only), otherwise we assume the bounds have been
-            # changed explicitely
-            if len(self.slicer.bounds) == 2:
-                self.slicer.set_bounds()
+                # update the size only when not using index arrays
+                if self.use_index:
+                    newsize = self.slicer.size
+                else:
+                    newsize = data.shape[0]
+                oldsize = self.slicer.size
+                # update the slicer size and bounds
+                self.slicer.set_size(newsize, doslice=self.use_slicing())
+                
+                # HACK: update the bounds only if there are no bounds
+                # basically (ie. 2 bounds covering the whole data),
+                # otherwise we assume the bounds have been changed
+                # explicitely
+                if (len(self.slicer.bounds) == 2 and
+                        self.slicer.bounds[1] == oldsize):
+                    self.slicer.set_bounds()
                 
             # delete old buffers
             att.delete_buffers()
@@ -1089,12 +1695,60 @@ class GLVisualRenderer(object):
             att.create()
             # load data
             att.load(data)
+            # attributes reading this buffer at an offset
+            for var in self.get_variables('attribute'):
+                if var.get('source', None) == name:
+                    var['sliced_attribute'].load_buffers(att.buffers)
+            # the VAOs refer to the old buffers
+            self.invalidate_vertex_arrays()
             # forget previous size
             # self.previous_size = None            
         else:
             # update data
             att.update(data)
         
+    def get_instanced_data(self, variable, data):
+        """Return the data of an attribute of an instanced visual, repeated
+        for all instances when instancing is emulated."""
+        divisor = variable.get('divisor', 0)
+        size = self.slicer.size
+        if divisor:
+            data = np.repeat(data, divisor * size, axis=0)
+            return data[:self.instances * size,...]
+        return np.tile(data, (self.instances,) + (1,) * (data.ndim - 1))
+        
+    def update_instanced_attribute(self, name, data):
+        """Update an attribute of an instanced visual when instancing is
+        emulated. When the number of instances or the size of the mesh
+        changes, all attributes are loaded again in
+        `load_instanced_attributes`."""
+        variable = self.get_variable(name)
+        if variable.get('divisor', 0):
+            if data.shape[0] != self.instances:
+                self.set_instances(data.shape[0])
+        elif data.shape[0] != self.slicer.size:
+            self.slicer.set_size(data.shape[0], doslice=False)
+            self.slicer.set_bounds()
+            self.set_instances(self.instances)
+        if not self.reload_instances:
+            variable['sliced_attribute'].update(
+                self.get_instanced_data(variable, data))
+        
+    def load_instanced_attributes(self):
+        """Create new buffers for all attributes of an instanced visual when
+        instancing is emulated, with one copy of the mesh per instance."""
+        for variable in self.get_variables('attribute'):
+            att = variable['sliced_attribute']
+            data = variable.get('data', None)
+            if (att.location < 0 or data is None or
+                    isinstance(data, RefVar) or variable.get('source', None)):
+                continue
+            att.delete_buffers()
+            att.create()
+            att.load(self.get_instanced_data(variable, data))
+        self.invalidate_vertex_arrays()
+        self.reload_instances = False
+        
     def update_index(self, name, data):
         """Update data for a index variable."""
         variable = self.get_variable(name)
@@ -1113,6 +1767,8 @@ class GLVisualRenderer(object):
             # load data
             Attribute.bind(variable['buffer'], variable['ndim'], index=True)
             Attribute.load(data, index=True)
+            # the VAOs refer to the old buffer
+            self.invalidate_vertex_arrays()
         else:
             # update data
             Attribute.bind(variable['buffer'], variable['ndim'], index=True)
@@ -1141,11 +1797,15 @@ class GLVisualRenderer(object):
                 # magfilter=variable.get('magfilter', None),)
             # load data
             Texture.bind(variable['buffer'], variable['ndim'])
-            Texture.load(data)
+            Texture.load(data, floating=variable.get('floating', None))
         else:
             # update data
             Texture.bind(variable['buffer'], variable['ndim'])
-            Texture.update(data)
+            Texture.update(data, floating=variable.get('floating', None))
+        # the version of the data in a shared texture is not known anymore
+        cached = TEXTURE_CACHE.get(variable.get('shared_key', None), None)
+        if cached is not None:
+            cached[1] = None
         
     def update_uniform(self, name, data):
         """Update data for an uniform variable."""
@@ -1160,6 +1820,8 @@ class GLVisualRenderer(object):
                         'primitive_type',
                         'constrain_ratio',
                         'constrain_navigation',
+                        'rows',
+                        'instances',
                         ]
     def set_data(self, **kwargs):
         """Load data for the specified visual. Uploading does not happen here
@@ -1171,12 +1833,18 @@ class GLVisualRenderer(object):
             any field of the visual, plus one of the following keywords:
               * visible: whether this visual should be visible,
               * size: the size of the visual,
+              * instances: the number of instances of an instanced visual,
               * primitive_type: the GL primitive type,
               * constrain_ratio: whether to constrain the ratio of the visual,
               * constrain_navigation: whether to constrain the navigation,
+              * rows: a slice or an array of indices. In this case, the
+                attributes only contain the data of these rows, and only
+                the modified rows are uploaded.
+              * texture_tiles: a list of `(name, (row, col), data)` to
+                update only a region of 2D textures, starting at the given
+                row and column.
         
         """
-        
         # handle compound variables
         kwargs2 = kwargs.copy()
         for name, data in kwargs2.iteritems():
@@ -1200,6 +1868,9 @@ class GLVisualRenderer(object):
             if not variable.get('visible', True):
                 kwargs.pop(name)
         
+        for name in set(kwargs) | set(kwargs2):
+            self.data_versions[name] = self.data_versions.get(name, 0) + 1
+        
         # handle visual visibility
         visible = kwargs.pop('visible', None)
         if visible is not None:
@@ -1209,7 +1880,15 @@ class GLVisualRenderer(object):
         size = kwargs.pop('size', None)
         # print size
         if size is not None:
-            self.slicer.set_size(size)
+            self.slicer.set_size(size, doslice=self.use_slicing())
+            self.invalidate_vertex_arrays()
+            if self.emulate_instances:
+                self.set_instances(self.instances)
+        
+        # handle instances keyword
+        instances = kwargs.pop('instances', None)
+        if instances is not None:
+            self.set_instances(instances)
         
         # handle bounds keyword
         bounds = kwargs.pop('bounds', None)
@@ -1232,12 +1911,192 @@ class GLVisualRenderer(object):
         if constrain_navigation is not None:
             self.visual['constrain_navigation'] = constrain_navigation
         
+        # handle partial updates of textures
+        texture_tiles = kwargs.pop('texture_tiles', None)
+        if texture_tiles:
+            self.texture_tiles.extend(texture_tiles)
+        
+        # handle partial updates of attributes
+        rows = kwargs.pop('rows', None)
+        if rows is not None:
+            for name in kwargs.keys():
+                variable = self.get_variable(name)
+                if (variable is not None and
+                        variable['shader_type'] == 'attribute'):
+                    self.set_rows(name, kwargs.pop(name), rows)
+        
         # flag the other variables as to be updated
         self.data_updating.update(**kwargs)
         
+    def get_data(self, name):
+        """Return the current data of a variable, including the changes
+        which have not been uploaded yet."""
+        data = self.data_updating.get(name, None)
+        if data is None:
+            variable = self.get_variable(name)
+            if variable is not None:
+                data = variable.get('data', None)
+        return data
+        
+    def get_data_version(self, name):
+        """Return the number of times the data of a variable has changed."""
+        return self.data_versions.get(name, 0)
+        
+    def use_slicing(self):
+        """Return whether the attributes can be sliced, which is not the
+        case with index arrays, shared buffers or instanced rendering."""
+        return not (self.use_index or self.use_offsets or
+            self.instances is not None)
+        
+    def set_instances(self, instances):
+        """Change the number of instances of an instanced visual."""
+        self.instances = instances
+        if self.emulate_instances:
+            self.instance_slicer.set_size(instances * self.slicer.size,
+                doslice=False)
+            self.reload_instances = True
+        else:
+            self.instance_slicer.set_size(instances, doslice=False)
+        
+    def set_rows(self, name, data, rows):
+        """Change some rows of an attribute. The system memory copy is
+        updated immediately, and the rows are flagged as dirty so that only
+        them are uploaded in `update_all_variables`."""
+        variable = self.get_variable(name)
+        # the rows are changed in a copy of the pending data if there is
+        # one, which is still the array passed by the caller
+        target = self.data_updating.get(name, None)
+        if target is not None and not isinstance(target, (RefVar,
+                DataSource)):
+            target = self.data_updating[name] = np.array(target)
+        if target is None:
+            target = variable.get('data', None)
+        if target is None or isinstance(target, (RefVar, DataSource)):
+            log_debug("Unable to update rows of attribute '%s'." % name)
+            return
+        # arrays loaded from a binary scene may be read-only views
+        if not target.flags.writeable:
+            target = variable['data'] = target.copy()
+        size = target.shape[0]
+        # data only contains the updated rows
+        target[rows,...] = data
+        # the rows are repeated in the buffers when instancing is emulated,
+        # so the whole attribute is uploaded
+        if self.emulate_instances:
+            self.data_updating[name] = target
+        elif name not in self.data_updating:
+            dirty = self.data_dirty.setdefault(name, [])
+            dirty.extend(get_row_intervals(rows, size))
+        
     def copy_texture(self, tex1, tex2):
         self.textures_to_copy.append((tex1, tex2))
         
+        
+    # Streaming methods
+    # -----------------
+    def initialize_streaming(self, bounds):
+        """Initialize the circular buffers of a streaming visual.
+        
+        In a streaming visual, each primitive (between two successive bounds)
+        is a circular buffer of `n - 1` slots followed by a guard vertex
+        which mirrors the first slot, so that the segment between the last
+        and the first slots can be rendered. All primitives share the same
+        head, which is the position of the oldest slot.
+        
+        """
+        self.streaming = self.options.get('streaming', False)
+        if not self.streaming:
+            return
+        self.stream_bounds = bounds
+        self.stream_head = 0
+        self.update_stream_bounds()
+        
+    def update_stream_bounds(self):
+        """Split every primitive at the head of the circular buffers so that
+        the newest slot is not connected to the oldest one."""
+        b0 = self.stream_bounds[:-1]
+        b1 = self.stream_bounds[1:]
+        # when the head is at 0, the guard vertex is not rendered
+        split = b0 + (self.stream_head or (b1 - b0 - 1))
+        bounds = np.vstack((b0, split)).T.ravel()
+        bounds = np.hstack((bounds, self.stream_bounds[-1]))
+        self.slicer.set_bounds(bounds.astype(np.int32))
+        
+    def append(self, **kwargs):
+        """Append rows to the circular buffers of a streaming visual.
+        Uploading does not happen here but in `append_all_variables`.
+        
+        Arguments:
+          * **kwargs: the new rows for each attribute as name:value pairs.
+            With several primitives, the rows of the first primitive come
+            first, then the rows of the second one, etc. Every primitive
+            receives the same number of rows.
+        
+        """
+        if not self.streaming:
+            raise ValueError(("Unable to append data to visual '%s' which "
+                "is not a streaming visual.") % self.visual.get('name', ''))
+        self.data_appending.append(kwargs)
+    
+    def append_attribute(self, name, data):
+        """Write rows into the circular buffers of an attribute, starting at
+        the current head. Return the number of rows written per primitive."""
+        variable = self.get_variable(name)
+        if variable is None or variable['shader_type'] != 'attribute':
+            log_debug("Attribute '%s' was not found, unable to append data." %
+                name)
+            return 0
+        att = variable['sliced_attribute']
+        olddata = variable['data']
+        if not olddata.flags.writeable:
+            olddata = variable['data'] = olddata.copy()
+        bounds = self.stream_bounds
+        nprimitives = len(bounds) - 1
+        # number of slots per circular buffer (without the guard vertex)
+        nslots = bounds[1] - bounds[0] - 1
+        data = Attribute.convert_data(data)
+        if data.ndim == 1 and olddata.ndim == 2:
+            data = data.reshape((-1, olddata.shape[1]))
+        data = data.reshape((nprimitives, -1) + data.shape[1:])
+        nrows = data.shape[1]
+        # only the last nslots rows are kept
+        if nrows > nslots:
+            data = data[:,-nslots:,...]
+            head = (self.stream_head + nrows - nslots) % nslots
+        else:
+            head = self.stream_head
+        n = data.shape[1]
+        # contiguous pieces of the circular buffer
+        n0 = min(n, nslots - head)
+        pieces = [(head, data[:,:n0,...]), (0, data[:,n0:,...])]
+        for i, b0 in enumerate(bounds[:-1]):
+            for onset, rows in pieces:
+                if not rows.shape[1]:
+                    continue
+                olddata[b0 + onset:b0 + onset + rows.shape[1],...] = rows[i]
+                if att.location >= 0:
+                    att.update_rows(rows[i], b0 + onset)
+                # update the guard vertex when the first slot is written
+                if onset == 0:
+                    olddata[b0 + nslots,...] = rows[i, 0]
+                    if att.location >= 0:
+                        att.update_rows(rows[i, :1], b0 + nslots)
+        return nrows
+        
+    def append_all_variables(self):
+        """Upload all rows that have been appended, and move the head of the
+        circular buffers accordingly."""
+        for kwargs in self.data_appending:
+            nrows = 0
+            for name, data in kwargs.iteritems():
+                nrows = self.append_attribute(name, data) or nrows
+                self.data_versions[name] = self.data_versions.get(name, 0) + 1
+            nslots = self.stream_bounds[1] - self.stream_bounds[0] - 1
+            self.stream_head = (self.stream_head + nrows) % nslots
+        if self.data_appending:
+            self.update_stream_bounds()
+        self.data_appending = []
+        
     def update_all_variables(self):
         """Upload all new data that needs to be updated."""
         # # current size, that may change following variable updating
@@ -1252,6 +2111,25 @@ class GLVisualRenderer(object):
                 log_debug("Data for variable '%s' is None" % name)
         # reset the data updating dictionary
         self.data_updating.clear()
+        if self.reload_instances:
+            self.load_instanced_attributes()
+        # upload the dirty rows
+        for name, intervals in self.data_dirty.iteritems():
+            variable = self.get_variable(name)
+            att = variable['sliced_attribute']
+            if att.location < 0:
+                continue
+            data = variable['data']
+            for onset, offset in merge_intervals(intervals):
+                att.update_rows(data[onset:offset,...], onset)
+        self.data_dirty.clear()
+        # upload the texture regions
+        for name, (row, col), data in self.texture_tiles:
+            variable = self.get_variable(name)
+            Texture.bind(variable['buffer'], variable['ndim'])
+            Texture.update_region(data, row, col,
+                floating=variable.get('floating', None))
+        self.texture_tiles = []
         
     def copy_all_textures(self):
         # copy textures
@@ -1284,14 +2162,58 @@ class GLVisualRenderer(object):
                 log_debug(("Unable to bind attribute '%s', probably because "
                 "it is not used in the shaders.") % variable['name'])
                 continue
-            variable['sliced_attribute'].bind(slice)
-            Attribute.set_attribute(loc, variable['ndim'])
+            # per-instance attributes are never sliced
+            if variable.get('divisor', 0):
+                variable['sliced_attribute'].bind(0)
+            else:
+                variable['sliced_attribute'].bind(slice)
+            # offset in vertices converted into bytes
+            offset = variable.get('offset', 0) * 4 * variable['ndim']
+            Attribute.set_attribute(loc, variable['ndim'], offset)
+            if self.instances is not None and not self.emulate_instances:
+                Attribute.set_divisor(loc, variable.get('divisor', 0))
+            
+    def unbind_attributes(self):
+        """Reset the divisors of the per-instance attributes, which are
+        part of the global state when VAOs are not used."""
+        if self.emulate_instances:
+            return
+        for variable in self.get_variables('attribute'):
+            if variable.get('divisor', 0) and variable['location'] >= 0:
+                Attribute.set_divisor(variable['location'], 0)
             
     def bind_indices(self):
         indices = self.get_variables('index')
         for variable in indices:
             Attribute.bind(variable['buffer'], index=True)
             
+    def get_vertex_arrays(self):
+        """Return the list of VAOs, one per slice, and create them if
+        needed. Each VAO records the attribute bindings of its slice (and the
+        index buffer)."""
+        if self.vaos is None:
+            if self.use_index:
+                nslices = 1
+            else:
+                nslices = len(self.slicer.slices)
+            self.vaos = []
+            for slice in xrange(nslices):
+                vao = VertexArray.create()
+                VertexArray.bind(vao)
+                self.bind_attributes(slice)
+                if self.use_index:
+                    self.bind_indices()
+                self.vaos.append(vao)
+            VertexArray.unbind()
+        return self.vaos
+            
+    def invalidate_vertex_arrays(self):
+        """Delete the VAOs, which will be created again at the next
+        rendering."""
+        if self.vaos:
+            VertexArray.delete(*self.vaos)
+        self.vaos = None
+            
     def bind_textures(self):
         """Bind all textures of the visual.
         This method is used during rendering."""
@@ -1302,11 +2224,14 @@ class GLVisualRenderer(object):
             if buffer is not None:
                 
                 # HACK: we update the sampler values here
-                if self.update_samplers and not isinstance(variable['data'], RefVar):
+                if (self.update_samplers and
+                        not isinstance(variable['data'], RefVar) and
+                        self.shader_manager.set_uniform_value(
+                            variable['location'], i)):
                     Uniform.load_scalar(variable['location'], i)
                 
                 # NEW
-                gl.glActiveTexture(getattr(gl, 'GL_TEXTURE%d' % i))
+                gl.glActiveTexture(gl.GL_TEXTURE0 + i)
                 
                 Texture.bind(buffer, variable['ndim'])
             else:
@@ -1324,30 +2249,82 @@ class GLVisualRenderer(object):
     
     # Paint methods
     # -------------
-    def paint(self):
-        """Paint the visual slice by slice."""
+    def load_uniforms(self):
+        """Load the current data of all uniforms in the program."""
+        for variable in self.get_variables('uniform'):
+            self.load_uniform(variable['name'])
+        
+    def paint(self, activate=True):
+        """Paint the visual slice by slice.
+        
+        Arguments:
+          * activate=True: whether to activate the shader program. When
+            False, the program has been activated already for a batch of
+            visuals sharing it, see `GLRenderer.paint_batch`.
+        
+        """
         # do not display non-visible visuals
         if not self.visual.get('visible', True):
             return
             
         # activate the shaders
-        try:
-            self.shader_manager.activate_shaders()
-        # if the shaders could not be successfully activated, stop the
-        # rendering immediately
-        except Exception as e:
-            log_info("Error while activating the shaders: " + str(e))
-            return
+        if activate:
+            try:
+                self.shader_manager.activate_shaders()
+            # if the shaders could not be successfully activated, stop the
+            # rendering immediately
+            except Exception as e:
+                log_info("Error while activating the shaders: " + str(e))
+                return
+        
+        # another visual may have loaded its uniforms in the shared program,
+        # only the uniforms which differ are uploaded
+        if self.shader_manager.set_user(self):
+            self.load_uniforms()
+            
+        # profiling
+        profiler = self.renderer.profiler
+        if profiler:
+            name = self.visual.get('name', '')
+            self.begin_timer_query()
+            t = profiler.time()
             
         # update all variables
         self.update_all_variables()
+        if self.streaming:
+            self.append_all_variables()
+        if profiler:
+            t = profiler.record((name, 'update'), t)
         # bind all texturex for that slice
         self.bind_textures()
+        if self.use_vao:
+            vaos = self.get_vertex_arrays()
+        if profiler:
+            t = profiler.record((name, 'bind'), t)
         # paint using indices
         if self.use_index:
-            self.bind_attributes()
-            self.bind_indices()
+            if self.use_vao:
+                VertexArray.bind(vaos[0])
+            else:
+                self.bind_attributes()
+                self.bind_indices()
             Painter.draw_indexed_arrays(self.primitive_type, self.indexsize)
+        # paint all instances of the shared mesh
+        elif self.instances is not None:
+            if self.use_vao:
+                VertexArray.bind(vaos[0])
+            else:
+                self.bind_attributes()
+            if self.instances > 0 and self.emulate_instances:
+                # one copy of the mesh per instance in the buffers
+                Painter.draw_multi_arrays(self.primitive_type, np.arange(0,
+                    (self.instances + 1) * self.slicer.size,
+                    self.slicer.size, dtype=np.int32))
+            elif self.instances > 0:
+                Painter.draw_instanced_arrays(self.primitive_type, 0,
+                    self.slicer.size, self.instances)
+            if not self.use_vao:
+                self.unbind_attributes()
         # or paint without
         elif self.use_slice:
             # draw all sliced buffers
@@ -1356,7 +2333,10 @@ class GLVisualRenderer(object):
                 slice_bounds = self.slicer.subdata_bounds[slice]
                 # print slice, slice_bounds
                 # bind all attributes for that slice
-                self.bind_attributes(slice)
+                if self.use_vao:
+                    VertexArray.bind(vaos[slice])
+                else:
+                    self.bind_attributes(slice)
                 # call the appropriate OpenGL rendering command
                 # if len(self.slicer.bounds) <= 2:
                 # print "slice bounds", slice_bounds
@@ -1365,11 +2345,44 @@ class GLVisualRenderer(object):
                         slice_bounds[1] -  slice_bounds[0])
                 else:
                     Painter.draw_multi_arrays(self.primitive_type, slice_bounds)
+        if self.use_vao:
+            VertexArray.unbind()
+        if profiler:
+            t = profiler.record((name, 'draw'), t)
         
         self.copy_all_textures()
+        if profiler:
+            t = profiler.record((name, 'copy'), t)
+            self.end_timer_query()
         
         # deactivate the shaders
-        self.shader_manager.deactivate_shaders()
+        if activate:
+            self.shader_manager.deactivate_shaders()
+        
+    def begin_timer_query(self):
+        """Start measuring the GPU time of this visual, and record the GPU
+        time of the previous frame in the profiler."""
+        if not self.renderer.use_timer_queries:
+            return
+        if self.timer_queries is None:
+            self.timer_queries = [TimerQuery.create(), TimerQuery.create()]
+            self.timer_started = [False, False]
+        # read the result of the query that was used in the previous frame
+        previous = 1 - self.timer_index
+        if self.timer_started[previous]:
+            duration = TimerQuery.get_result(self.timer_queries[previous])
+            if duration is not None:
+                self.renderer.profiler.add(
+                    (self.visual.get('name', ''), 'gpu'), duration)
+        TimerQuery.begin(self.timer_queries[self.timer_index])
+        self.timer_started[self.timer_index] = True
+        
+    def end_timer_query(self):
+        """Stop measuring the GPU time of this visual."""
+        if not self.renderer.use_timer_queries:
+            return
+        TimerQuery.end()
+        self.timer_index = 1 - self.timer_index
 
 
     # Cleanup methods
@@ -1382,6 +2395,13 @@ class GLVisualRenderer(object):
     def cleanup_texture(self, name):
         """Cleanup a texture."""
         variable = self.get_variable(name)
+        # shared textures are deleted when no other visual uses them
+        cached = TEXTURE_CACHE.get(variable.get('shared_key', None), None)
+        if cached is not None and cached[0] == variable['buffer']:
+            cached[2] -= 1
+            if cached[2] > 0:
+                return
+            del TEXTURE_CACHE[variable['shared_key']]
         Texture.delete(variable['buffer'])
         
     def cleanup(self):
@@ -1391,6 +2411,10 @@ class GLVisualRenderer(object):
             shader_type = variable['shader_type']
             if shader_type in ('attribute', 'texture'):
                 getattr(self, 'cleanup_%s' % shader_type)(variable['name'])
+        self.invalidate_vertex_arrays()
+        if self.timer_queries:
+            TimerQuery.delete(*self.timer_queries)
+            self.timer_queries = None
         # clean up shaders
         self.shader_manager.cleanup()
         
@@ -1416,7 +2440,12 @@ class GLRenderer(object):
         """
         self.scene = scene
         self.viewport = (1., 1.)
+        self.window_size = None
         self.visual_renderers = {}
+        self.use_vao = False
+        # profiler, only when the 'profile' renderer option is set
+        self.profiler = None
+        self.use_timer_queries = False
     
     def set_renderer_options(self):
         """Set the OpenGL options."""
@@ -1487,6 +2516,7 @@ class GLRenderer(object):
           * **kwargs: the data to update as name:value pairs. name can be
             any field of the visual, plus one of the following keywords:
               * size: the size of the visual,
+              * instances: the number of instances of an instanced visual,
               * primitive_type: the GL primitive type,
               * constrain_ratio: whether to constrain the ratio of the visual,
               * constrain_navigation: whether to constrain the navigation,
@@ -1496,8 +2526,32 @@ class GLRenderer(object):
         if name in self.visual_renderers:
             self.visual_renderers[name].set_data(**kwargs)
         
+    def append(self, name, **kwargs):
+        """Append rows to the circular buffers of a streaming visual. Only
+        the new rows are uploaded, in `paint`.
+        
+        Arguments:
+          * visual: the name of the visual as a string.
+          * **kwargs: the new rows as name:value pairs.
+        
+        """
+        if name in self.visual_renderers:
+            self.visual_renderers[name].append(**kwargs)
+        
     def copy_texture(self, name, tex1, tex2):
         self.visual_renderers[name].copy_texture(tex1, tex2)
+        
+    def invalidate_variables(self, name=None):
+        """Forget the lookup tables of the variables of a visual (or of all
+        visuals by default), to be called when its list of variables
+        changes."""
+        if name is None:
+            names = self.visual_renderers.keys()
+        else:
+            names = [name]
+        for name in names:
+            if name in self.visual_renderers:
+                self.visual_renderers[name].invalidate_variables()
     
         
     # Rendering methods
@@ -1510,6 +2564,25 @@ class GLRenderer(object):
                 log_debug(key + ": " + value)
         # initialize the renderer options using the options set in the Scene
         self.set_renderer_options()
+        # driver limits used to slice the buffers
+        self.max_elements_vertices = GLVersion.get_max_elements_vertices()
+        self.free_memory = GLVersion.get_free_memory()
+        log_debug("Max elements vertices: %s, free memory: %s" % (
+            self.max_elements_vertices, self.free_memory))
+        # use VAOs when they are supported, unless deactivated explicitely
+        vao = self.get_renderer_option('vao')
+        self.use_vao = (vao is None or vao) and VertexArray.is_supported()
+        # without instancing (not supported, or deactivated explicitely),
+        # instanced visuals repeat their mesh
+        instancing = self.get_renderer_option('instancing')
+        self.use_instancing = ((instancing is None or instancing) and
+            Instancing.is_supported())
+        if not self.use_instancing:
+            log_debug("Instanced rendering is not supported by the driver.")
+        # profiling
+        if self.get_renderer_option('profile'):
+            self.profiler = FrameProfiler()
+            self.use_timer_queries = TimerQuery.is_supported()
         # create the VisualRenderer objects
         self.visual_renderers = OrderedDict()
         for visual in self.get_visuals():
@@ -1523,6 +2596,20 @@ class GLRenderer(object):
             if fbos:
                 self.fbos.extend([fbo['buffer'] for fbo in fbos])
             
+    def add_visual(self, visual):
+        """Create the renderer of a visual which has been added in the
+        scene after initialization (deferred visual, see
+        `SceneCreator.update_visuals`)."""
+        name = visual['name']
+        self.visual_renderers[name] = GLVisualRenderer(self, visual)
+        fbos = self.visual_renderers[name].get_variables('framebuffer')
+        if fbos:
+            self.fbos.extend([fbo['buffer'] for fbo in fbos])
+        # the renderer may have been resized already
+        if self.window_size is not None:
+            self.set_data(name, viewport=self.viewport,
+                window_size=self.window_size)
+            
     def clear(self):
         """Clear the scene."""
         # clear the buffer (and depth buffer is 3D is activated)
@@ -1531,14 +2618,84 @@ class GLRenderer(object):
         else:
             gl.glClear(gl.GL_COLOR_BUFFER_BIT)
         
+    def get_profile_stats(self):
+        """Return the profiling statistics, as a dictionary
+        `{(visual, step): (last, mean, max)}` with durations in milliseconds.
+        The steps are 'update', 'bind', 'draw', 'copy' (CPU time) and 'gpu'
+        (GPU time, when timer queries are supported). The total CPU time
+        of the frame has the key ('frame', 'cpu').
+        
+        """
+        if self.profiler is None:
+            return {}
+        return self.profiler.get_stats()
+        
     def paint(self):
         """Paint the scene."""
+        if self.profiler:
+            t = self.profiler.time()
+            self.paint_scene()
+            self.profiler.record(('frame', 'cpu'), t)
+        else:
+            self.paint_scene()
+        
+    def get_render_queue(self, visual_renderers):
+        """Group visual renderers into batches of successive renderers
+        sharing the same shader program.
+        
+        With the renderer option `sort_visuals`, the renderers are first
+        sorted by program (stable sort on the first occurrence of every
+        program), which minimizes the number of batches but changes the
+        drawing order of visuals using different programs.
+        
+        Returns:
+          * batches: a list of lists of visual renderers.
+        
+        """
+        if self.get_renderer_option('sort_visuals'):
+            order = {}
+            for vr in visual_renderers:
+                order.setdefault(vr.shader_manager.program, len(order))
+            visual_renderers = sorted(visual_renderers,
+                key=lambda vr: order[vr.shader_manager.program])
+        batches = []
+        for vr in visual_renderers:
+            if (batches and batches[-1][0].shader_manager.program ==
+                    vr.shader_manager.program):
+                batches[-1].append(vr)
+            else:
+                batches.append([vr])
+        return batches
+        
+    def paint_batch(self, batch):
+        """Paint a batch of visual renderers sharing the same program,
+        which is activated only once."""
+        batch = [vr for vr in batch if vr.visual.get('visible', True)]
+        if not batch:
+            return
+        shader_manager = batch[0].shader_manager
+        try:
+            shader_manager.activate_shaders()
+        except Exception as e:
+            log_info("Error while activating the shaders: " + str(e))
+            return
+        for visual_renderer in batch:
+            visual_renderer.paint(activate=False)
+        shader_manager.deactivate_shaders()
+        
+    def paint_visuals(self, visual_renderers):
+        """Paint visual renderers in the current frame buffer, in batches
+        of visuals sharing the same program."""
+        for batch in self.get_render_queue(visual_renderers):
+            self.paint_batch(batch)
+        
+    def paint_scene(self):
+        """Paint all visuals, possibly in several frame buffers."""
         
         # non-FBO rendering
         if not self.fbos:
             self.clear()
-            for name, visual_renderer in self.visual_renderers.iteritems():
-                visual_renderer.paint()
+            self.paint_visuals(self.visual_renderers.values())
         
         
         # render each FBO separately, then non-VBO
@@ -1553,20 +2710,18 @@ class GLRenderer(object):
                 self.clear()
                 
                 # paint all visual renderers
-                for name, visual_renderer in self.visual_renderers.iteritems():
-                    if visual_renderer.framebuffer == ifbo:
-                        # print ifbo, visual_renderer
-                        visual_renderer.paint()
+                self.paint_visuals([vr for vr in
+                    self.visual_renderers.itervalues()
+                    if vr.framebuffer == ifbo])
     
             # finally, paint screen
             FrameBuffer.unbind()
     
             # render screen (non-FBO) visuals
             self.clear()
-            for name, visual_renderer in self.visual_renderers.iteritems():
-                if visual_renderer.framebuffer == 'screen':
-                    # print "screen", visual_renderer
-                    visual_renderer.paint()
+            self.paint_visuals([vr for vr in
+                self.visual_renderers.itervalues()
+                if vr.framebuffer == 'screen'])
         
             # print
         
@@ -1589,6 +2744,7 @@ class GLRenderer(object):
         self.viewport = x, y
         width = float(width)
         height = float(height)
+        self.window_size = (width, height)
         # update the viewport and window size for all visuals
         for visual in self.get_visuals():
             self.set_data(visual['name'],
@@ -0,0 +1,222 @@
+import numpy as np
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+__all__ = ['ImagePyramid', 'TileCache']
+
+class ImagePyramid(object):
+    """Multi-resolution pyramid of fixed-size tiles of a large image.
+
+    The level k contains the image downsampled by a factor 2^k, and it is
+    cut into square tiles of `tile_size` pixels. Each pixel of a level is
+    the average of a 2x2 block of the level below. The tiles are computed
+    on demand from the source, which is never loaded in memory as a whole:
+    it can be an array, a `np.memmap`, or any object with a `shape` and
+    supporting slicing (e.g. a HDF5 dataset). The top level contains a
+    single tile.
+
+    """
+    def __init__(self, source, tile_size=256, cache_size=64):
+        """Create the pyramid.
+
+        Arguments:
+          * source: a `(height, width)` or `(height, width, ncomponents)`
+            image, with values in [0, 1] or uint8 values.
+          * tile_size=256: the size of the tiles, in pixels.
+          * cache_size=64: the number of downsampled tiles kept in memory,
+            so that the tiles of the upper levels are not computed again
+            from the whole source.
+
+        """
+        self.source = source
+        self.tile_size = tile_size
+        self.height, self.width = source.shape[:2]
+        if len(source.shape) == 2:
+            # grayscale images are converted into RGB tiles
+            self.ncomponents = 3
+        else:
+            self.ncomponents = source.shape[2]
+        self.dtype = np.uint8 if source.dtype == np.uint8 else np.float32
+        size = max(self.height, self.width)
+        self.nlevels = max(1, int(np.ceil(np.log2(size / float(tile_size))))
+            + 1)
+        # key => unpadded data of the tiles above the level 0, in least
+        # recently used order
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_tile_count(self, level):
+        """Return the number of tiles in rows and columns at a level."""
+        n = self.tile_size << level
+        return ((self.height + n - 1) // n, (self.width + n - 1) // n)
+
+    def read_tile(self, i, j):
+        """Read the data of a tile of the level 0 in the source."""
+        n = self.tile_size
+        data = self.source[i * n:(i + 1) * n, j * n:(j + 1) * n,...]
+        data = np.asarray(data, dtype=self.dtype)
+        if data.ndim == 2:
+            data = np.repeat(data.reshape(data.shape + (1,)), 3, axis=2)
+        return data
+
+    def downsample(self, data):
+        """Average the 2x2 blocks of an image. With an odd size, the last
+        row or column is averaged with itself."""
+        data = data.astype(np.float32)
+        if data.shape[0] % 2:
+            data = np.concatenate((data, data[-1:,...]), axis=0)
+        if data.shape[1] % 2:
+            data = np.concatenate((data, data[:,-1:,...]), axis=1)
+        data = .25 * (data[::2,::2,...] + data[1::2,::2,...] +
+                      data[::2,1::2,...] + data[1::2,1::2,...])
+        if self.dtype == np.uint8:
+            data = np.round(data)
+        return data.astype(self.dtype)
+
+    def get_data(self, key):
+        """Return the data of a tile, without padding. The tiles above the
+        level 0 are computed from the four tiles below them."""
+        level, i, j = key
+        if level == 0:
+            return self.read_tile(i, j)
+        with self.lock:
+            data = self.cache.pop(key, None)
+            if data is not None:
+                # mark as recently used
+                self.cache[key] = data
+                return data
+        nrows, ncols = self.get_tile_count(level - 1)
+        rows = [np.concatenate([self.get_data((level - 1, i2, j2))
+            for j2 in xrange(2 * j, min(2 * j + 2, ncols))], axis=1)
+                for i2 in xrange(2 * i, min(2 * i + 2, nrows))]
+        data = self.downsample(np.concatenate(rows, axis=0))
+        with self.lock:
+            self.cache[key] = data
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return data
+
+    def get_tile(self, key):
+        """Return the data of a tile as a `(tile_size, tile_size,
+        ncomponents)` array. Tiles on the bottom and right edges are padded
+        with zeros.
+
+        Arguments:
+          * key: a tuple `(level, i, j)` where i, j are the row and column
+            of the tile in the level.
+
+        """
+        data = self.get_data(key)
+        tile = np.zeros((self.tile_size, self.tile_size, self.ncomponents),
+            dtype=self.dtype)
+        tile[:data.shape[0], :data.shape[1], :] = data
+        return tile
+
+    def get_level(self, box, npixels):
+        """Return the level to display a region of the image.
+
+        Arguments:
+          * box: `(col0, row0, col1, row1)` the visible region, in pixels of
+            the full-resolution image.
+          * npixels: the width of this region on the screen, in pixels.
+
+        """
+        col0, row0, col1, row1 = box
+        ratio = (col1 - col0) / float(max(npixels, 1))
+        if ratio <= 1:
+            return 0
+        return int(min(np.round(np.log2(ratio)), self.nlevels - 1))
+
+    def get_visible_tiles(self, level, box):
+        """Return the keys of the tiles of a level intersecting a region
+        `(col0, row0, col1, row1)` of the full-resolution image."""
+        n = float(self.tile_size << level)
+        nrows, ncols = self.get_tile_count(level)
+        col0, row0, col1, row1 = box
+        i0, i1 = max(0, int(row0 // n)), min(nrows - 1, int(np.ceil(row1 / n)) - 1)
+        j0, j1 = max(0, int(col0 // n)), min(ncols - 1, int(np.ceil(col1 / n)) - 1)
+        return [(level, i, j) for i in xrange(i0, i1 + 1)
+            for j in xrange(j0, j1 + 1)]
+
+    def get_tile_box(self, key):
+        """Return the region `(col0, row0, col1, row1)` covered by a tile, in
+        pixels of the full-resolution image."""
+        level, i, j = key
+        n = self.tile_size << level
+        return (j * n, i * n, (j + 1) * n, (i + 1) * n)
+
+
+class TileCache(object):
+    """Cache of tiles in a fixed number of texture slots.
+
+    Missing tiles are read and downsampled in background threads. The slots
+    are recycled in least recently used order, except the slots of the
+    tiles which are currently displayed.
+
+    """
+    def __init__(self, pyramid, nslots, nthreads=None):
+        self.pyramid = pyramid
+        self.nslots = nslots
+        # key => slot, in least recently used order
+        self.slots = OrderedDict()
+        # key => async result of the tiles being decoded
+        self.decoding = {}
+        self.pool = ThreadPool(nthreads or 2)
+
+    def is_pending(self):
+        """Return whether tiles are being decoded."""
+        return bool(self.decoding)
+
+    def get_free_slot(self, protected):
+        """Return a free slot, or the least recently used slot which does not
+        contain a protected tile, or None."""
+        if len(self.slots) < self.nslots:
+            used = set(self.slots.itervalues())
+            return [slot for slot in xrange(self.nslots)
+                if slot not in used][0]
+        for key in self.slots:
+            if key not in protected:
+                return self.slots.pop(key)
+        return None
+
+    def update(self, keys):
+        """Request the tiles with the given keys.
+
+        Arguments:
+          * keys: the list of keys `(level, i, j)` of the requested tiles.
+
+        Returns:
+          * slots: a dictionary `{key: slot}` of the requested tiles
+            available in the slots.
+          * uploads: a list of `(slot, data)` of the tiles which need to be
+            uploaded in their slots.
+
+        """
+        protected = set(keys)
+        slots = {}
+        uploads = []
+        for key in keys:
+            if key in self.slots:
+                # mark as recently used
+                slots[key] = self.slots.pop(key)
+                self.slots[key] = slots[key]
+            elif key not in self.decoding:
+                self.decoding[key] = self.pool.apply_async(
+                    self.pyramid.get_tile, (key,))
+        # decoded tiles
+        for key, result in self.decoding.items():
+            if not result.ready():
+                continue
+            del self.decoding[key]
+            # tiles which are not visible anymore are dropped
+            if key not in protected:
+                continue
+            slot = self.get_free_slot(protected)
+            if slot is None:
+                continue
+            self.slots[key] = slots[key] = slot
+            # raise the exception raised in the thread, if any
+            uploads.append((slot, result.get()))
+        return slots, uploads
@@ -1,9 +1,11 @@
 import numpy as np
-from galry.processors import NavigationEventProcessor
+from galry.processors import NavigationEventProcessor, \
+    DecimationEventProcessor, TiledImageEventProcessor, \
+    PickingEventProcessor, SelectionEventProcessor
 from default_manager import DefaultPaintManager, DefaultInteractionManager, \
     DefaultBindings
 from galry import GridEventProcessor, RectanglesVisual, GridVisual, Bindings, \
-    DataNormalizer
+    DataNormalizer, PlotVisual, DataSource, NormalizedSource
 
 
 class PlotPaintManager(DefaultPaintManager):
@@ -17,12 +19,55 @@ class PlotPaintManager(DefaultPaintManager):
                         name='navigation_rectangle',
                         visible=False)
         
+        # Outline of the box or lasso selection
+        self.add_visual(PlotVisual, position=np.zeros((2, 2)),
+                        color=self.navigation_rectangle_color,
+                        is_static=True,
+                        pickable=False,
+                        autonormalizable=False,
+                        name='selection_outline',
+                        visible=False)
+        
         # Grid
         if self.parent.activate_grid:
             # show_grid = self.parent.show_grid
             # show_grid = getattr(self.parent, 'show_grid', False)
             self.add_visual(GridVisual, name='grid', visible=False)
 
+    def get_autonormalizable_variables(self, visual):
+        """Return the autonormalizable attributes of a visual dictionary,
+        with 2D arrays or lazy sources as data."""
+        vars = visual['variables']
+        attrs = [var for var in vars if var['shader_type'] == 'attribute']
+        return [attr for attr in attrs if 'data' in attr and \
+            isinstance(attr['data'], (np.ndarray, DataSource)) and \
+            attr['data'].size > 0 and attr['data'].ndim == 2 and \
+            attr.get('autonormalizable', None)]
+        
+    def get_data_bounds(self, data):
+        """Return the bounds `(x0, y0, x1, y1)` of a 2D array or of a lazy
+        source, which is read by chunks."""
+        if isinstance(data, DataSource):
+            (x0, y0), (x1, y1) = [b[:2] for b in data.get_bounds()]
+        else:
+            x0, x1 = data[:,0].min(), data[:,0].max()
+            y0, y1 = data[:,1].min(), data[:,1].max()
+        return x0, y0, x1, y1
+        
+    def normalize_data(self, data):
+        """Normalize a 2D array in place."""
+        data[:,0] = self.normalizer.normalize_x(data[:,0])
+        data[:,1] = self.normalizer.normalize_y(data[:,1])
+        
+    def normalize_variable(self, variable):
+        """Normalize the data of an attribute. Lazy sources are normalized
+        when their rows are read."""
+        data = variable['data']
+        if isinstance(data, DataSource):
+            variable['data'] = NormalizedSource(data, self.normalizer)
+        else:
+            self.normalize_data(data)
+        
     def finalize(self):
         if not hasattr(self, 'normalization_viewbox'):
             self.normalization_viewbox = (None,) * 4
@@ -34,16 +79,12 @@ class PlotPaintManager(DefaultPaintManager):
         nx1 = xmax is None
         ny0 = ymin is None
         ny1 = ymax is None
-        alldata = []
+        allvariables = []
         for visual in visuals:
-            vars = visual['variables']
-            attrs = [var for var in vars if var['shader_type'] == 'attribute']
-            datalist = [attr['data'] for attr in attrs if 'data' in attr and \
-                isinstance(attr['data'], np.ndarray) and \
-                attr['data'].size > 0 and attr['data'].ndim == 2 and \
-                attr.get('autonormalizable', None)]
-            alldata.extend(datalist)
-            for data in datalist:
+            variables = self.get_autonormalizable_variables(visual)
+            allvariables.extend(variables)
+            for variable in variables:
+                x0, y0, x1, y1 = self.get_data_bounds(variable['data'])
                 # print visual['name'], data.shape
                 # continue
                 # if xmin is None:
@@ -51,28 +92,23 @@ class PlotPaintManager(DefaultPaintManager):
                 # else:
                     # x0 = xmin
                 if nx0:
-                    x0 = data[:,0].min()
                     if xmin is None:
                         xmin = x0
                     else:
                         xmin = min(xmin, x0)
                         
                 if nx1:
-                    x1 = data[:,0].max()
                     if xmax is None:
                         xmax = x1
                     else:
                         xmax = max(xmax, x1)
                         
                 if ny0:
-                    y0 = data[:,1].min()
                     if ymin is None:
                         ymin = y0
                     else:
                         ymin = min(ymin, y0)
                 if ny1:
-                    
-                    y1 = data[:,1].max()
                     if ymax is None:
                         ymax = y1
                     else:
@@ -82,13 +118,38 @@ class PlotPaintManager(DefaultPaintManager):
                 # print x0, y0, x1, y1
         # print xmin, ymin, xmax, ymax
         self.normalization_viewbox = (xmin, ymin, xmax, ymax)
-        normalizer = DataNormalizer()
-        normalizer.normalize(self.normalization_viewbox)
-        tr_x = normalizer.normalize_x
-        tr_y = normalizer.normalize_y
-        for data in alldata:
-            data[:,0] = tr_x(data[:,0])
-            data[:,1] = tr_y(data[:,1])
+        # the normalizer is kept for the deferred visuals and appended rows
+        self.normalizer = DataNormalizer()
+        self.normalizer.normalize(self.normalization_viewbox)
+        for variable in allvariables:
+            self.normalize_variable(variable)
+            
+    def normalize_visual(self, visual):
+        # deferred visuals are created after finalize, and use the same
+        # normalization as the other visuals
+        if not hasattr(self, 'normalizer'):
+            return
+        for variable in self.get_autonormalizable_variables(visual):
+            self.normalize_variable(variable)
+            
+    def normalize_appended(self, visual, kwargs):
+        if not hasattr(self, 'normalizer'):
+            return kwargs
+        dic = self.get_visual(visual)
+        if dic is None:
+            return kwargs
+        names = [var['name'] for var in dic['variables']
+            if var['shader_type'] == 'attribute' and
+               var.get('autonormalizable', None)]
+        kwargs = kwargs.copy()
+        for name in names:
+            if name in kwargs:
+                # the rows given by the caller are not modified
+                data = np.array(kwargs[name], dtype=np.float32)
+                if data.ndim == 2:
+                    self.normalize_data(data)
+                kwargs[name] = data
+        return kwargs
             
 
 class PlotInteractionManager(DefaultInteractionManager):
@@ -103,6 +164,10 @@ class PlotInteractionManager(DefaultInteractionManager):
             momentum=momentum,
             name='navigation')
         self.add_processor(GridEventProcessor, name='grid')#, activated=False)
+        self.add_processor(DecimationEventProcessor, name='decimation')
+        self.add_processor(TiledImageEventProcessor, name='tiledimage')
+        self.add_processor(PickingEventProcessor, name='picking')
+        self.add_processor(SelectionEventProcessor, name='selection')
         
         
 class PlotBindings(DefaultBindings):
@@ -201,6 +266,20 @@ class PlotBindings(DefaultBindings):
              0, # p["pinch_start_position"][1],
              ))
 
+    def set_selection_mouse(self):
+        """Set selection bindings with the mouse."""
+        # Box selection: SHIFT + left button mouse
+        self.set('LeftClickMove', 'SelectBox',
+                    key_modifier='Shift',
+                    param_getter=lambda p: (p["mouse_press_position"][0],
+                                            p["mouse_press_position"][1],
+                                            p["mouse_position"][0],
+                                            p["mouse_position"][1]))
+        # Lasso selection: ALT + left button mouse
+        self.set('LeftClickMove', 'SelectLasso',
+                    key_modifier='Alt',
+                    param_getter=lambda p: p["mouse_position"])
+        
     def set_reset(self):
         """Set reset bindings."""
         # Reset view
@@ -223,6 +302,8 @@ class PlotBindings(DefaultBindings):
         self.set_zooming_keyboard()
         self.set_zooming_wheel()
         self.set_zooming_pinch()
+        # selection
+        self.set_selection_mouse()
         # reset
         self.set_reset()
         # Extended bindings
@@ -0,0 +1,209 @@
+"""Headless offscreen rendering, without any window or Qt widget.
+
+The scene is rendered with a `GLRenderer` in an offscreen OpenGL context
+created with EGL (pbuffer surface) or OSMesa (software rendering). PyOpenGL
+needs to know which platform to use *before* `OpenGL.GL` is imported, so the
+environment variable `PYOPENGL_PLATFORM` must be set to `egl` or `osmesa`
+before importing galry, for instance:
+
+    import os
+    os.environ['PYOPENGL_PLATFORM'] = 'osmesa'
+    from galry import *
+    scene = SceneCreator()
+    scene.add_visual(PlotVisual, x=x, y=y)
+    image = render_to_array(scene.get_scene(), size=(200, 200))
+
+"""
+import os
+import numpy as np
+from galry import log_debug, GLRenderer, deserialize
+
+__all__ = ['OffscreenContext', 'render_to_array']
+
+
+def get_default_backend():
+    """Return the offscreen backend specified in PYOPENGL_PLATFORM, or
+    None."""
+    platform = os.environ.get('PYOPENGL_PLATFORM', '').lower()
+    if platform in ('egl', 'osmesa'):
+        return platform
+    return None
+
+
+class OffscreenContext(object):
+    """An offscreen OpenGL context with a fixed size.
+
+    A single context can be used to render many scenes of the same size,
+    which avoids the cost of creating a context for every image.
+
+    """
+    def __init__(self, size=(600, 600), backend=None):
+        """Create the context and make it current.
+
+        Arguments:
+          * size=(600, 600): the size of the image as (width, height).
+          * backend=None: 'egl' or 'osmesa'. By default, the value of the
+            PYOPENGL_PLATFORM environment variable. A RuntimeError is raised
+            if this variable is not set, or if it does not match `backend`.
+
+        """
+        self.width, self.height = size
+        platform = get_default_backend()
+        if backend is None:
+            backend = platform
+        if backend is None:
+            raise RuntimeError("No offscreen backend specified: set the "
+                "PYOPENGL_PLATFORM environment variable to 'egl' or 'osmesa' "
+                "before importing galry.")
+        if backend not in ('egl', 'osmesa'):
+            raise ValueError("The offscreen backend must be 'egl' or "
+                "'osmesa', not '%s'." % backend)
+        # PyOpenGL binds OpenGL.GL to a platform when it is first imported,
+        # so the context must be created with that same platform
+        if backend != platform:
+            raise RuntimeError("The offscreen backend '%s' does not match "
+                "PYOPENGL_PLATFORM=%s: set PYOPENGL_PLATFORM to '%s' before "
+                "importing galry." % (backend,
+                    os.environ.get('PYOPENGL_PLATFORM', ''), backend))
+        try:
+            getattr(self, 'create_%s' % backend)()
+        except Exception as e:
+            raise RuntimeError("Unable to create an offscreen OpenGL "
+                "context with %s (%s)." % (backend, str(e)))
+        self.backend = backend
+        log_debug("Offscreen context created with %s." % backend)
+
+
+    # Context creation methods
+    # ------------------------
+    def create_egl(self):
+        """Create an EGL context with a pbuffer surface."""
+        from OpenGL import EGL
+        import ctypes
+        self.egl = EGL
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(display, ctypes.pointer(major),
+                                 ctypes.pointer(minor)):
+            raise RuntimeError("eglInitialize failed")
+        config_attributes = [
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RED_SIZE, 8,
+            EGL.EGL_GREEN_SIZE, 8,
+            EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_ALPHA_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE,
+        ]
+        config_attributes = (EGL.EGLint * len(config_attributes))(
+            *config_attributes)
+        config = EGL.EGLConfig()
+        nconfigs = EGL.EGLint()
+        if not EGL.eglChooseConfig(display, config_attributes,
+                ctypes.pointer(config), 1, ctypes.pointer(nconfigs)) or \
+                not nconfigs.value:
+            raise RuntimeError("eglChooseConfig failed")
+        surface_attributes = [
+            EGL.EGL_WIDTH, self.width,
+            EGL.EGL_HEIGHT, self.height,
+            EGL.EGL_NONE,
+        ]
+        surface_attributes = (EGL.EGLint * len(surface_attributes))(
+            *surface_attributes)
+        surface = EGL.eglCreatePbufferSurface(display, config,
+            surface_attributes)
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT,
+            None)
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            raise RuntimeError("eglMakeCurrent failed")
+        self.display, self.surface, self.context = display, surface, context
+
+    def create_osmesa(self):
+        """Create an OSMesa context rendering in system memory."""
+        from OpenGL import osmesa, arrays
+        import OpenGL.GL as gl
+        self.osmesa = osmesa
+        context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0,
+            None)
+        if not context:
+            raise RuntimeError("OSMesaCreateContextExt failed")
+        self.buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        if not osmesa.OSMesaMakeCurrent(context, self.buffer,
+                gl.GL_UNSIGNED_BYTE, self.width, self.height):
+            raise RuntimeError("OSMesaMakeCurrent failed")
+        self.context = context
+
+
+    # Rendering methods
+    # -----------------
+    def read_pixels(self):
+        """Return the current content of the framebuffer as a
+        (height, width, 4) uint8 array, with the top row first."""
+        import OpenGL.GL as gl
+        gl.glFinish()
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        data = gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA,
+            gl.GL_UNSIGNED_BYTE)
+        if not isinstance(data, np.ndarray):
+            data = np.frombuffer(data, dtype=np.uint8)
+        image = data.reshape((self.height, self.width, 4))
+        # OpenGL rows start at the bottom
+        return image[::-1,...].copy()
+
+    def render(self, scene):
+        """Render a scene and return the image.
+
+        Arguments:
+          * scene: a scene dictionary (e.g. `SceneCreator.get_scene()`), or
+            its JSON or binary serialization.
+
+        Returns:
+          * image: a (height, width, 4) uint8 array.
+
+        """
+        if isinstance(scene, (basestring, bytearray)):
+            scene = deserialize(scene)
+        renderer = GLRenderer(scene)
+        renderer.initialize()
+        renderer.resize(self.width, self.height)
+        try:
+            renderer.paint()
+            image = self.read_pixels()
+        finally:
+            renderer.cleanup()
+        return image
+
+    def close(self):
+        """Destroy the context."""
+        if self.backend == 'egl':
+            EGL = self.egl
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE,
+                EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self.display, self.surface)
+            EGL.eglDestroyContext(self.display, self.context)
+        elif self.backend == 'osmesa':
+            self.osmesa.OSMesaDestroyContext(self.context)
+        self.context = None
+
+
+def render_to_array(scene, size=(600, 600), backend=None):
+    """Render a scene offscreen and return a NumPy image.
+
+    Arguments:
+      * scene: a scene dictionary (e.g. `SceneCreator.get_scene()`), or its
+        JSON or binary serialization.
+      * size=(600, 600): the size of the image as (width, height).
+      * backend=None: 'egl' or 'osmesa', see `OffscreenContext`.
+
+    Returns:
+      * image: a (height, width, 4) uint8 array.
+
+    """
+    context = OffscreenContext(size=size, backend=backend)
+    try:
+        return context.render(scene)
+    finally:
+        context.close()
+
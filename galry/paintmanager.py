@@ -1,11 +1,16 @@
 import numpy as np
 import OpenGL.GL as gl
+from qtools.qtpy import QtCore
 from galry import log_debug, log_info, log_warn, get_color, GLRenderer, \
     Manager, TextVisual, RectanglesVisual, SceneCreator, serialize, \
     GridVisual
 
 __all__ = ['PaintManager']
 
+# Interval in milliseconds between two checks of the deferred visuals which
+# are being created.
+DEFERRED_INTERVAL = 20
+
 
 # PaintManager class
 # ------------------                   
@@ -27,6 +32,9 @@ class PaintManager(Manager):
         self.scene_creator = SceneCreator(
                     constrain_ratio=self.parent.constrain_ratio)
         self.data_updating = {}
+        self.data_appending = []
+        # whether the scene has changed since the last rendering
+        self.dirty = True
         
     def set_rendering_options(self, **kwargs):
         """Set rendering options in the scene."""
@@ -38,8 +46,9 @@ class PaintManager(Manager):
     def initialize_default(self, **kwargs):
         # FPS
         if self.parent.display_fps:
+            # the interline separates the lines of the profiling summary
             self.add_visual(TextVisual, text='FPS: 000', name='fps',
-                            fontsize=18,
+                            fontsize=18, interline=48.,
                             coordinates=(-.80, .92),
                             visible=False,
                             is_static=True)
@@ -97,6 +106,7 @@ class PaintManager(Manager):
         data_updating0 = {}
         special_keywords = ['visible',
                             'size',
+                            'instances',
                             'bounds',
                             'primitive_type',
                             'constrain_ratio',
@@ -111,6 +121,9 @@ class PaintManager(Manager):
         visual.initialize(**kwargs)
         # call finalize again in the visual
         visual.finalize()
+        # the variables of the visual may have changed
+        if hasattr(self, 'renderer'):
+            self.renderer.invalidate_variables(name)
         # retrieve the updated data for all variables
         data_updating.update(visual.get_data_updating())
         # keywords given here in kwargs have higher priority than those in
@@ -174,31 +187,74 @@ class PaintManager(Manager):
           * visual=None: the relevant visual. By default, the first one
             that has been created in `initialize`.
           * **kwargs: keyword arguments as `visual_field_name: value` pairs.
+            The special keyword `rows` (a slice or an array of indices)
+            restricts the update of the attributes to these rows: the
+            attributes then only contain the data of these rows.
         
         """
         # default name
         if visual is None:
             visual = 'visual0'
+        self.dirty = True
         # if this method is called in initialize (the renderer is then not
         # defined) we save the data to be updated later
         # print hasattr(self, 'renderer'), kwargs
         if not hasattr(self, 'renderer'):
             self.data_updating[visual] = kwargs
+        # same thing if the visual is deferred and not created yet
+        elif self.scene_creator.is_pending(visual):
+            self.data_updating.setdefault(visual, {}).update(**kwargs)
         else:
             self.renderer.set_data(visual, **kwargs)
             # empty data_updating
             if visual in self.data_updating:
                 self.data_updating[visual] = {}
     
+    def append(self, visual=None, **kwargs):
+        """Append rows to a streaming visual (e.g. a `PlotVisual` created
+        with `streaming=True`). Only the new rows are uploaded on the GPU,
+        during the rendering process.
+        
+        Arguments:
+          * visual=None: the relevant visual. By default, the first one
+            that has been created in `initialize`.
+          * **kwargs: the new rows as `visual_field_name: value` pairs.
+        
+        """
+        # default name
+        if visual is None:
+            visual = 'visual0'
+        self.dirty = True
+        # if this method is called in initialize, we save the data to be
+        # appended later
+        if (not hasattr(self, 'renderer') or
+                self.scene_creator.is_pending(visual)):
+            self.data_appending.append((visual, kwargs))
+        else:
+            self.renderer.append(visual,
+                **self.normalize_appended(visual, kwargs))
+    
     def copy_texture(self, tex1, tex2, visual=None):
         # default name
         if visual is None:
             visual = 'visual0'
+        self.dirty = True
         self.renderer.copy_texture(visual, tex1, tex2)
     
     def update_fps(self, fps):
         """Update the FPS in the corresponding text visual."""
-        self.set_data(visual='fps', text="FPS: %03d" % fps, visible=True)
+        text = "FPS: %03d" % fps
+        # show the most expensive rendering steps when profiling
+        profiler = getattr(getattr(self, 'renderer', None), 'profiler', None)
+        if profiler:
+            text += "\n" + profiler.get_text(n=5)
+        self.set_data(visual='fps', text=text, visible=True)
+        
+    def get_profile_stats(self):
+        """Return the rendering profiling statistics."""
+        if not hasattr(self, 'renderer'):
+            return {}
+        return self.renderer.get_profile_stats()
  
  
     # Rendering methods
@@ -209,20 +265,63 @@ class PaintManager(Manager):
         self.initialize_default()
         # finalize
         self.finalize()
-        # initialize the renderer
-        self.renderer = GLRenderer(self.scene_creator.get_scene())
+        # initialize the renderer, the deferred visuals which are not
+        # created yet are added later in update_visuals
+        self.get_deferred_visuals()
+        self.renderer = GLRenderer(self.scene_creator.scene)
         self.renderer.initialize()
         # update the variables (with set_data in paint_manager.initialize())
         # after initialization
-        for visual, kwargs in self.data_updating.iteritems():
-            self.set_data(visual=visual, **kwargs)
+        self.update_data(self.renderer.visual_renderers.keys())
+        
+    def update_data(self, visuals):
+        """Apply the data recorded before the creation of the renderers of
+        some visuals."""
+        for visual in visuals:
+            kwargs = self.data_updating.pop(visual, None)
+            if kwargs:
+                self.set_data(visual=visual, **kwargs)
+        data_appending = self.data_appending
+        self.data_appending = []
+        for visual, kwargs in data_appending:
+            self.append(visual=visual, **kwargs)
+        
+    def get_deferred_visuals(self, wait=False):
+        """Add the deferred visuals which are ready in the scene, and return
+        them. Their data is normalized like the data of the visuals which
+        existed in `finalize`."""
+        visuals = self.scene_creator.update_visuals(wait=wait)
+        for visual in visuals:
+            self.normalize_visual(visual)
+        return visuals
+        
+    def update_visuals(self):
+        """Create the renderers of the deferred visuals which are ready."""
+        visuals = self.get_deferred_visuals()
+        for visual in visuals:
+            self.renderer.add_visual(visual)
+        if visuals:
+            self.update_data([visual['name'] for visual in visuals])
+        # check again later until all deferred visuals are created
+        if self.scene_creator.pending:
+            QtCore.QTimer.singleShot(DEFERRED_INTERVAL, self.updateGL)
  
+    def is_dirty(self):
+        """Return whether the scene has changed since the last rendering,
+        i.e. whether the view needs to be painted again."""
+        return self.dirty or bool(self.scene_creator.pending)
+        
     def paintGL(self):
+        # changes made while painting will need another rendering
+        self.dirty = False
         if hasattr(self, 'renderer'):
+            if self.scene_creator.pending:
+                self.update_visuals()
             self.renderer.paint()
         gl.glFlush()
  
     def resizeGL(self, width, height):
+        self.dirty = True
         if hasattr(self, 'renderer'):
             self.renderer.resize(width, height)
         gl.glFlush()
@@ -254,12 +353,23 @@ class PaintManager(Manager):
         """Finalize the scene creation. To be overriden.
         """
         pass
+        
+    def normalize_visual(self, visual):
+        """Normalize the data of a visual added after `finalize` (a
+        deferred visual). To be overriden."""
+        pass
+        
+    def normalize_appended(self, visual, kwargs):
+        """Return the rows appended to a visual, normalized like its
+        initial data. To be overriden."""
+        return kwargs
 
         
     # Serialization methods
     # ---------------------
-    def serialize(self):
-        return self.scene_creator.serialize()
+    def serialize(self, **kwargs):
+        """Return the serialized scene, see `SceneCreator.serialize`."""
+        return self.scene_creator.serialize(**kwargs)
         
         
         
\ No newline at end of file
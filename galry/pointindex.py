@@ -0,0 +1,283 @@
+import numpy as np
+
+__all__ = ['PointIndex']
+
+# Average number of points per cell of the grid.
+POINTS_PER_CELL = 16
+# Maximum number of cells along each dimension.
+MAX_CELLS = 1024
+
+def get_ranges(starts, lengths):
+    """Concatenate the ranges `[start, start + length)` in a single array."""
+    offsets = np.hstack(([0], np.cumsum(lengths)[:-1]))
+    return (np.arange(np.sum(lengths), dtype=np.int64) +
+        np.repeat(starts - offsets, lengths))
+
+class PointIndex(object):
+    """Spatial index of 2D points, for picking and hit-testing.
+    
+    The points are sorted along a uniform grid, row of cells after row of
+    cells, so that the points of consecutive cells on a row are contiguous.
+    A query in a box only looks at one slice of points for every row of
+    cells intersecting the box.
+    
+    """
+    def __init__(self, position, ncells=None):
+        """Build the index.
+        
+        Arguments:
+          * position: a `(N, 2)` array with the coordinates of the points
+            (only the first two columns are used with more columns).
+          * ncells=None: the number of cells along each dimension. By
+            default, there are about `POINTS_PER_CELL` points per cell.
+        
+        """
+        position = np.asarray(position)[:,:2]
+        self.size = position.shape[0]
+        if ncells is None:
+            ncells = int(np.sqrt(self.size / float(POINTS_PER_CELL)))
+        self.ncells = ncells = min(max(ncells, 1), MAX_CELLS)
+        # points with NaN coordinates are put after all cells
+        finite = np.isfinite(position).all(axis=1)
+        if finite.any():
+            self.x0, self.y0 = position[finite].min(axis=0)
+            self.x1, self.y1 = position[finite].max(axis=0)
+        else:
+            self.x0, self.y0, self.x1, self.y1 = 0., 0., 1., 1.
+        # the cells are not empty when all points are aligned
+        self.dx = max((self.x1 - self.x0) / float(ncells), 1e-12)
+        self.dy = max((self.y1 - self.y0) / float(ncells), 1e-12)
+        ix, iy = self.get_cell(np.where(finite, position[:,0], self.x0),
+                               np.where(finite, position[:,1], self.y0))
+        cells = iy * ncells + ix
+        cells[~finite] = ncells ** 2
+        self.order = np.argsort(cells)
+        self.points = position[self.order]
+        # first point of every cell, in the sorted points
+        self.starts = np.searchsorted(cells[self.order],
+            np.arange(ncells ** 2 + 1))
+        
+    def get_cell(self, x, y):
+        """Return the column and the row of the cells containing positions,
+        clipped to the grid."""
+        n = self.ncells - 1
+        ix = np.clip(np.floor((x - self.x0) / self.dx), 0, n)
+        iy = np.clip(np.floor((y - self.y0) / self.dy), 0, n)
+        return np.array(ix, dtype=np.int64), np.array(iy, dtype=np.int64)
+        
+    def get_candidates(self, x0, y0, x1, y1):
+        """Return the positions, in the sorted points, of the points in the
+        cells intersecting a box."""
+        if (x1 < self.x0 or x0 > self.x1 or y1 < self.y0 or y0 > self.y1 or
+                self.size == 0):
+            return np.zeros(0, dtype=np.int64)
+        ix0, iy0 = self.get_cell(x0, y0)
+        ix1, iy1 = self.get_cell(x1, y1)
+        # one slice of points per row of cells
+        rows = np.arange(iy0, iy1 + 1) * self.ncells
+        starts = self.starts[rows + ix0]
+        return get_ranges(starts, self.starts[rows + ix1 + 1] - starts)
+        
+    def get_cell_points(self, cells):
+        """Return the positions, in the sorted points, of the points in some
+        cells."""
+        starts = self.starts[cells]
+        return get_ranges(starts, self.starts[cells + 1] - starts)
+        
+    def get_runs(self, cells):
+        """Return the `(starts, ends)` slices of the sorted points in some
+        sorted cells, consecutive cells being merged in a single slice."""
+        if not len(cells):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        breaks = np.nonzero(np.diff(cells) > 1)[0]
+        first = np.hstack((cells[0], cells[breaks + 1]))
+        last = np.hstack((cells[breaks], cells[-1]))
+        return self.starts[first], self.starts[last + 1]
+        
+    def get_indices(self, positions, runs=None, return_mask=False):
+        """Return the sorted indices of points given by their positions in
+        the sorted points, and by `(starts, ends)` slices of positions.
+        With `return_mask=True`, return a boolean mask of the points
+        instead, which avoids sorting large selections."""
+        pieces = [self.order.take(positions)]
+        if runs is not None:
+            pieces.extend(self.order[start:end] for start, end in zip(*runs))
+        if return_mask:
+            mask = np.zeros(self.size, dtype=np.bool_)
+            for piece in pieces:
+                mask[piece] = True
+            return mask
+        return np.sort(np.concatenate(pieces))
+        
+    def query_box(self, x0, y0, x1, y1, return_mask=False):
+        """Return the sorted indices of the points in a box (or a boolean
+        mask, see `get_indices`). Only the points of the cells on the border
+        of the box are tested."""
+        if (x1 < self.x0 or x0 > self.x1 or y1 < self.y0 or y0 > self.y1 or
+                self.size == 0):
+            return self.get_indices(np.zeros(0, dtype=np.int64),
+                return_mask=return_mask)
+        n = self.ncells
+        ix0, iy0 = self.get_cell(x0, y0)
+        ix1, iy1 = self.get_cell(x1, y1)
+        rows = np.arange(iy0, iy1 + 1) * n
+        # cells entirely inside the box, one slice per row
+        runs = (self.starts[rows[1:-1] + ix0 + 1],
+                self.starts[rows[1:-1] + ix1])
+        # cells on the border of the box
+        columns = np.arange(ix0, ix1 + 1)
+        cells = np.unique(np.hstack((rows[0] + columns, rows[-1] + columns,
+            rows + ix0, rows + ix1)))
+        candidates = self.get_cell_points(cells)
+        points = self.points.take(candidates, axis=0)
+        inside = ((points[:,0] >= x0) & (points[:,0] <= x1) &
+                  (points[:,1] >= y0) & (points[:,1] <= y1))
+        return self.get_indices(candidates[inside], runs=runs,
+            return_mask=return_mask)
+        
+    def get_inside_cells(self, polygon):
+        """Return whether the center of every cell is inside a polygon.
+        
+        The crossings of all edges with the horizontal lines going through
+        the centers of the cells are computed at once, and the parity of the
+        number of crossings on the right of every center is obtained with
+        cumulative sums along the rows of cells.
+        
+        """
+        n = self.ncells
+        xa, ya = polygon[:,0], polygon[:,1]
+        xb, yb = np.roll(xa, -1), np.roll(ya, -1)
+        # rows of cells whose center is in [min(ya, yb), max(ya, yb))
+        r0 = np.ceil((np.minimum(ya, yb) - self.y0) / self.dy - .5)
+        r1 = np.ceil((np.maximum(ya, yb) - self.y0) / self.dy - .5)
+        r0 = np.array(np.clip(r0, 0, n), dtype=np.int64)
+        r1 = np.array(np.clip(r1, 0, n), dtype=np.int64)
+        # one crossing per edge and row
+        edges = np.repeat(np.arange(len(polygon)), r1 - r0)
+        rows = get_ranges(r0, r1 - r0)
+        y = self.y0 + (rows + .5) * self.dy
+        x = xa[edges] + ((y - ya[edges]) * (xb[edges] - xa[edges]) /
+            (yb[edges] - ya[edges]))
+        # the crossing is on the right of the centers of the columns < k
+        k = np.clip(np.ceil((x - self.x0) / self.dx - .5), 0, n)
+        counts = np.bincount(rows * (n + 1) + np.array(k, dtype=np.int64),
+            minlength=n * (n + 1)).reshape((n, n + 1))
+        crossings = np.cumsum(counts[:,::-1], axis=1)[:,::-1]
+        return (crossings[:,1:] % 2 == 1).ravel()
+        
+    def get_boundary_cells(self, polygon):
+        """Return the cells crossed by the edges of a polygon.
+        
+        Returns:
+          * (cells, edges): `cells` contains cell indices (possibly repeated)
+            and `edges` is a `(len(cells), 4)` array with the coordinates
+            `(xa, ya, xb, yb)` of a piece of edge crossing each cell.
+        
+        """
+        n = self.ncells
+        a = polygon
+        b = np.roll(polygon, -1, axis=0)
+        # cut the edges in pieces crossing at most two cells per dimension
+        npieces = np.maximum(np.abs(b[:,0] - a[:,0]) / self.dx,
+                             np.abs(b[:,1] - a[:,1]) / self.dy)
+        npieces = np.array(np.clip(np.ceil(npieces), 1, 4 * n),
+            dtype=np.int64)
+        edges = np.repeat(np.arange(len(polygon)), npieces)
+        t = ((np.arange(len(edges)) - np.repeat(np.cumsum(npieces) - npieces,
+            npieces)) / npieces[edges].astype(np.float64))[:,np.newaxis]
+        d = (b - a)[edges] / npieces[edges][:,np.newaxis]
+        a = a[edges] + t * (b - a)[edges]
+        b = a + d
+        # only keep the pieces intersecting the grid
+        pmin, pmax = np.minimum(a, b), np.maximum(a, b)
+        keep = ((pmax[:,0] >= self.x0) & (pmin[:,0] <= self.x1) &
+                (pmax[:,1] >= self.y0) & (pmin[:,1] <= self.y1))
+        a, b, pmin, pmax = a[keep], b[keep], pmin[keep], pmax[keep]
+        # all cells in the bounding box of every piece
+        ix0, iy0 = self.get_cell(pmin[:,0], pmin[:,1])
+        ix1, iy1 = self.get_cell(pmax[:,0], pmax[:,1])
+        w, h = ix1 - ix0 + 1, iy1 - iy0 + 1
+        pieces = np.repeat(np.arange(len(a)), w * h)
+        k = get_ranges(np.zeros(len(a), dtype=np.int64), w * h)
+        cells = ((iy0[pieces] + k // w[pieces]) * n +
+            ix0[pieces] + k % w[pieces])
+        return cells, np.hstack((a, b))[pieces]
+        
+    def query_polygon(self, polygon, return_mask=False):
+        """Return the sorted indices of the points inside a polygon (or a
+        boolean mask, see `get_indices`).
+        
+        Arguments:
+          * polygon: a `(M, 2)` array with the vertices of the polygon, the
+            last vertex being connected to the first one.
+          * return_mask=False: whether to return a mask instead of indices.
+        
+        The cells are classified with their centers: the points of the cells
+        which are not crossed by the polygon are selected all at once, and
+        the points of the other cells are inside when the segment between
+        the point and the center of its cell crosses the polygon an even
+        number of times, if and only if the center is inside.
+        
+        """
+        polygon = np.asarray(polygon, dtype=np.float64)
+        if polygon.ndim != 2 or polygon.shape[0] < 3 or self.size == 0:
+            return self.get_indices(np.zeros(0, dtype=np.int64),
+                return_mask=return_mask)
+        inside = self.get_inside_cells(polygon)
+        cells, edges = self.get_boundary_cells(polygon)
+        boundary = np.unique(cells)
+        # points of the cells inside the polygon and not crossed by an edge
+        interior = inside.copy()
+        interior[boundary] = False
+        runs = self.get_runs(np.nonzero(interior)[0])
+        # points of the cells crossed by an edge
+        lengths = self.starts[boundary + 1] - self.starts[boundary]
+        positions = get_ranges(self.starts[boundary], lengths)
+        points = np.array(self.points.take(positions, axis=0),
+            dtype=np.float64)
+        # every point is tested against every piece of edge in its cell
+        i = np.searchsorted(boundary, cells)
+        pairs = np.repeat(np.arange(len(cells)), lengths[i])
+        k = get_ranges((np.cumsum(lengths) - lengths)[i], lengths[i])
+        px, py = points[:,0].take(k), points[:,1].take(k)
+        cx = self.x0 + (cells % self.ncells + .5) * self.dx
+        cy = self.y0 + (cells // self.ncells + .5) * self.dy
+        xa, ya, xb, yb = edges.T
+        center = (xb - xa) * (cy - ya) - (yb - ya) * (cx - xa) > 0
+        cx, cy, xa, ya, xb, yb, center = [v.take(pairs)
+            for v in (cx, cy, xa, ya, xb, yb, center)]
+        # the segment from the point to the center crosses the edge
+        crossing = ((xb - xa) * (py - ya) - (yb - ya) * (px - xa) > 0) != \
+            center
+        crossing &= (((cx - px) * (ya - py) - (cy - py) * (xa - px) > 0) !=
+                     ((cx - px) * (yb - py) - (cy - py) * (xb - px) > 0))
+        parity = np.bincount(k, weights=crossing,
+            minlength=len(positions)) % 2 == 1
+        inside = inside[np.repeat(boundary, lengths)]
+        return self.get_indices(positions[inside != parity], runs=runs,
+            return_mask=return_mask)
+        
+    def query_nearest(self, x, y, rx, ry=None, return_distance=False):
+        """Return the index of the closest point to a position, within an
+        ellipse of radii `(rx, ry)`, or None.
+        
+        The distance is normalized by the radii, so that they can be given in
+        data units corresponding to the same number of pixels on the screen.
+        With `return_distance=True`, return a tuple `(index, distance)` with
+        the squared normalized distance, in [0, 1].
+        
+        """
+        if ry is None:
+            ry = rx
+        candidates = self.get_candidates(x - rx, y - ry, x + rx, y + ry)
+        index = distance = None
+        if len(candidates) > 0:
+            points = self.points.take(candidates, axis=0)
+            distances = (((points[:,0] - x) / rx) ** 2 +
+                         ((points[:,1] - y) / ry) ** 2)
+            i = np.argmin(distances)
+            if distances[i] <= 1:
+                index, distance = self.order[candidates[i]], distances[i]
+        if return_distance:
+            return index, distance
+        return index
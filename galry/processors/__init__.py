@@ -4,3 +4,7 @@ from navigation_processor import *
 from grid_processor import *
 from mesh_processor import *
 
+from decimation_processor import *
+from tiledimage_processor import *
+from picking_processor import *
+from selection_processor import *
@@ -0,0 +1,78 @@
+import numpy as np
+from processor import EventProcessor
+
+__all__ = ['DecimationEventProcessor']
+
+
+class DecimationEventProcessor(EventProcessor):
+    """Upload the min/max envelope of the visible part of decimated plots.
+
+    Visuals with a `decimator` attribute (e.g. `PlotVisual` created with
+    `decimate=True`) are updated after every navigation event, so that
+    only about one min/max pair per pixel column is uploaded and drawn.
+
+    """
+    def initialize(self):
+        # last x range, per visual
+        self.ranges = {}
+        self.register('Initialize', self.update_envelopes)
+        self.register('Pan', self.update_envelopes)
+        self.register('Zoom', self.update_envelopes)
+        self.register('Reset', self.update_envelopes)
+        self.register('ResetZoom', self.update_envelopes)
+        self.register('SetViewbox', self.update_envelopes)
+        self.register('SetPosition', self.update_envelopes)
+        self.register('Animate', self.update_envelopes)
+        self.register(None, self.update_envelopes)
+
+    def get_decimated_visuals(self):
+        """Return the list of (name, visual object) of decimated visuals."""
+        objects = self.paint_manager.scene_creator.visual_objects
+        return [(name, visual) for name, visual in objects.iteritems()
+            if getattr(visual, 'decimator', None) is not None]
+
+    def get_normalizer(self, name):
+        """Return the normalizer of the position attribute of a visual, i.e.
+        the one of the paint manager, or None if it is not normalized."""
+        normalizer = getattr(self.paint_manager, 'normalizer', None)
+        if normalizer is None:
+            return None
+        visual = self.get_visual(name)
+        position = [var for var in visual['variables']
+            if var['name'] == 'position']
+        if not position or not position[0].get('autonormalizable', None):
+            return None
+        return normalizer
+
+    def update_envelopes(self, parameter):
+        nav = self.get_processor('navigation')
+        if not nav:
+            return
+        visuals = self.get_decimated_visuals()
+        if not visuals:
+            return
+
+        x0, _, x1, _ = nav.get_viewbox()
+        # one min/max pair per pixel column
+        ncolumns = getattr(self.parent, 'w', None)
+
+        for name, visual in visuals:
+            normalizer = self.get_normalizer(name)
+            if normalizer is not None:
+                vx0 = normalizer.unnormalize_x(x0)
+                vx1 = normalizer.unnormalize_x(x1)
+            else:
+                vx0, vx1 = x0, x1
+
+            # no need to upload the same envelope again
+            key = (vx0, vx1, ncolumns)
+            if self.ranges.get(name, None) == key:
+                continue
+            self.ranges[name] = key
+
+            position = visual.decimator.get_envelope(vx0, vx1, ncolumns)
+            if normalizer is not None:
+                position[:,0] = normalizer.normalize_x(position[:,0])
+                position[:,1] = normalizer.normalize_y(position[:,1])
+            self.set_data(visual=name, position=position)
+
@@ -5,6 +5,8 @@ from processor import EventProcessor
 from galry import DataNormalizer
 
 NTICKS = 10
+# maximum number of formatted tick labels kept in cache
+LABELS_CACHE_SIZE = 1000
 
 __all__ = ['GridEventProcessor']
 
@@ -59,12 +61,12 @@ def format_number(x, nfrac=None):
         nfrac = nfrac + int(np.log10(np.abs(x)))
         return ("%." + str(nfrac) + "e") % x
 
-def get_ticks_text(x0, y0, x1, y1):
-    ticksx, nfracx = get_ticks(x0, x1)
-    ticksy, nfracy = get_ticks(y0, y1)
+def get_ticks_text(ticksx, nfracx, ticksy, nfracy, format=None):
+    if format is None:
+        format = format_number
     n = len(ticksx)
-    text = [format_number(x, nfracx) for x in ticksx]
-    text += [format_number(x, nfracy) for x in ticksy]
+    text = [format(x, nfracx) for x in ticksx]
+    text += [format(x, nfracy) for x in ticksy]
     # position of the ticks
     coordinates = np.zeros((len(text), 2))
     coordinates[:n, 0] = ticksx
@@ -74,6 +76,12 @@ def get_ticks_text(x0, y0, x1, y1):
     
 class GridEventProcessor(EventProcessor):
     def initialize(self):
+        # ticks currently displayed, and renderer they have been sent to
+        self.ticks = None
+        self.ticks_renderer = None
+        # cache of formatted labels: (value, nfrac) => text
+        self.labels = {}
+        
         self.register('Initialize', self.update_axes)
         self.register('Pan', self.update_axes)
         self.register('Zoom', self.update_axes)
@@ -81,6 +89,17 @@ class GridEventProcessor(EventProcessor):
         self.register('Animate', self.update_axes)
         self.register(None, self.update_axes)
         
+    def format_label(self, x, nfrac):
+        """Return the label of a tick, formatted only once."""
+        key = (x, nfrac)
+        label = self.labels.get(key, None)
+        if label is None:
+            # the cache is bounded for long navigation sessions
+            if len(self.labels) > LABELS_CACHE_SIZE:
+                self.labels.clear()
+            label = self.labels[key] = format_number(x, nfrac)
+        return label
+        
     def update_axes(self, parameter):
         nav = self.get_processor('navigation')
         # print nav
@@ -106,7 +125,22 @@ class GridEventProcessor(EventProcessor):
             viewbox = (x0, y0, x1, y1)
             # print nvb, viewbox
         
-        text, coordinates, n = get_ticks_text(*viewbox)
+        x0, y0, x1, y1 = viewbox
+        ticksx, nfracx = get_ticks(x0, x1)
+        ticksy, nfracy = get_ticks(y0, y1)
+        
+        # the ticks extend beyond the view, so that they do not change while
+        # the view is translated by less than a tick: the grid is then only
+        # moved by the navigation uniforms and nothing needs to be uploaded
+        ticks = (tuple(ticksx), nfracx, tuple(ticksy), nfracy)
+        renderer = getattr(self.paint_manager, 'renderer', None)
+        if ticks == self.ticks and renderer is self.ticks_renderer:
+            return
+        self.ticks = ticks
+        self.ticks_renderer = renderer
+        
+        text, coordinates, n = get_ticks_text(ticksx, nfracx, ticksy, nfracy,
+            format=self.format_label)
         
         if nvb is not None:
             coordinates[:,0] = self.normalizer.normalize_x(coordinates[:,0])
@@ -20,6 +20,10 @@ class NavigationEventProcessor(EventProcessor):
         self.constrain_navigation = constrain_navigation
         self.normalization_viewbox = normalization_viewbox
         
+        # last transformation sent to every visual renderer
+        self.transforms = {}
+        self.transforms_renderer = None
+        
         self.reset()
         self.set_navigation_constraints()
         self.activate_navigation_constrain()
@@ -66,10 +70,21 @@ class NavigationEventProcessor(EventProcessor):
         """Change uniform variables to implement interactive navigation."""
         translation = self.get_translation()
         scale = self.get_scaling()
-        # update all non static visuals
+        transform = (tuple(scale), tuple(translation))
+        # the transformations are forgotten when the renderer is recreated
+        renderer = getattr(self.paint_manager, 'renderer', None)
+        if renderer is not self.transforms_renderer:
+            self.transforms = {}
+            self.transforms_renderer = renderer
+        # update all non static visuals, only when their transformation
+        # changes so that idle events do not trigger any rendering
         for visual in self.paint_manager.get_visuals():
             if not visual.get('is_static', False):
-                self.set_data(visual=visual['name'], 
+                name = visual['name']
+                if self.transforms.get(name, None) == transform:
+                    continue
+                self.transforms[name] = transform
+                self.set_data(visual=name, 
                               scale=scale, translation=translation)
         
         
@@ -0,0 +1,104 @@
+import numpy as np
+from processor import EventProcessor
+from galry import PointIndex
+
+__all__ = ['PickingEventProcessor']
+
+# Maximum distance between the cursor and a picked point, in pixels.
+PICKING_RADIUS = 5
+
+class PickingEventProcessor(EventProcessor):
+    """Find the points under the cursor.
+    
+    A `PointIndex` is built over the position attribute of a visual the first
+    time it is queried, and it is built again when the positions of the
+    visual have changed. Static visuals and visuals created with
+    `pickable=False` are ignored. For example, to print the point under the
+    cursor:
+    
+        def hover(figure, parameter):
+            picked = figure.get_processor('picking').pick(
+                *parameter['mouse_position'])
+            if picked is not None:
+                print picked
+        action('Move', hover)
+    
+    """
+    def initialize(self, radius=PICKING_RADIUS):
+        self.radius = radius
+        # {visual name: (data version, index)}
+        self.indices = {}
+        
+    def get_visual_renderers(self):
+        """Return the visual renderers, once the scene has been rendered."""
+        renderer = getattr(self.paint_manager, 'renderer', None)
+        if renderer is None:
+            return {}
+        return renderer.visual_renderers
+        
+    def get_pickable_visuals(self):
+        """Return the names of the visible visuals which can be picked."""
+        return [visual['name'] for visual in self.paint_manager.get_visuals()
+            if visual.get('visible', True) and
+               not visual.get('is_static', False) and
+               visual.get('pickable', True)]
+        
+    def get_index(self, name):
+        """Return the index of the positions of a visual, or None if it
+        does not have 2D positions."""
+        visual_renderer = self.get_visual_renderers().get(name, None)
+        if visual_renderer is None:
+            return None
+        position = visual_renderer.get_data('position')
+        if not isinstance(position, np.ndarray) or position.ndim != 2:
+            return None
+        version = (visual_renderer.get_data_version('position'), id(position))
+        cached = self.indices.get(name, None)
+        if cached is None or cached[0] != version:
+            cached = self.indices[name] = (version, PointIndex(position))
+        return cached[1]
+        
+    def get_position(self, name, index):
+        """Return the position of a point of a visual, in the coordinate
+        system of the navigation (normalized data coordinates)."""
+        visual_renderer = self.get_visual_renderers()[name]
+        return tuple(visual_renderer.get_data('position')[index,:2])
+        
+    def pick(self, x, y, visuals=None, radius=None):
+        """Return the point closest to a position of the window.
+        
+        Arguments:
+          * x, y: the position in window coordinates, in [-1, 1] (like the
+            `mouse_position` action parameter).
+          * visuals=None: the names of the visuals to pick from. By default,
+            all pickable visuals.
+          * radius=None: the maximum distance, in pixels.
+        
+        Returns:
+          * (visual, index): the name of the visual and the index of the
+            closest point in its position attribute, or None.
+        
+        """
+        nav = self.get_processor('navigation')
+        if not nav:
+            return None
+        if visuals is None:
+            visuals = self.get_pickable_visuals()
+        if radius is None:
+            radius = self.radius
+        x, y = nav.get_data_coordinates(x, y)
+        # radius in data units: a pixel is 2/w in window coordinates
+        rx = 2. * radius / max(getattr(self.parent, 'w', 1), 1) / nav.sx
+        ry = 2. * radius / max(getattr(self.parent, 'h', 1), 1) / nav.sy
+        picked, closest = None, None
+        for name in visuals:
+            index = self.get_index(name)
+            if index is None:
+                continue
+            i, distance = index.query_nearest(x, y, rx, ry,
+                return_distance=True)
+            if i is None:
+                continue
+            if closest is None or distance < closest:
+                picked, closest = (name, i), distance
+        return picked
@@ -98,6 +98,7 @@ class EventProcessor(object):
                 # BAD SMELL HERE :(
                 if not hasattr(fig, 'set_data'):
                     fig.set_data = self.parent.paint_manager.set_data
+                    fig.append = self.parent.paint_manager.append
                     fig.copy_texture = self.parent.paint_manager.copy_texture
                     fig.set_rendering_options = self.parent.paint_manager.set_rendering_options
                     fig.get_processor = self.interaction_manager.get_processor
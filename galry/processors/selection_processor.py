@@ -0,0 +1,131 @@
+import numpy as np
+from processor import EventProcessor
+
+__all__ = ['SelectionEventProcessor']
+
+# Minimum distance between two vertices of the lasso, in pixels.
+LASSO_STEP = 3
+
+class SelectionEventProcessor(EventProcessor):
+    """Select the points in a box or in a lasso.
+
+    The outline of the selection is displayed while the `SelectBox` or
+    `SelectLasso` event is raised, and the points of the pickable visuals
+    inside it are selected at the end of the event, using the spatial
+    indices of the picking processor. Visuals created with a
+    `selection_color` highlight their selected points: only their
+    `selection` attribute is updated. The selected points of a visual are
+    returned by `get_selection`.
+
+    """
+    def initialize(self):
+        # outline being drawn, in window coordinates
+        self.box = None
+        self.lasso = []
+        # {visual name: boolean mask of the selected points}
+        self.masks = {}
+        self.register('SelectBox', self.process_selectbox_event)
+        self.register('SelectLasso', self.process_selectlasso_event)
+        self.register(None, self.process_none_event)
+
+    def show_outline(self, outline):
+        """Display a closed outline, in window coordinates."""
+        outline = np.array(outline + outline[:1], dtype=np.float32)
+        self.set_data(visual='selection_outline', position=outline,
+            visible=True)
+
+    def hide_outline(self):
+        self.set_data(visual='selection_outline', visible=False)
+
+    def process_selectbox_event(self, parameter):
+        x0, y0, x1, y1 = parameter
+        self.box = parameter
+        self.show_outline([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+
+    def process_selectlasso_event(self, parameter):
+        x, y = parameter
+        # only add vertices far enough from the previous one
+        if self.lasso:
+            x0, y0 = self.lasso[-1]
+            w = max(getattr(self.parent, 'w', 1), 1)
+            h = max(getattr(self.parent, 'h', 1), 1)
+            if max(abs(x - x0) * w, abs(y - y0) * h) < 2 * LASSO_STEP:
+                return
+        self.lasso.append((x, y))
+        self.show_outline(self.lasso)
+
+    def process_none_event(self, parameter):
+        """Select the points at the end of the selection."""
+        if self.box is not None:
+            self.select_box(*self.box)
+            self.hide_outline()
+        elif self.lasso:
+            self.select_polygon(self.lasso)
+            self.hide_outline()
+        self.box = None
+        self.lasso = []
+
+    def get_selection(self, name):
+        """Return the sorted indices of the selected points of a visual."""
+        mask = self.masks.get(name, None)
+        if mask is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.nonzero(mask)[0]
+
+    def set_selection(self, name, mask):
+        """Select the points of a visual with a boolean mask, and highlight
+        them if the visual has a `selection` attribute."""
+        old = self.masks.get(name, None)
+        self.masks[name] = mask
+        picking = self.get_processor('picking')
+        visual_renderer = picking.get_visual_renderers().get(name, None)
+        if (visual_renderer is None or
+                visual_renderer.get_variable('selection') is None):
+            return
+        # only upload the rows between the first and last changed points
+        if old is None or old.shape != mask.shape:
+            changed = np.arange(len(mask))
+        else:
+            changed = np.nonzero(old != mask)[0]
+        if not len(changed):
+            return
+        rows = slice(changed[0], changed[-1] + 1)
+        self.set_data(visual=name, rows=rows,
+            selection=np.array(mask[rows], dtype=np.float32))
+
+    def select(self, query, visuals=None):
+        """Select the points of some visuals with a query on their index,
+        taking `index` and returning a boolean mask."""
+        picking = self.get_processor('picking')
+        if not picking:
+            return
+        if visuals is None:
+            visuals = picking.get_pickable_visuals()
+        for name in visuals:
+            index = picking.get_index(name)
+            if index is not None:
+                self.set_selection(name, query(index))
+
+    def select_box(self, x0, y0, x1, y1, visuals=None):
+        """Select the points in a box, in window coordinates."""
+        nav = self.get_processor('navigation')
+        if not nav:
+            return
+        x0, y0 = nav.get_data_coordinates(x0, y0)
+        x1, y1 = nav.get_data_coordinates(x1, y1)
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        self.select(lambda index: index.query_box(x0, y0, x1, y1,
+            return_mask=True), visuals=visuals)
+
+    def select_polygon(self, polygon, visuals=None):
+        """Select the points in a polygon, in window coordinates."""
+        nav = self.get_processor('navigation')
+        if not nav:
+            return
+        polygon = np.array(polygon, dtype=np.float64)
+        polygon[:,0], polygon[:,1] = nav.get_data_coordinates(
+            polygon[:,0], polygon[:,1])
+        self.select(lambda index: index.query_polygon(polygon,
+            return_mask=True), visuals=visuals)
+
@@ -0,0 +1,95 @@
+from qtools.qtpy import QtCore
+from processor import EventProcessor
+
+__all__ = ['TiledImageEventProcessor']
+
+# Interval in milliseconds between two checks of the tiles being read.
+TILE_INTERVAL = 20
+
+class TiledImageEventProcessor(EventProcessor):
+    """Load the visible tiles of tiled images.
+
+    Visuals with a `cache` of tiles (`TiledImageVisual`) are updated after
+    every navigation event: the tiles intersecting the view box are
+    requested at the level matching the zoom, and uploaded in the texture
+    atlas as soon as they have been read.
+
+    """
+    def initialize(self):
+        self.timer_active = False
+        self.register('Initialize', self.update_tiles)
+        self.register('Pan', self.update_tiles)
+        self.register('Zoom', self.update_tiles)
+        self.register('Reset', self.update_tiles)
+        self.register('ResetZoom', self.update_tiles)
+        self.register('SetViewbox', self.update_tiles)
+        self.register('SetPosition', self.update_tiles)
+        self.register('Animate', self.update_tiles)
+        self.register(None, self.update_tiles)
+
+    def get_tiled_visuals(self):
+        """Return the list of (name, visual object) of tiled images."""
+        objects = self.paint_manager.scene_creator.visual_objects
+        return [(name, visual) for name, visual in objects.iteritems()
+            if getattr(visual, 'pyramid', None) is not None]
+
+    def get_visible_keys(self, visual, viewbox):
+        """Return the keys of the tiles to display, coarsest first."""
+        pyramid = visual.pyramid
+        x0, y0, x1, y1 = visual.points
+        vx0, vy0, vx1, vy1 = viewbox
+        # visible region in image pixels
+        box = ((vx0 - x0) / (x1 - x0) * pyramid.width,
+               (y1 - vy1) / (y1 - y0) * pyramid.height,
+               (vx1 - x0) / (x1 - x0) * pyramid.width,
+               (y1 - vy0) / (y1 - y0) * pyramid.height)
+        # the coarsest level is always displayed, below the other tiles
+        top = pyramid.nlevels - 1
+        background = pyramid.get_visible_tiles(top, (0, 0,
+            pyramid.width, pyramid.height))
+        # visible part of the image on the screen, in pixels
+        w = getattr(self.parent, 'w', 1)
+        npixels = w * (min(box[2], pyramid.width) - max(box[0], 0)) / \
+            max(box[2] - box[0], 1e-9)
+        level = pyramid.get_level((max(box[0], 0), 0,
+            min(box[2], pyramid.width), 0), npixels)
+        # use a coarser level when there are not enough slots
+        while level < top:
+            keys = pyramid.get_visible_tiles(level, box)
+            if len(keys) + len(background) <= visual.nslots:
+                return background + keys
+            level += 1
+        return background
+
+    def update_tiles(self, parameter=None):
+        nav = self.get_processor('navigation')
+        if not nav:
+            return
+        visuals = self.get_tiled_visuals()
+        pending = False
+        for name, visual in visuals:
+            keys = self.get_visible_keys(visual, nav.get_viewbox())
+            slots, uploads = visual.cache.update(keys)
+            pending = pending or visual.cache.is_pending()
+            if not uploads and getattr(visual, 'displayed', None) == \
+                    [(key, slots[key]) for key in keys if key in slots]:
+                continue
+            visual.displayed = [(key, slots[key]) for key in keys
+                if key in slots]
+            ts = visual.pyramid.tile_size
+            tiles = [('atlas', ((slot // visual.atlas_tiles) * ts,
+                (slot % visual.atlas_tiles) * ts), data)
+                for slot, data in uploads]
+            self.set_data(visual=name, texture_tiles=tiles,
+                **visual.get_quads(visual.displayed))
+        # check again later until all requested tiles have been read
+        if pending and not self.timer_active:
+            self.timer_active = True
+            QtCore.QTimer.singleShot(TILE_INTERVAL, self.update_pending)
+        return visuals
+
+    def update_pending(self):
+        """Upload the tiles read since the last update."""
+        self.timer_active = False
+        if self.update_tiles():
+            self.parent.update_view()
@@ -159,6 +159,7 @@ class Figure(object):
         self.constrain_ratio = None
         self.constrain_navigation = None
         self.display_fps = None
+        self.profile = None
         self.activate3D = None
         self.antialiasing = None
         self.activate_grid = True
@@ -260,7 +261,17 @@ class Figure(object):
             independent primitive.
           * marker, or m: the type of the marker as a char, or a NxMx3 texture.
           * marker_size, or ms: the size of the marker.
-          * thickness: None by default, or the thickness of the line.
+          * thickness: None by default, or the thickness of the line in
+            pixels. It does not depend on the zoom level.
+          * decimate: None by default, or True or a maximum number of columns
+            to only render the min/max envelope of the visible part of long
+            time series (one plot per row, x sorted in increasing order).
+          * streaming: False by default, or True to use circular buffers so
+            that new samples can be appended with `fig.append(position=...)`,
+            only the new samples being uploaded.
+          * selection_color: None by default, or the color of the points
+            selected with the mouse, in a box (SHIFT + left button) or in a
+            lasso (ALT + left button).
           * primitive_type: the OpenGL primitive type of the visual. Can be:
           
               * `LINES`: a segment is rendered for each pair of successive
@@ -341,6 +352,10 @@ class Figure(object):
           * letter_spacing: the letter spacing
           * interline=0.: the interline when there are several independent 
             texts
+          * font='segoe': the name of the font, or the path to a TrueType
+            font file.
+          * sdf=False: whether to render the characters as quads with a
+            signed distance field font, which is sharp at any font size.
         
         """
         self.add_visual(vs.TextVisual, *args, **kwargs)
@@ -353,6 +368,8 @@ class Figure(object):
           * coordinates: a 4-tuple with (x0, y0, x1, y1) coordinates, or a list
             of such coordinates for rendering multiple rectangles.
           * color: color(s) of the rectangle(s).
+          * instanced=False: whether to render all rectangles as instances
+            of a single square, which saves memory with many rectangles.
         
         """
         self.add_visual(vs.RectanglesVisual, *args, **kwargs)
@@ -366,13 +383,26 @@ class Figure(object):
         
         Arguments:
         
-          * texture: a NxMx3 or NxMx4 array with RGB(A) components.
+          * texture: a NxMx3 or NxMx4 array with RGB(A) components, or a
+            NxM array with scalar values, displayed with a colormap.
           * points: a 4-tuple with (x0, y0, x1, y1) coordinates of the texture.
+          * colormap='rainbow': the name of the colormap of scalar values,
+            see `get_colormap`.
+          * vmin, vmax: the values mapped to the first and last colors of
+            the colormap. By default, the minimum and maximum values.
           * filter=False: if True, linear filtering and mimapping is used
             if supported by the OpenGL implementation.
+          * tiled=False: if True, the image is displayed with tiles loaded
+            on demand at a resolution adapted to the zoom level, see
+            `TiledImageVisual`. Use it for images larger than the maximum
+            texture size, possibly memory-mapped. The image must contain RGB
+            or grayscale values.
         
         """
         filter = kwargs.pop('filter', None)
+        if kwargs.pop('tiled', None):
+            self.add_visual(vs.TiledImageVisual, *args, **kwargs)
+            return
         if filter:
             kwargs.update(
                 mipmap=True,
@@ -511,6 +541,7 @@ class Figure(object):
             constrain_ratio=self.constrain_ratio,
             constrain_navigation=self.constrain_navigation,
             display_fps=self.display_fps,
+            profile=self.profile,
             activate3D=self.activate3D,
             antialiasing=self.antialiasing,
             activate_grid=self.activate_grid,
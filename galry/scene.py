@@ -1,14 +1,29 @@
 import numpy as np
 import base64
 import json
-from galry import CompoundVisual
+import struct
+from multiprocessing.pool import ThreadPool
+from galry import CompoundVisual, DataSource, RefVar
 
 __all__ = ['SceneCreator', 
-           'encode_data', 'decode_data', 'serialize', 'deserialize', ]
+           'encode_data', 'decode_data', 'serialize', 'deserialize',
+           'save_scene', 'load_scene', ]
 
 
 # Scene creator
 # -------------
+# Thread pool used to create deferred visuals, created when first needed.
+POOL = None
+# Number of threads in the pool, None for the number of CPUs.
+POOL_SIZE = None
+
+def get_pool():
+    """Return the thread pool used to create deferred visuals."""
+    global POOL
+    if POOL is None:
+        POOL = ThreadPool(POOL_SIZE)
+    return POOL
+
 class SceneCreator(object):
     """Construct a scene with `add_*` methods."""
     def __init__(self, constrain_ratio=False,):
@@ -20,6 +35,9 @@ class SceneCreator(object):
         # create an empty scene
         self.scene = {'visuals': [], 'renderer_options': {}}
         self.visual_objects = {}
+        # visuals not in the scene yet, in the order of declaration: list of
+        # [name, async_result, visual]
+        self.pending = []
         
         
     # Visual methods
@@ -39,6 +57,36 @@ class SceneCreator(object):
             return None
         return visuals[0]
         
+    def is_pending(self, name):
+        """Return whether a deferred visual is not in the scene yet."""
+        return name in [p[0] for p in self.pending]
+        
+    def update_visuals(self, wait=False):
+        """Add the deferred visuals which have been created in the scene.
+        
+        The visuals are added in the order of declaration, so that a visual
+        is only added once all previous ones have been added.
+        
+        Arguments:
+          * wait=False: whether to wait for all deferred visuals.
+          
+        Returns:
+          * visuals: the list of the visual dictionaries which have just been
+            added in the scene.
+        
+        """
+        visuals = []
+        while self.pending:
+            name, result, visual = self.pending[0]
+            if visual is None:
+                if not wait and not result.ready():
+                    break
+                # raise the exception raised in the thread, if any
+                visual = result.get()
+            self.pending.pop(0)
+            visuals.append(self.register_visual(name, visual))
+        return visuals
+        
     
     # Visual creation methods
     # -----------------------
@@ -75,35 +123,62 @@ class SceneCreator(object):
           * visible=True: whether this visual should be rendered. Useful
             for showing/hiding a transient element. When hidden, the visual
             does not go through the rendering pipeline at all.
+          * deferred=False: whether to create the visual in a thread pool.
+            The visual is added in the scene later, in `update_visuals`,
+            so that the first visuals can be rendered while the data of the
+            next ones is being prepared.
           * **kwargs: keyword arguments for the visual `initialize` method.
           
         Returns:
           * visual: a dictionary containing all the information about
-            the visual, and that can be used in `set_data`.
+            the visual, and that can be used in `set_data`, or None for
+            a deferred visual.
         
         """
+        deferred = kwargs.pop('deferred', False)
         
         if 'name' not in kwargs:
-            kwargs['name'] = 'visual%d' % (len(self.get_visuals()))
+            kwargs['name'] = 'visual%d' % (len(self.get_visuals()) +
+                len(self.pending))
         
         # handle compound visual, where we add all sub visuals
         # as defined in CompoundVisual.initialize()
         if issubclass(visual_class, CompoundVisual):
             visual = visual_class(self.scene, *args, **kwargs)
             for sub_cls, sub_args, sub_kwargs in visual.visuals:
+                sub_kwargs.setdefault('deferred', deferred)
                 self.add_visual(sub_cls, *sub_args, **sub_kwargs)
             return visual
             
         # get the name of the visual from kwargs
         name = kwargs.pop('name')
-        if self.get_visual(name):
+        if self.get_visual(name) or self.is_pending(name):
             raise ValueError("Visual name '%s' already exists." % name)
         
         # pass constrain_ratio to all visuals
         if 'constrain_ratio' not in kwargs:
             kwargs['constrain_ratio'] = self.constrain_ratio
+        # reference variables are resolved with the visuals in the scene
+        if [v for v in kwargs.itervalues() if isinstance(v, RefVar)]:
+            self.update_visuals(wait=True)
+            deferred = False
+        # create the visual object in the thread pool
+        if deferred:
+            result = get_pool().apply_async(visual_class,
+                (self.scene,) + args, kwargs)
+            self.pending.append([name, result, None])
+            return None
         # create the visual object
         visual = visual_class(self.scene, *args, **kwargs)
+        # keep the order of declaration with deferred visuals
+        if self.pending:
+            self.pending.append([name, None, visual])
+            return visual
+        self.register_visual(name, visual)
+        return visual
+        
+    def register_visual(self, name, visual):
+        """Add a visual object in the scene, and return its dictionary."""
         # get the dictionary version
         dic = visual.get_dic()
         dic['name'] = name
@@ -111,22 +186,32 @@ class SceneCreator(object):
         self.get_visuals().append(dic)
         # also, record the visual object
         self.visual_objects[name] = visual
-        return visual
+        return dic
         
         
     # Output methods
     # --------------
-    def get_scene(self):
-        """Return the scene dictionary."""
+    def get_scene(self, wait=True):
+        """Return the scene dictionary.
+        
+        Arguments:
+          * wait=True: whether to wait for all deferred visuals. Otherwise,
+            only the visuals already created are in the scene.
+        
+        """
+        self.update_visuals(wait=wait)
         return self.scene
 
-    def serialize(self, **kwargs):
-        """Return the JSON representation of the scene."""
+    def serialize(self, format='json', **kwargs):
+        """Return the JSON or binary representation of the scene, see
+        `serialize`."""
+        self.update_visuals(wait=True)
         self.scene.update(**kwargs)
-        return serialize(self.scene)
+        return serialize(self.scene, format=format)
         
     def from_json(self, scene_json):
-        """Import the scene from a JSON string."""
+        """Import the scene from a JSON string (or a binary
+        representation)."""
         self.scene = deserialize(scene_json)
         
 
@@ -139,12 +224,17 @@ def encode_data(data):
 def decode_data(s, dtype=np.float32):
     """Return a Numpy array from its encoded Base64 string. The dtype
     must be provided (float32 by default)."""
-    return np.fromstring(base64.b64decode(s), dtype=dtype)
+    # the decoded string is only held by the array, so the array is copied
+    # to be writable (unlike the views of the binary format)
+    return np.frombuffer(base64.b64decode(s), dtype=dtype).copy()
 
 class ArrayEncoder(json.JSONEncoder):
     """JSON encoder that handles Numpy arrays and serialize them with base64
     encoding."""
     def default(self, obj):
+        # lazy sources are loaded in memory
+        if isinstance(obj, DataSource):
+            obj = np.asarray(obj)
         if isinstance(obj, np.ndarray):
             return encode_data(obj)
         return json.JSONEncoder.default(self, obj)
@@ -153,8 +243,19 @@ def is_str(obj):
     tp = type(obj)
     return tp == str or tp == unicode
         
-def serialize(scene):
-    """Serialize a scene."""
+def serialize(scene, format='json', file=None):
+    """Serialize a scene.
+    
+    Arguments:
+      * scene: the scene dictionary.
+      * format='json': 'json' for a JSON string where arrays are encoded in
+        Base64, or 'binary' for the binary format (see `serialize_binary`).
+      * file=None: with the binary format, a file object where to write the
+        scene. Otherwise, the scene is returned as a bytearray.
+    
+    """
+    if format == 'binary':
+        return serialize_binary(scene, file=file)
     
     # HACK: force all attributes to float32
     # for visual in scene.get('visuals', []):
@@ -174,7 +275,9 @@ def serialize(scene):
     return scene_json
 
 def deserialize(scene_json):
-    """Deserialize a scene."""
+    """Deserialize a scene, in the JSON or in the binary format."""
+    if is_binary(scene_json):
+        return deserialize_binary(scene_json)
     scene = json.loads(scene_json)
     for visual in scene.get('visuals', []):
         if is_str(visual.get('bounds', None)):
@@ -189,4 +292,159 @@ def deserialize(scene_json):
                 variable['data'] = decode_data(variable['data'], dtype)
     return scene
 
-    
\ No newline at end of file
+
+# Binary serialization
+# --------------------
+# The binary format contains:
+#   * the magic string BINARY_MAGIC (8 bytes),
+#   * the length of the JSON header, as a little-endian uint64,
+#   * the JSON header, with the scene where every array is replaced by a
+#     {"__ndarray__": index} placeholder, and the list of arrays with their
+#     dtype, shape and offset,
+#   * the raw array data, each array starting at an offset aligned on
+#     BINARY_ALIGNMENT bytes.
+BINARY_MAGIC = 'GALRYSC1'
+BINARY_ALIGNMENT = 64
+
+def align(offset):
+    """Return the next aligned offset."""
+    return ((offset + BINARY_ALIGNMENT - 1) // BINARY_ALIGNMENT) * \
+        BINARY_ALIGNMENT
+
+class BinaryArrayEncoder(json.JSONEncoder):
+    """JSON encoder that replaces Numpy arrays by placeholders and collects
+    them in `self.arrays`."""
+    def __init__(self, *args, **kwargs):
+        super(BinaryArrayEncoder, self).__init__(*args, **kwargs)
+        self.arrays = []
+        
+    def default(self, obj):
+        if isinstance(obj, DataSource):
+            obj = np.asarray(obj)
+        if isinstance(obj, np.ndarray):
+            self.arrays.append(obj)
+            return {'__ndarray__': len(self.arrays) - 1}
+        return json.JSONEncoder.default(self, obj)
+        
+def is_binary(data):
+    """Return whether serialized data is in the binary format."""
+    if isinstance(data, np.ndarray):
+        data = data[:len(BINARY_MAGIC)].tostring()
+    elif isinstance(data, bytearray):
+        data = str(data[:len(BINARY_MAGIC)])
+    return isinstance(data, basestring) and data[:len(BINARY_MAGIC)] == \
+        BINARY_MAGIC
+        
+def serialize_binary(scene, file=None):
+    """Serialize a scene in the binary format.
+    
+    Arguments:
+      * scene: the scene dictionary.
+      * file=None: a file object where to write the scene, or None.
+    
+    Returns:
+      * data: None if file is specified, or a bytearray with the serialized
+        scene. The arrays are copied once, directly into that bytearray.
+    
+    """
+    encoder = BinaryArrayEncoder(ensure_ascii=True)
+    scene_json = encoder.encode(scene)
+    arrays = [np.ascontiguousarray(arr) for arr in encoder.arrays]
+    
+    # compute the offsets of the arrays, relative to the data section
+    infos = []
+    offset = 0
+    for arr in arrays:
+        infos.append({'dtype': arr.dtype.str, 'shape': arr.shape,
+                      'offset': offset})
+        offset = align(offset + arr.nbytes)
+    header = '{"scene": %s, "arrays": %s}' % (scene_json, json.dumps(infos))
+    
+    # the data section starts at an aligned offset
+    start = align(len(BINARY_MAGIC) + 8 + len(header))
+    prefix = BINARY_MAGIC + struct.pack('<Q', len(header)) + header
+    prefix += '\0' * (start - len(prefix))
+    
+    if file is not None:
+        file.write(prefix)
+        position = 0
+        for arr, info in zip(arrays, infos):
+            file.write('\0' * (info['offset'] - position))
+            file.write(arr.data)
+            position = info['offset'] + arr.nbytes
+        return None
+    
+    data = bytearray(start + offset)
+    data[:start] = prefix
+    view = np.frombuffer(data, dtype=np.uint8)
+    for arr, info in zip(arrays, infos):
+        o = start + info['offset']
+        view[o:o + arr.nbytes] = arr.reshape(-1).view(np.uint8)
+    return data
+    
+def deserialize_binary(data):
+    """Deserialize a scene in the binary format.
+    
+    Arguments:
+      * data: a string, a bytearray, or a uint8 array such as a `np.memmap`.
+    
+    Returns:
+      * scene: the scene dictionary, where all arrays are views on `data`
+        (no copy is made).
+    
+    """
+    n = len(BINARY_MAGIC)
+    if isinstance(data, np.ndarray):
+        header_length = struct.unpack('<Q', data[n:n + 8].tostring())[0]
+        header = data[n + 8:n + 8 + header_length].tostring()
+    else:
+        header_length = struct.unpack('<Q', str(data[n:n + 8]))[0]
+        header = str(data[n + 8:n + 8 + header_length])
+    header = json.loads(header)
+    start = align(n + 8 + header_length)
+    
+    arrays = []
+    for info in header['arrays']:
+        dtype = np.dtype(str(info['dtype']))
+        shape = tuple(info['shape'])
+        count = int(np.prod(shape))
+        if isinstance(data, np.ndarray):
+            o = start + info['offset']
+            arr = data[o:o + count * dtype.itemsize].view(dtype)
+        else:
+            arr = np.frombuffer(data, dtype=dtype, count=count,
+                offset=start + info['offset'])
+        arrays.append(arr.reshape(shape))
+        
+    # replace the placeholders by the arrays
+    def resolve(obj):
+        if isinstance(obj, dict):
+            if '__ndarray__' in obj and len(obj) == 1:
+                return arrays[obj['__ndarray__']]
+            return dict([(k, resolve(v)) for k, v in obj.iteritems()])
+        elif isinstance(obj, list):
+            return [resolve(v) for v in obj]
+        return obj
+    return resolve(header['scene'])
+    
+def save_scene(scene, filename):
+    """Save a scene in a file, in the binary format."""
+    with open(filename, 'wb') as f:
+        serialize_binary(scene, file=f)
+        
+def load_scene(filename, mmap=True):
+    """Load a scene saved with `save_scene`.
+    
+    Arguments:
+      * filename: the file name.
+      * mmap=True: whether to memory-map the file. In this case, the arrays
+        are read from the disk only when needed. They are copy-on-write,
+        so that modifying them does not change the file.
+    
+    """
+    if mmap:
+        data = np.memmap(filename, dtype=np.uint8, mode='c')
+    else:
+        with open(filename, 'rb') as f:
+            data = bytearray(f.read())
+    return deserialize_binary(data)
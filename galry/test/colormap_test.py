@@ -0,0 +1,20 @@
+import unittest
+from galry import *
+import numpy as np
+
+class ColormapTest(unittest.TestCase):
+    def test_gray(self):
+        colormap = get_colormap('gray', 5)
+        self.assertEqual(colormap.shape, (1, 5, 3))
+        self.assertTrue(np.allclose(colormap[0,:,0], [0., .25, .5, .75, 1.]))
+        
+    def test_rainbow(self):
+        colormap = get_colormap(n=16)
+        self.assertEqual(colormap.shape, (1, 16, 3))
+        self.assertTrue(colormap.min() >= 0. and colormap.max() <= 1.)
+        
+    def test_unknown(self):
+        self.assertRaises(ValueError, get_colormap, 'unknown')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from galry.visuals.fontmaps import get_font_atlas, get_codes, get_sdf
+
+class FontAtlasTest(unittest.TestCase):
+    def test_codes(self):
+        self.assertEqual(list(get_codes("ab")), [97, 98])
+        self.assertEqual(list(get_codes(u"a\u4e00")), [97, 0x4e00])
+        
+    def test_cache(self):
+        atlas = get_font_atlas('segoe', 14)
+        self.assertTrue(get_font_atlas('segoe', 14) is atlas)
+        
+    def test_best_size(self):
+        # there is no bitmap font of size 15, so the size 14 is loaded
+        atlas = get_font_atlas('segoe', 15)
+        self.assertTrue(get_font_atlas('segoe', 14) is atlas)
+        self.assertEqual(atlas.name, 'segoe14')
+        # the letter spacing still depends on the requested size
+        self.assertEqual(atlas.get_letter_spacing(15), 100 + 17. * 15)
+        
+    def test_map(self):
+        atlas = get_font_atlas('segoe', 14)
+        text_map = atlas.get_map(u"ab\u4e00")
+        self.assertEqual(text_map.shape, (3, 4))
+        # normalized coordinates in the atlas
+        self.assertTrue(np.all(text_map >= 0) and np.all(text_map <= 1))
+        self.assertTrue(text_map[0, 2] > 0)
+        # characters missing in bitmap fonts are blank
+        self.assertTrue(np.all(text_map[2] == 0))
+        
+    def test_sdf(self):
+        alpha = np.zeros((20, 20), dtype=np.uint8)
+        alpha[5:15, 5:15] = 255
+        sdf = get_sdf(alpha, spread=4)
+        # inside above .5, outside below, increasing towards the center
+        self.assertTrue(np.all(sdf[5:15, 5:15] > 127))
+        self.assertTrue(np.all(sdf[:5] < 128))
+        self.assertTrue(sdf[10, 10] > sdf[10, 5])
+        self.assertEqual(sdf[0, 0], 0)
+        
+    def test_sdf_atlas(self):
+        # a single distance field atlas serves all sizes
+        atlas = get_font_atlas('segoe', 14, sdf=True)
+        self.assertTrue(get_font_atlas('segoe', 40, sdf=True) is atlas)
+        self.assertTrue(get_font_atlas('segoe', 14) is not atlas)
+        text_map, advance = atlas.get_glyphs("ab")
+        # the glyphs have margins for the distance field
+        self.assertTrue(np.all(text_map[:,2] > advance))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from galry import *
+
+class FrameProfilerTest(unittest.TestCase):
+    def get_profiler(self):
+        profiler = FrameProfiler(maxlen=3)
+        for duration in (.001, .002, .003, .004):
+            profiler.add(('visual0', 'draw'), duration)
+        profiler.add(('visual1', 'draw'), .010)
+        profiler.add('frame', .002)
+        return profiler
+        
+    def test_record(self):
+        profiler = FrameProfiler()
+        t = profiler.time()
+        t2 = profiler.record('frame', t)
+        self.assertTrue(t2 >= t)
+        last, mean, max = profiler.get_stats()['frame']
+        self.assertAlmostEqual(last, (t2 - t) * 1000.)
+        
+    def test_stats(self):
+        stats = self.get_profiler().get_stats()
+        # sections in the order of their first record
+        self.assertEqual(stats.keys(),
+            [('visual0', 'draw'), ('visual1', 'draw'), 'frame'])
+        # only the last 3 durations are kept, in milliseconds
+        last, mean, max = stats[('visual0', 'draw')]
+        self.assertAlmostEqual(last, 4.)
+        self.assertAlmostEqual(mean, 3.)
+        self.assertAlmostEqual(max, 4.)
+        
+    def test_text(self):
+        profiler = self.get_profiler()
+        lines = profiler.get_text().split("\n")
+        # most expensive sections first
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("visual1 draw: 10.00 ms"))
+        self.assertTrue(lines[1].startswith("visual0 draw: 3.00 ms"))
+        self.assertTrue(lines[2].startswith("frame: 2.00 ms"))
+        self.assertEqual(profiler.get_text(n=2).split("\n"), lines[:2])
+        profiler.reset()
+        self.assertEqual(profiler.get_text(), "")
+
+if __name__ == '__main__':
+    unittest.main()
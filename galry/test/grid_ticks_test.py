@@ -0,0 +1,22 @@
+import unittest
+from galry.processors.grid_processor import get_ticks, get_ticks_text
+
+class GridTicksTest(unittest.TestCase):
+    def test_translation(self):
+        # the ticks do not change when the view is translated within a tick
+        ticks0, nfrac0 = get_ticks(.13, 1.23)
+        ticks1, nfrac1 = get_ticks(.17, 1.27)
+        self.assertEqual(tuple(ticks0), tuple(ticks1))
+        self.assertEqual(nfrac0, nfrac1)
+        
+    def test_text(self):
+        ticksx, nfracx = get_ticks(0., 1.)
+        ticksy, nfracy = get_ticks(-10., 10.)
+        text, coordinates, n = get_ticks_text(ticksx, nfracx, ticksy, nfracy)
+        self.assertEqual(n, len(ticksx))
+        self.assertEqual(len(text), len(ticksx) + len(ticksy))
+        self.assertEqual(text[0], "0")
+        self.assertEqual(coordinates.shape, (len(text), 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from galry import *
+import numpy as np
+
+class ImagePyramidTest(unittest.TestCase):
+    def test_levels(self):
+        pyramid = ImagePyramid(np.zeros((1000, 300, 3)), tile_size=256)
+        self.assertEqual(pyramid.nlevels, 3)
+        self.assertEqual(pyramid.get_tile_count(0), (4, 2))
+        self.assertEqual(pyramid.get_tile_count(2), (1, 1))
+        
+    def test_tile(self):
+        image = np.random.randint(size=(300, 200), low=0, high=255
+            ).astype(np.uint8)
+        pyramid = ImagePyramid(image, tile_size=128)
+        tile = pyramid.get_tile((1, 0, 0))
+        self.assertEqual(tile.shape, (128, 128, 3))
+        # average of the 2x2 blocks
+        block = image[:256,:].reshape((128, 2, 100, 2)).astype(np.float64)
+        expected = np.round(block.mean(axis=3).mean(axis=1))
+        self.assertTrue(np.array_equal(tile[:,:100,0], expected))
+        # padding
+        self.assertTrue(np.all(tile[:,100:,:] == 0))
+        
+    def test_visible_tiles(self):
+        pyramid = ImagePyramid(np.zeros((1000, 1000, 3)), tile_size=256)
+        self.assertEqual(pyramid.get_visible_tiles(0, (300, 0, 600, 200)),
+            [(0, 0, 1), (0, 0, 2)])
+        self.assertEqual(pyramid.get_level((0, 0, 1000, 1000), 250), 2)
+        
+    def test_cache(self):
+        pyramid = ImagePyramid(np.ones((512, 512, 3)), tile_size=256)
+        cache = TileCache(pyramid, 2)
+        keys = [(0, 0, 0), (0, 1, 1)]
+        slots = {}
+        while len(slots) < 2:
+            slots, uploads = cache.update(keys)
+        self.assertEqual(sorted(slots.values()), [0, 1])
+        # the slot of the tile which is not visible anymore is recycled
+        keys = [(0, 1, 1), (0, 0, 1)]
+        slot = slots[(0, 0, 0)]
+        while (0, 0, 1) not in slots:
+            slots, uploads = cache.update(keys)
+        self.assertEqual(slots[(0, 0, 1)], slot)
+        self.assertEqual(uploads[0][1].shape, (256, 256, 3))
+        
+    def test_odd_size(self):
+        image = np.random.rand(5, 3)
+        pyramid = ImagePyramid(image, tile_size=2)
+        self.assertEqual(pyramid.nlevels, 3)
+        tile = pyramid.get_tile((1, 1, 0))
+        # the last row and column of the image are averaged with themselves
+        self.assertTrue(np.allclose(tile[0,0,0], image[4,:2].mean()))
+        self.assertTrue(np.allclose(tile[0,1,0], image[4,2]))
+        self.assertTrue(np.all(tile[1,:,:] == 0))
+        # the top level is the average of the level below
+        level1 = pyramid.get_tile((1, 0, 0))
+        top = pyramid.get_tile((2, 0, 0))
+        self.assertTrue(np.allclose(top[0,0,0], level1[:,:,0].mean()))
+        
+if __name__ == '__main__':
+    unittest.main()
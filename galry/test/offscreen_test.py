@@ -0,0 +1,39 @@
+import unittest
+from galry import *
+from galry.offscreen import get_default_backend
+import numpy as np
+
+def get_backend():
+    """Return the offscreen backend PyOpenGL was set up with, or None if
+    there is none or if it cannot be imported."""
+    backend = get_default_backend()
+    try:
+        if backend == 'egl':
+            from OpenGL import EGL
+        elif backend == 'osmesa':
+            from OpenGL import osmesa
+    except ImportError:
+        return None
+    return backend
+
+class OffscreenTest(unittest.TestCase):
+    def test_backend_mismatch(self):
+        backend = 'osmesa' if get_default_backend() == 'egl' else 'egl'
+        self.assertRaises(RuntimeError, OffscreenContext, size=(20, 20),
+            backend=backend)
+
+    @unittest.skipIf(get_backend() is None,
+        "PYOPENGL_PLATFORM is not set to an offscreen backend available here")
+    def test_render_to_array(self):
+        scene = SceneCreator()
+        scene.add_visual(PlotVisual, x=[-.5, .5, .5, -.5, -.5],
+            y=[-.5, -.5, .5, .5, -.5], color=(1., 1., 1., 1.))
+        image = render_to_array(scene.get_scene(), size=(100, 100))
+        self.assertEqual(image.shape, (100, 100, 4))
+        self.assertEqual(image.dtype, np.uint8)
+        # the square outline is drawn, but not its inside
+        self.assertTrue(np.any(image[..., :3] > 0))
+        self.assertTrue(np.all(image[40:60, 40:60, :3] == 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+from galry import *
+
+class Parent(object):
+    constrain_ratio = False
+
+class PaintDirtyTest(unittest.TestCase):
+    def test_dirty(self):
+        paint_manager = PaintManager(Parent())
+        self.assertTrue(paint_manager.is_dirty())
+        paint_manager.dirty = False
+        self.assertFalse(paint_manager.is_dirty())
+        paint_manager.set_data(visual='visual0', color=(1., 1., 1., 1.))
+        self.assertTrue(paint_manager.is_dirty())
+
+if __name__ == '__main__':
+    unittest.main()
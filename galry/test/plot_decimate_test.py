@@ -0,0 +1,24 @@
+import unittest
+from galry import *
+from test import GalryTest
+import numpy as np
+
+
+class PM(PaintManager):
+    def initialize(self):
+        n = 100000
+        v = np.linspace(-.5, .5, n)
+        w = .5 * np.ones(n)
+        x = np.vstack((v, -v, w, -w))
+        y = np.vstack((-w, w, v, -v))
+        
+        self.add_visual(PlotVisual, x=x, y=y, decimate=500,
+            primitive_type='LINE_STRIP')
+
+class PlotDecimateTest(GalryTest):
+    def test(self):
+        self.show(paint_manager=PM)
+
+if __name__ == '__main__':
+    unittest.main()
+    # show_basic_window(paint_manager=PM)
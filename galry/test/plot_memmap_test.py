@@ -0,0 +1,35 @@
+import unittest
+import os
+import tempfile
+from galry import *
+from test import GalryTest
+import numpy as np
+
+class PM(PaintManager):
+    def initialize(self):
+        # the coordinates are read from the file when uploading
+        position = np.array([[-.5, -.5], [.5, -.5], [.5, .5], [-.5, .5],
+            [-.5, -.5]], dtype=np.float64)
+        fd, self.filename = tempfile.mkstemp(suffix='.npy')
+        os.close(fd)
+        np.save(self.filename, position)
+        position = np.load(self.filename, mmap_mode='r')
+        self.add_visual(PlotVisual, x=position[:,0], y=position[:,1],
+            color=(1., 1., 1., 1.))
+
+class PlotMemmapTest(GalryTest):
+    def test(self):
+        self.show(paint_manager=PM)
+        
+    def test_source(self):
+        x = np.linspace(-1., 1., 100)
+        y = np.sin(x).reshape((4, 25))
+        source = PositionSource(None, y)
+        self.assertEqual(source.shape, (100, 2))
+        self.assertEqual(source[10:20].dtype, np.float32)
+        self.assertTrue(np.allclose(source[:25,0], np.linspace(0., 1., 25)))
+        self.assertTrue(np.allclose(source[30:40,1], y.ravel()[30:40]))
+        self.assertTrue(np.allclose(np.asarray(source)[:,1], y.ravel()))
+
+if __name__ == '__main__':
+    unittest.main()
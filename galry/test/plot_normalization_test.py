@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from galry import *
+
+class Parent(object):
+    constrain_ratio = False
+
+class PM(PlotPaintManager):
+    def initialize(self):
+        self.add_visual(PlotVisual, x=[0., 10.], y=[0., 10.], name='plot')
+        self.add_visual(PlotVisual, x=[0., 10.], y=[0., 10.],
+            name='streaming', streaming=True)
+        self.add_visual(PlotVisual, x=[0., 10.], y=[0., 10.],
+            name='deferred', deferred=True)
+
+def get_position(paint_manager, name):
+    visual = paint_manager.get_visual(name)
+    return [var['data'] for var in visual['variables']
+        if var['name'] == 'position'][0]
+
+class PMMemmap(PlotPaintManager):
+    def initialize(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.npy')
+        os.close(fd)
+        np.save(self.filename, np.array([[0., 20.], [10., 0.]]))
+        y = np.load(self.filename, mmap_mode='r')
+        self.add_visual(PlotVisual, x=[0., 10.], y=[0., 10.], name='plot')
+        self.add_visual(PlotVisual, x=[0., 10.], y=y[0], name='memmap')
+
+class PlotNormalizationTest(unittest.TestCase):
+    def setUp(self):
+        self.paint_manager = PM(Parent())
+        self.paint_manager.initialize()
+        self.paint_manager.finalize()
+
+    def test_deferred(self):
+        # the deferred visual is added after finalize
+        self.paint_manager.get_deferred_visuals(wait=True)
+        np.testing.assert_array_almost_equal(
+            get_position(self.paint_manager, 'plot'), [[-1., -1.], [1., 1.]])
+        np.testing.assert_array_almost_equal(
+            get_position(self.paint_manager, 'deferred'),
+            [[-1., -1.], [1., 1.]])
+
+    def test_appended(self):
+        position = np.array([[0., 0.], [5., 10.]])
+        kwargs = self.paint_manager.normalize_appended('streaming',
+            dict(position=position))
+        np.testing.assert_array_almost_equal(kwargs['position'],
+            [[-1., -1.], [0., 1.]])
+        # the rows of the caller are not modified
+        np.testing.assert_array_equal(position, [[0., 0.], [5., 10.]])
+
+    def test_memmap(self):
+        paint_manager = PMMemmap(Parent())
+        try:
+            paint_manager.initialize()
+            paint_manager.finalize()
+            # the bounds of the memory-mapped plot are in the viewbox
+            self.assertEqual(paint_manager.normalization_viewbox,
+                (0., 0., 10., 20.))
+            position = get_position(paint_manager, 'memmap')
+            self.assertTrue(isinstance(position, DataSource))
+            # the rows are normalized when they are read
+            np.testing.assert_array_almost_equal(position[:],
+                [[-1., -1.], [1., 1.]])
+            np.testing.assert_array_almost_equal(
+                get_position(paint_manager, 'plot'), [[-1., -1.], [1., 0.]])
+        finally:
+            os.remove(paint_manager.filename)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+import numpy as np
+from galry import *
+from test import GalryTest
+
+class PM(PaintManager):
+    def initialize(self):
+        # same options, hence the same shader program, but different colors
+        x = [-.5, .5, .5, -.5, -.5]
+        y = [-.5, -.5, .5, .5, -.5]
+        self.add_visual(PlotVisual, x=x, y=y, color=(1., 1., 1., 1.))
+        self.add_visual(PlotVisual, x=[-.25, .25], y=[0., 0.],
+            color=(0., 0., 0., 1.))
+
+class PlotSharedProgramTest(GalryTest):
+    def test(self):
+        self.show(paint_manager=PM)
+
+if __name__ == '__main__':
+    unittest.main()
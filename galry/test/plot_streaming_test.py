@@ -0,0 +1,33 @@
+import unittest
+from galry import *
+from test import GalryTest
+import numpy as np
+
+
+class PM(PaintManager):
+    def initialize(self):
+        n = 1000
+        v = np.linspace(-.5, .5, n)
+        w = .5 * np.ones(n)
+        x = np.vstack((v, -v, w, -w))
+        y = np.vstack((-w, w, v, -v))
+        
+        # random initial values
+        self.add_visual(PlotVisual, x=np.random.randn(4, n),
+            y=np.random.randn(4, n), color=(1.,) * 4, streaming=True,
+            primitive_type='LINE_STRIP')
+        
+        # the circular buffers wrap around, and all values are replaced
+        self.append(position=np.random.randn(4 * 10, 2))
+        position = np.empty((4 * n, 2))
+        position[:,0] = x.ravel()
+        position[:,1] = y.ravel()
+        self.append(position=position)
+
+class PlotStreamingTest(GalryTest):
+    def test(self):
+        self.show(paint_manager=PM)
+
+if __name__ == '__main__':
+    unittest.main()
+    # show_basic_window(paint_manager=PM)
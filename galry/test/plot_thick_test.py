@@ -0,0 +1,35 @@
+import unittest
+from galry import *
+import numpy as np
+
+class PlotThickTest(unittest.TestCase):
+    def test_line(self):
+        scene = SceneCreator()
+        x = np.tile(np.linspace(-1., 1., 5), (2, 1))
+        y = np.vstack((np.zeros(5), np.ones(5)))
+        visual = scene.add_visual(PlotVisual, x=x, y=y, thickness=3)
+        self.assertEqual(visual.primitive_type, 'TRIANGLE_STRIP')
+        self.assertEqual(visual.size, 2 * (2 * 5 + 4))
+        self.assertEqual(list(visual.bounds), [0, visual.size - 4])
+        line = visual.variables['line']['data'].reshape((2, 14, 3))
+        # two vertices per sample, on both sides of the line
+        self.assertTrue(np.array_equal(line[:,2:-2:2,:2], line[:,3:-2:2,:2]))
+        self.assertTrue(np.all(line[:,2:-2,2] == np.tile([-1, 1], 5)))
+        # guard vertices are not extruded
+        self.assertTrue(np.all(line[:,:2,2] == 0))
+        self.assertTrue(np.all(line[:,-2:,2] == 0))
+        self.assertTrue(np.allclose(line[1,:2,:2], [-1., 1.]))
+        self.assertTrue(np.allclose(line[1,-2:,:2], [1., 1.]))
+        
+    def test_update(self):
+        scene = SceneCreator()
+        x = np.linspace(-1., 1., 5)
+        visual = scene.add_visual(PlotVisual, x=x, y=x, thickness=3)
+        position = np.random.rand(10, 2)
+        line = visual.thick_line_compound(position)
+        self.assertEqual(line['size'], 24)
+        self.assertEqual(line['bounds'], [0, 20])
+        self.assertTrue(np.allclose(line['line'][2:-2:2,:2], position))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from galry import PointIndex
+
+class PointIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.position = np.random.randn(10000, 2)
+        self.index = PointIndex(self.position)
+        
+    def test_box(self):
+        x, y = self.position.T
+        expected = np.nonzero((x >= -.5) & (x <= .2) &
+                              (y >= -.1) & (y <= .8))[0]
+        np.testing.assert_array_equal(
+            self.index.query_box(-.5, -.1, .2, .8), expected)
+        self.assertEqual(
+            self.index.query_box(-.5, -.1, .2, .8, return_mask=True).sum(),
+            len(expected))
+        self.assertEqual(len(self.index.query_box(10, 10, 11, 11)), 0)
+        
+    def test_polygon(self):
+        # star-shaped polygon, and a self-intersecting one
+        t = np.linspace(0, 2 * np.pi, 50, endpoint=False)
+        r = 1 + .5 * np.sin(5 * t)
+        star = np.c_[r * np.cos(t) + .2, r * np.sin(t)]
+        bowtie = np.array([[-1., -1.], [1., 1.], [1., -1.], [-1., 1.]])
+        x, y = self.position.T
+        for polygon in (star, bowtie):
+            # crossing number of every point
+            inside = np.zeros(len(x), dtype=np.bool_)
+            for (xa, ya), (xb, yb) in zip(polygon,
+                    np.roll(polygon, -1, axis=0)):
+                if ya == yb:
+                    continue
+                crossing = (ya > y) != (yb > y)
+                crossing &= x < xa + (y - ya) * (xb - xa) / (yb - ya)
+                inside ^= crossing
+            np.testing.assert_array_equal(
+                self.index.query_polygon(polygon), np.nonzero(inside)[0])
+            np.testing.assert_array_equal(
+                self.index.query_polygon(polygon, return_mask=True), inside)
+        self.assertEqual(len(self.index.query_polygon(star + 10)), 0)
+        self.assertEqual(len(self.index.query_polygon(star[:2])), 0)
+        
+    def test_nearest(self):
+        x, y = self.position.T
+        distance = ((x - .1) / .05) ** 2 + ((y + .2) / .1) ** 2
+        expected = np.argmin(distance)
+        self.assertEqual(self.index.query_nearest(.1, -.2, .05, .1),
+            expected)
+        index, d = self.index.query_nearest(.1, -.2, .05, .1,
+            return_distance=True)
+        self.assertAlmostEqual(d, distance[expected])
+        self.assertEqual(self.index.query_nearest(10, 10, .1), None)
+        
+    def test_nan(self):
+        index = PointIndex(np.array([[0., 0.], [np.nan, 1.], [1., 1.]]))
+        np.testing.assert_array_equal(index.query_box(-1, -1, 2, 2), [0, 2])
+        self.assertEqual(index.query_nearest(1., 1., .1), 2)
+
+if __name__ == '__main__':
+    unittest.main()
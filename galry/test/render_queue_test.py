@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from galry import *
+from galry.glrenderer import ShaderManager
+
+class Dummy(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+def get_renderers(programs):
+    return [Dummy(name=i, shader_manager=Dummy(program=program))
+        for i, program in enumerate(programs)]
+
+class RenderQueueTest(unittest.TestCase):
+    def test_consecutive(self):
+        renderer = GLRenderer(dict(visuals=[]))
+        batches = renderer.get_render_queue(get_renderers([1, 1, 2, 1, 1]))
+        self.assertEqual([[vr.name for vr in batch] for batch in batches],
+            [[0, 1], [2], [3, 4]])
+        
+    def test_sorted(self):
+        renderer = GLRenderer(dict(visuals=[],
+            renderer_options=dict(sort_visuals=True)))
+        batches = renderer.get_render_queue(get_renderers([1, 2, 1, 3, 2]))
+        self.assertEqual([[vr.name for vr in batch] for batch in batches],
+            [[0, 2], [1, 4], [3]])
+
+    def test_uniform_values(self):
+        shader_manager = ShaderManager.__new__(ShaderManager)
+        shader_manager.key = (None, 'test_uniform_values')
+        self.assertTrue(shader_manager.set_uniform_value(0, (1., 2.)))
+        # the same value does not need to be uploaded again
+        self.assertFalse(shader_manager.set_uniform_value(0,
+            np.array([1., 2.])))
+        self.assertTrue(shader_manager.set_uniform_value(0, (1., 3.)))
+        self.assertTrue(shader_manager.set_uniform_value(1, (1., 3.)))
+
+if __name__ == '__main__':
+    unittest.main()
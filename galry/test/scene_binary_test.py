@@ -0,0 +1,54 @@
+import unittest
+import os
+import tempfile
+from galry import *
+import numpy as np
+
+class SceneBinaryTest(unittest.TestCase):
+    def get_scene(self):
+        scene = SceneCreator()
+        x = np.linspace(-1., 1., 1000)
+        y = np.sin(10 * x)
+        scene.add_visual(PlotVisual, x=x, y=y, color=(1., 1., 0., 1.))
+        return scene
+
+    def assert_same_scene(self, scene1, scene2):
+        for visual1, visual2 in zip(scene1['visuals'], scene2['visuals']):
+            for var1, var2 in zip(visual1['variables'],
+                                  visual2['variables']):
+                self.assertEqual(var1['name'], var2['name'])
+                data1, data2 = var1.get('data', None), var2.get('data', None)
+                if isinstance(data1, np.ndarray):
+                    self.assertEqual(data1.dtype, data2.dtype)
+                    self.assertTrue(np.array_equal(data1, data2))
+
+    def test_bytes(self):
+        scene = self.get_scene()
+        data = scene.serialize(format='binary')
+        self.assert_same_scene(scene.get_scene(), deserialize(data))
+
+    def test_json(self):
+        scene = self.get_scene()
+        scene2 = deserialize(scene.serialize())
+        self.assert_same_scene(scene.get_scene(), scene2)
+        # the decoded arrays can be modified in place
+        for visual in scene2['visuals']:
+            for var in visual['variables']:
+                data = var.get('data', None)
+                if isinstance(data, np.ndarray):
+                    self.assertTrue(data.flags.writeable)
+
+    def test_file(self):
+        scene = self.get_scene()
+        fd, filename = tempfile.mkstemp(suffix='.galry')
+        os.close(fd)
+        try:
+            save_scene(scene.get_scene(), filename)
+            self.assert_same_scene(scene.get_scene(), load_scene(filename))
+            self.assert_same_scene(scene.get_scene(),
+                load_scene(filename, mmap=False))
+        finally:
+            os.remove(filename)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from galry import *
+import numpy as np
+
+class SceneDeferredTest(unittest.TestCase):
+    def add_visuals(self, scene):
+        x = np.linspace(-1., 1., 1000)
+        scene.add_visual(PlotVisual, x=x, y=np.sin(x), deferred=True)
+        scene.add_visual(PlotVisual, x=x, y=np.cos(x))
+        scene.add_visual(PlotVisual, x=x, y=np.tan(x), thickness=3,
+            deferred=True)
+        
+    def test_order(self):
+        scene = SceneCreator()
+        self.add_visuals(scene)
+        visuals = scene.get_scene()['visuals']
+        self.assertEqual([v['name'] for v in visuals],
+            ['visual0', 'visual1', 'visual2'])
+        self.assertEqual(scene.pending, [])
+        
+    def test_update(self):
+        scene = SceneCreator()
+        self.add_visuals(scene)
+        visuals = scene.update_visuals()
+        visuals += scene.update_visuals(wait=True)
+        self.assertEqual([v['name'] for v in visuals],
+            ['visual0', 'visual1', 'visual2'])
+        self.assertEqual(len(scene.get_visuals()), 3)
+        self.assertEqual(scene.update_visuals(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from galry import *
+import numpy as np
+
+class SurfaceIndexTest(unittest.TestCase):
+    def test_triangles(self):
+        n, m = 3, 4
+        index = get_grid_index(n, m)
+        self.assertEqual(index.dtype, np.uint32)
+        self.assertEqual(len(index), 6 * (n - 1) * (m - 1))
+        self.assertEqual(list(index[:6]), [0, 4, 1, 4, 1, 5])
+        self.assertEqual(index.max(), n * m - 1)
+        
+    def test_strip(self):
+        n, m = 3, 4
+        index = get_grid_index(n, m, strip=True)
+        self.assertEqual(len(index), (n - 1) * (2 * m + 2) - 2)
+        self.assertEqual(list(index),
+            [0, 4, 1, 5, 2, 6, 3, 7, 7, 4, 4, 8, 5, 9, 6, 10, 7, 11])
+
+if __name__ == '__main__':
+    unittest.main()
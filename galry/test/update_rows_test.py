@@ -0,0 +1,22 @@
+import unittest
+from galry import *
+from test import GalryTest
+import numpy as np
+
+class PM(PaintManager):
+    def initialize(self):
+        # a square where two corners are wrong
+        x = np.array([-.5, .5, .1, -.2, -.5])
+        y = np.array([-.5, -.5, .3, .8, -.5])
+        position = np.hstack((x.reshape((-1, 1)), y.reshape((-1, 1))))
+        self.add_visual(PlotVisual, position=position, color=(1., 1., 1., 1.))
+        # then we only update these two corners
+        self.set_data(position=[[.5, .5], [-.5, .5]], rows=slice(2, 4))
+        
+class UpdateRowsTest(GalryTest):
+    def test(self):
+        window = self.show(paint_manager=PM)
+
+if __name__ == '__main__':
+    unittest.main()
+    # show_basic_window(paint_manager=PM)
@@ -25,6 +25,7 @@ __all__ = [
     'run_all_scripts',
     'enforce_dtype',
     'FpsCounter',
+    'FrameProfiler',
     'ordict',
 ]
     
@@ -168,3 +169,70 @@ class FpsCounter(object):
         else:
             return 0.
             
+
+class FrameProfiler(object):
+    """Record the duration of named sections over the last frames.
+    
+    Durations are stored in rolling buffers, one per section. A section
+    is identified by any hashable key, typically a `(visual, step)` tuple.
+    
+    """
+    # number of frames kept in memory
+    maxlen = 100
+    
+    def __init__(self, maxlen=None):
+        if maxlen is None:
+            maxlen = self.maxlen
+        self.maxlen = maxlen
+        self.durations = ordict()
+        
+    def time(self):
+        """Return the current time stamp, in seconds."""
+        return timeit.default_timer()
+        
+    def record(self, key, start):
+        """Record the time elapsed since `start` for a section, and return
+        the current time stamp so that successive sections can be chained."""
+        now = timeit.default_timer()
+        self.add(key, now - start)
+        return now
+        
+    def add(self, key, duration):
+        """Add a duration, in seconds, for a section."""
+        if key not in self.durations:
+            self.durations[key] = collections.deque(maxlen=self.maxlen)
+        self.durations[key].append(duration)
+        
+    def reset(self):
+        """Forget all durations."""
+        self.durations.clear()
+        
+    def get_stats(self):
+        """Return the statistics of all sections.
+        
+        Returns:
+          * stats: an ordered dictionary `{key: (last, mean, max)}`, with
+            durations in milliseconds.
+        
+        """
+        stats = ordict()
+        for key, durations in self.durations.iteritems():
+            if durations:
+                d = np.array(durations) * 1000.
+                stats[key] = (d[-1], d.mean(), d.max())
+        return stats
+        
+    def get_text(self, n=None):
+        """Return a text summary of the most expensive sections (mean
+        duration), one per line."""
+        stats = self.get_stats().items()
+        stats.sort(key=lambda item: -item[1][1])
+        if n is not None:
+            stats = stats[:n]
+        lines = []
+        for key, (last, mean, max) in stats:
+            if isinstance(key, tuple):
+                key = ' '.join(map(str, key))
+            lines.append("%s: %.2f ms (max %.2f)" % (key, mean, max))
+        return "\n".join(lines)
+        
@@ -11,3 +11,4 @@ from graph_visual import *
 from bar_visual import *
 from framebuffer_visual import *
 
+from tiled_image_visual import *
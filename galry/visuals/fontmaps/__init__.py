@@ -1,4 +1,5 @@
 from tools import load_png, load_fnt, get_text_map, load_font
+from atlas import FontAtlas, get_font_atlas, get_codes
 
-__all__ = ["load_png", "load_fnt", "get_text_map", "load_font"]
-
+__all__ = ["load_png", "load_fnt", "get_text_map", "load_font", "FontAtlas",
+    "get_font_atlas", "get_codes"]
@@ -0,0 +1,335 @@
+import os
+import numpy as np
+from galry import log_debug, log_warn
+from tools import get_font_filenames, find_best_size, load_fnt, load_png
+
+__all__ = ["FontAtlas", "get_font_atlas", "get_codes", "get_sdf"]
+
+# Font atlases loaded in this process: {(font, size): FontAtlas}, where the
+# size of bitmap fonts is the closest available size.
+FONT_ATLASES = {}
+# Size of the atlas of fonts rasterized at runtime, in pixels.
+ATLAS_SIZE = 1024
+# Characters rasterized when the atlas is created.
+ATLAS_CHARACTERS = range(32, 127)
+# Size of the glyphs in signed distance field atlases. Bitmap fonts are
+# loaded at the largest available size below.
+SDF_SIZE = 48
+# Distance to the glyph edges covered by signed distance fields, in pixels of
+# the atlas.
+SDF_SPREAD = 6
+
+def get_codes(text):
+    """Return the Unicode code points of a string as an array. Byte strings
+    are decoded as Latin-1, so that there is one code point per byte."""
+    if not isinstance(text, unicode):
+        text = text.decode('latin-1')
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+def get_sdf(alpha, spread=SDF_SPREAD):
+    """Return the signed distance field of a glyph bitmap.
+    
+    The distance to the edge of the glyph is computed up to `spread` pixels,
+    and mapped to [0, 255] with the edge at 127.5, the inside of the glyph
+    being above.
+    
+    """
+    inside = alpha >= 128
+    h, w = inside.shape
+    padded = np.zeros((h + 2 * spread, w + 2 * spread), dtype=np.bool)
+    padded[spread:spread + h, spread:spread + w] = inside
+    distance = np.empty((h, w), dtype=np.float32)
+    distance.fill(spread + .5)
+    # pixels on the other side of the edge, by increasing distance
+    offsets = sorted((np.hypot(dx, dy), dy, dx)
+        for dy in xrange(-spread, spread + 1)
+        for dx in xrange(-spread, spread + 1))
+    for r, dy, dx in offsets:
+        if r == 0 or r > spread:
+            continue
+        shifted = padded[spread + dy:spread + dy + h,
+                         spread + dx:spread + dx + w]
+        distance[(shifted != inside) & (distance > r)] = r
+    # the edge is half a pixel away from the pixels on both sides
+    distance -= .5
+    distance[~inside] *= -1
+    return np.array(np.clip(127.5 + distance * 127.5 / spread, 0, 255),
+        dtype=np.uint8)
+
+def has_bitmap_font(font):
+    """Return whether bitmap font files exist in this folder for a font."""
+    path = os.path.dirname(os.path.realpath(__file__))
+    return any(file.startswith(font) and file.endswith('.fnt')
+        for file in os.listdir(path))
+
+def get_font_atlas(font='segoe', size=24, atlas_size=None, sdf=False):
+    """Return the atlas of a font at a given size, loaded only once in the
+    process. A signed distance field atlas serves all sizes.
+
+    Arguments:
+      * font: the name of a bitmap font of the `fontmaps` folder, the
+        name of a font installed on the system, or the path to a TrueType
+        font file.
+      * size: the font size.
+      * atlas_size=None: the size of the atlas of fonts rasterized at
+        runtime.
+      * sdf=False: whether to return a signed distance field atlas.
+
+    """
+    if sdf:
+        key = (font, 'sdf')
+    else:
+        # requested sizes loading the same bitmap font share its atlas
+        if has_bitmap_font(font):
+            size = find_best_size(font, size)
+        key = (font, size)
+    atlas = FONT_ATLASES.get(key, None)
+    if atlas is None:
+        atlas = FONT_ATLASES[key] = FontAtlas(font, size,
+            atlas_size=atlas_size, sdf=sdf)
+    return atlas
+
+
+class FontAtlas(object):
+    """Texture containing the glyphs of a font at a given size.
+
+    The glyphs come either from a bitmap font generated by AngelCode Bitmap
+    Font Generator (the `.fnt` and `.png` files of this folder), or they are
+    rasterized at runtime with FreeType (through matplotlib) the first time
+    they are requested. Any TrueType font and any Unicode character can then
+    be displayed, until the atlas is full.
+
+    With `sdf=True`, the atlas contains the signed distance field of the
+    glyphs rather than their coverage, with a margin of `SDF_SPREAD` pixels
+    around every glyph. The edges can then be reconstructed at any scale in
+    the fragment shader, so that a single atlas serves all font sizes.
+
+    The atlas is a square texture whose size never changes, so that the
+    texture coordinates of the glyphs remain valid in all visuals sharing it.
+    The `version` is incremented whenever new glyphs are added to the
+    texture.
+
+    """
+    def __init__(self, font='segoe', size=24, atlas_size=None, sdf=False):
+        self.sdf = sdf
+        self.padding = SDF_SPREAD if sdf else 0
+        self.version = 0
+        if sdf:
+            self.name = "%s_sdf" % os.path.basename(font)
+            size = SDF_SIZE
+        else:
+            if has_bitmap_font(font):
+                size = find_best_size(font, size)
+            self.name = "%s%d" % (os.path.basename(font), size)
+        # the row 0 of the glyphs is the blank glyph for missing characters
+        if has_bitmap_font(font):
+            self.load_bitmap_font(font, size)
+        else:
+            self.load_font(font, size, atlas_size or ATLAS_SIZE)
+
+    def load_bitmap_font(self, font, size):
+        """Load a bitmap font."""
+        png, fnt = get_font_filenames(font, size)
+        self.font_size = find_best_size(font, size)
+        # charid, x, y, w, h, for all ids up to the largest one
+        matrix = load_fnt(fnt)
+        texture = load_png(png)
+        if texture.dtype != np.uint8:
+            texture = np.array(255 * texture, dtype=np.uint8)
+        self.face = None
+        self.lookup = np.arange(1, len(matrix) + 1, dtype=np.int32)
+        self.point_size = matrix[:,4].max()
+        # pure heuristic (probably bogus)
+        self.letter_spacing = 100 + 17. * self.font_size
+        if self.sdf:
+            self.pack_bitmap_font(texture, matrix)
+            return
+        self.texture = texture
+        self.size = texture.shape[0]
+        self.glyphs = np.zeros((len(matrix) + 1, 4), dtype=np.float32)
+        self.glyphs[1:] = matrix[:,1:] / float(self.size)
+        self.advances = self.glyphs[:,2].copy()
+        
+    def pack_bitmap_font(self, texture, matrix):
+        """Copy the glyphs of a bitmap font in a new atlas, with margins for
+        their distance fields."""
+        # smallest power of two fitting all glyphs with their margins
+        p = 2 * self.padding
+        area = ((matrix[:,3] + p) * (matrix[:,4] + p)).sum()
+        self.size = 2 ** int(np.ceil(np.log2(np.sqrt(area))))
+        while True:
+            self.initialize_texture()
+            glyphs, advances = [], []
+            for charid, x, y, w, h in matrix:
+                box = (0, 0, 0, 0)
+                if w > 0 and h > 0:
+                    box = self.pack_glyph(texture[y:y + h, x:x + w, 3], 0, 0,
+                        w, h)
+                    if box is None:
+                        break
+                glyphs.append(box)
+                advances.append(w)
+            else:
+                break
+            self.size *= 2
+        self.add_rows(glyphs, advances)
+        # the margins separate the glyphs, so that the distance field can
+        # be computed on all glyphs at once
+        n = self.cursor[1] + self.row_height
+        self.texture[:n,:,3] = get_sdf(self.texture[:n,:,3])
+
+    def load_font(self, font, size, atlas_size):
+        """Load a TrueType font, rasterized at runtime."""
+        from matplotlib.ft2font import FT2Font
+        if not os.path.exists(font):
+            from matplotlib.font_manager import findfont
+            font = findfont(font)
+        log_debug("rasterizing font %s at size %d" % (font, size))
+        self.face = FT2Font(str(font))
+        self.face.set_size(size, 72)
+        self.font_size = size
+        # height of the lines, and position of the baseline from the top
+        self.face.set_text(u"Mgy|", 0.)
+        height = self.face.get_width_height()[1] / 64.
+        descent = self.face.get_descent() / 64.
+        self.point_size = int(np.ceil(height)) + 2
+        self.baseline = self.point_size - 1 - int(np.ceil(descent))
+        self.size = atlas_size
+        self.initialize_texture()
+        # -1 for the characters which have not been rasterized yet
+        self.lookup = -np.ones(128, dtype=np.int32)
+        # with this spacing, the characters are separated by their advance
+        # in pixels (the offsets are in half pixels in the vertex shader)
+        self.letter_spacing = 2. * atlas_size
+        self.add_glyphs(ATLAS_CHARACTERS)
+        
+    def initialize_texture(self):
+        """Create an empty atlas."""
+        # white texture, the glyphs are in the alpha channel
+        self.texture = np.zeros((self.size, self.size, 4), dtype=np.uint8)
+        self.texture[...,:3] = 255
+        # position of the next glyph in the atlas, and height of the row
+        self.cursor = (0, 0)
+        self.row_height = 0
+        self.glyphs = np.zeros((1, 4), dtype=np.float32)
+        self.advances = np.zeros(1, dtype=np.float32)
+
+    def rasterize(self, code):
+        """Rasterize a character, and return its bitmap, the position of the
+        bitmap in the glyph, and the advance of the glyph."""
+        face = self.face
+        code = int(code)
+        advance = face.load_char(code).linearHoriAdvance / 65536.
+        face.set_text(('\\U%08x' % code).decode('unicode-escape'), 0.)
+        face.draw_glyphs_to_bitmap()
+        image = face.get_image()
+        # FT2Image in older versions of matplotlib
+        if hasattr(image, 'as_array'):
+            image = image.as_array()
+        image = np.asarray(image, dtype=np.uint8)
+        left = max(0, int(round(face.get_bitmap_offset()[0] / 64.)))
+        top = self.baseline + int(round(face.get_descent() / 64.)) - \
+            image.shape[0]
+        return image, left, top, advance
+
+    def pack_glyph(self, image, left, top, advance, height):
+        """Copy a glyph bitmap in the atlas, and return the box `(x, y, w,
+        h)` of the glyph with its margins, or None if the atlas is full.
+        
+        Arguments:
+          * image: the bitmap of the glyph.
+          * left, top: the position of the bitmap in the glyph.
+          * advance: the advance of the glyph.
+          * height: the height of the glyph.
+        
+        """
+        p = self.padding
+        w = max(int(np.ceil(advance)), left + image.shape[1]) + 2 * p
+        h = height + 2 * p
+        x, y = self.cursor
+        if x + w > self.size:
+            x, y = 0, y + self.row_height
+            self.row_height = 0
+        if y + h > self.size:
+            return None
+        self.cursor = (x + w, y)
+        self.row_height = max(self.row_height, h)
+        # copy the bitmap in the glyph, clipped to the glyph box
+        i0, j0 = max(0, top), left
+        i1 = min(height, top + image.shape[0])
+        j1 = min(w - 2 * p, left + image.shape[1])
+        if i1 > i0 and j1 > j0:
+            self.texture[y + p + i0:y + p + i1, x + p + j0:x + p + j1, 3] = \
+                image[i0 - top:i1 - top, :j1 - j0]
+        return (x, y, w, h)
+        
+    def add_rows(self, glyphs, advances):
+        """Add the boxes and advances of new glyphs, in pixels."""
+        if glyphs:
+            glyphs = np.array(glyphs, dtype=np.float32) / self.size
+            advances = np.array(advances, dtype=np.float32) / self.size
+            self.glyphs = np.vstack((self.glyphs, glyphs))
+            self.advances = np.hstack((self.advances, advances))
+            self.version += 1
+
+    def add_glyphs(self, codes):
+        """Rasterize characters and add them in the atlas."""
+        glyphs, advances = [], []
+        for code in codes:
+            image, left, top, advance = self.rasterize(code)
+            box = self.pack_glyph(image, left, top, advance, self.point_size)
+            if box is None:
+                log_warn("the font atlas %s is full" % self.name)
+                self.lookup[code] = 0
+                continue
+            if self.sdf:
+                x, y, w, h = box
+                self.texture[y:y + h, x:x + w, 3] = get_sdf(
+                    self.texture[y:y + h, x:x + w, 3])
+            self.lookup[code] = len(self.glyphs) + len(glyphs)
+            glyphs.append(box)
+            advances.append(advance)
+        self.add_rows(glyphs, advances)
+
+    def get_rows(self, codes):
+        """Return the rows of the glyphs of characters, rasterizing the
+        missing ones."""
+        if len(codes) == 0:
+            return np.zeros(0, dtype=np.int32)
+        n = codes.max() + 1
+        if n > len(self.lookup):
+            # characters which cannot be rasterized are blank
+            lookup = np.empty(max(n, 2 * len(self.lookup)), dtype=np.int32)
+            lookup.fill(-1 if self.face is not None else 0)
+            lookup[:len(self.lookup)] = self.lookup
+            self.lookup = lookup
+        rows = self.lookup[codes]
+        missing = rows < 0
+        if missing.any():
+            self.add_glyphs(np.unique(codes[missing]))
+            rows = self.lookup[codes]
+        return rows
+
+    def get_letter_spacing(self, size):
+        """Return the default letter spacing of a text at a given font
+        size."""
+        if self.sdf:
+            # the glyphs of the atlas are scaled to the font size
+            return self.letter_spacing * size / float(self.font_size)
+        if self.face is None:
+            # bitmap fonts: the spacing depends on the requested size, not
+            # on the size of the atlas
+            return 100 + 17. * size
+        return self.letter_spacing
+
+    def get_map(self, text):
+        """Return the text map of a string, i.e. a matrix where line i
+        contains the position and size `(x, y, w, h)` of character i in the
+        atlas, normalized in [0, 1]."""
+        return self.glyphs[self.get_rows(get_codes(text))]
+        
+    def get_glyphs(self, text):
+        """Return the text map of a string, and the advances of its
+        characters, normalized like the text map."""
+        rows = self.get_rows(get_codes(text))
+        return self.glyphs[rows], self.advances[rows]
@@ -112,14 +112,14 @@ class GridVisual(CompoundVisual):
         *args, **kwargs):
         # add lines visual
         self.add_visual(TicksLineVisual, name='lines',
-            position=np.zeros((1,2)),
+            position=np.zeros((1,2)), pickable=False,
             **kwargs)
             
         # add the text visual
         self.add_visual(TicksTextVisual, text='',
             fontsize=14, color=(1., 1., 1., .75), name='text',
             letter_spacing=letter_spacing,
-            background_transparent=background_transparent,
+            background_transparent=background_transparent, pickable=False,
             **kwargs)
         
         
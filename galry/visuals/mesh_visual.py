@@ -193,8 +193,11 @@ class MeshVisual(Visual):
         
         # attributes
         self.add_attribute("position", vartype="float", ndim=3, data=position)
-        self.add_attribute("normal", vartype="float", ndim=3, data=normal)
-        self.add_attribute("color", vartype="float", ndim=4, data=color)
+        # normals and colors can be computed in a custom vertex shader
+        if normal is not None:
+            self.add_attribute("normal", vartype="float", ndim=3, data=normal)
+        if color is not None:
+            self.add_attribute("color", vartype="float", ndim=4, data=color)
         if index is not None:
             self.add_index("index", data=index)
         
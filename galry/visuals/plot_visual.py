@@ -1,10 +1,19 @@
 import numpy as np
-from galry import get_color, get_next_color
+from galry import get_color, get_next_color, DataDecimator, DataSource, \
+    PositionSource, is_lazy
 from visual import Visual
 
 __all__ = ['process_coordinates', 'PlotVisual']
 
 def process_coordinates(x=None, y=None, thickness=None):
+    # memory-mapped or lazy data: the position is only read by chunks
+    # when the attribute is uploaded, see SlicedAttribute.load
+    if is_lazy(x) or is_lazy(y):
+        if y is None:
+            x, y = None, x
+        position = PositionSource(x, y)
+        return position, (position.nplots, position.nsamples)
+    
     # handle the case where x is defined and not y: create x
     if y is None and x is not None:
         if x.ndim == 1:
@@ -35,23 +44,132 @@ def process_coordinates(x=None, y=None, thickness=None):
     
 
 class PlotVisual(Visual):
+    def thick_line_compound(self, position):
+        """Compound function for the position of thick lines.
+        
+        Every sample is duplicated, the two copies being extruded on both
+        sides of the line in the vertex shader. Every plot is surrounded by
+        two pairs of guard vertices which are not extruded, so that all plots
+        are rendered as a single triangle strip with degenerate triangles
+        between them. The previous and next samples are read in the same
+        buffer at an offset.
+        
+        Arguments:
+          * position: a Nx2 array with the raw samples of all plots.
+        
+        Returns:
+          * dict(line=line, size=size, bounds=bounds,
+            primitive_type='TRIANGLE_STRIP'): line is a Mx3 array with the
+            coordinates of the vertices and the side (-1, 1, or 0 for the
+            guard vertices) as a third column.
+        
+        """
+        position = np.asarray(position, dtype=np.float32).reshape(
+            (self.nplots, -1, 2))
+        nplots, nsamples = position.shape[:2]
+        line = np.zeros((nplots, 2 * nsamples + 4, 3), dtype=np.float32)
+        line[:,2:-2:2,:2] = position
+        line[:,3:-2:2,:2] = position
+        line[:,2:-2:2,2] = -1
+        line[:,3:-2:2,2] = 1
+        line[:,:2,:2] = position[:,:1,:]
+        line[:,-2:,:2] = position[:,-1:,:]
+        line = line.reshape((-1, 3))
+        size = line.shape[0]
+        # the last vertices are only read as next vertices
+        return dict(line=line, size=size, bounds=[0, size - 4],
+            primitive_type='TRIANGLE_STRIP')
+        
+    def initialize_thickness(self, thickness):
+        """Extrude thick lines in the vertex shader. The thickness is in
+        pixels and does not depend on the zoom level."""
+        # shared buffer read at different offsets
+        self.add_attribute("line_previous", ndim=3, source="line", offset=0)
+        self.add_attribute("line_next", ndim=3, source="line", offset=4)
+        self.add_uniform("thickness", data=float(thickness))
+        self.add_varying("varying_line_distance", vartype="float", ndim=1)
+        # conversion factor from data coordinates to pixels
+        factor = "window_size / 2."
+        if not self.is_static:
+            factor = "scale * " + factor
+        if self.constrain_ratio:
+            factor += " / viewport"
+        self.add_vertex_main("""
+            // previous and next segments in pixels
+            vec2 line_factor = %s;
+            vec2 line_dir0 = (line.xy - line_previous.xy) * line_factor;
+            vec2 line_dir1 = (line_next.xy - line.xy) * line_factor;
+            if (length(line_dir0) == 0.)
+                line_dir0 = line_dir1;
+            if (length(line_dir1) == 0.)
+                line_dir1 = line_dir0;
+            if (length(line_dir0) == 0.)
+            {
+                line_dir0 = vec2(1., 0.);
+                line_dir1 = line_dir0;
+            }
+            vec2 line_normal0 = normalize(vec2(-line_dir0.y, line_dir0.x));
+            vec2 line_normal1 = normalize(vec2(-line_dir1.y, line_dir1.x));
+            // miter join, limited for sharp angles
+            vec2 line_miter = line_normal0 + line_normal1;
+            if (length(line_miter) < .001)
+                line_miter = line_normal1;
+            else
+                line_miter = normalize(line_miter);
+            // one more pixel for antialiasing
+            float line_width = thickness / 2. + 1.;
+            float line_length = line_width /
+                max(dot(line_miter, line_normal1), .25);
+            gl_Position.xy += line.z * line_miter * line_length * 2. /
+                window_size;
+            varying_line_distance = line.z * line_width;
+        """ % factor, after='viewport')
+        self.add_fragment_main("""
+            out_color.a *= clamp(thickness / 2. + .5 -
+                abs(varying_line_distance), 0., 1.);
+        """, position='last')
+        
     def initialize(self, x=None, y=None, color=None, point_size=1.0,
             position=None, nprimitives=None, index=None,
             color_array_index=None, thickness=None,
-            options=None, autocolor=None, autonormalizable=True):
+            options=None, autocolor=None, autonormalizable=True,
+            decimate=None, streaming=None):
             
         # if position is specified, it contains x and y as column vectors
         if position is not None:
-            position = np.array(position, dtype=np.float32)
-            if thickness:
-                shape = (2 * position.shape[0], 1)
-            else:
-                shape = (1, position.shape[0])
+            if isinstance(position, np.memmap):
+                position = DataSource(position)
+            elif not isinstance(position, DataSource):
+                position = np.array(position, dtype=np.float32)
+            shape = (1, position.shape[0])
         else:
             position, shape = process_coordinates(x=x, y=y)
-            if thickness:
-                shape = (shape[0], 2 * shape[1])
         
+        # lazy data is never copied, which rules out the options below
+        if isinstance(position, DataSource):
+            thickness = decimate = streaming = None
+        
+        # level-of-detail decimation: only the min/max envelope of the
+        # visible samples is uploaded, see DecimationEventProcessor
+        self.decimator = None
+        if decimate and not thickness and index is None and not nprimitives:
+            if decimate is True:
+                decimate = 2048
+            if shape[1] > 2 * decimate:
+                self.decimator = DataDecimator(position[:,0].reshape(shape),
+                    position[:,1].reshape(shape), ncolumns=decimate)
+                position = self.decimator.get_envelope()
+                shape = (shape[0], 2 * decimate)
+        
+        
+        # streaming: every plot is a circular buffer with a guard vertex
+        # mirroring the first slot, see GLVisualRenderer.append
+        if streaming and not thickness and index is None and not nprimitives:
+            position = position.reshape(shape + (2,))
+            position = np.concatenate((position, position[:,:1,:]), axis=1)
+            shape = (shape[0], shape[1] + 1)
+            position = position.reshape((-1, 2))
+            self.add_options(streaming=True)
         
         # register the size of the data
         self.size = np.prod(shape)
@@ -64,41 +182,23 @@ class PlotVisual(Visual):
             nsamples = self.size // nprimitives
         
         
-        # handle thickness
-        if thickness and position.shape[0] >= 2:
-            w = thickness
-            n = self.size
-            X = position
-            Y = np.zeros((n, 2))
-            u = np.zeros((n/2, 2))
-            X2 = np.vstack((X, 2*X[-1,:]-X[-2,:]))
-            u[:,0] = -np.diff(X2[:,1])
-            u[:,1] = np.diff(X2[:,0])
-            r = (u[:,0] ** 2 + u[:,1] ** 2) ** .5
-            rm = r.mean()
-            r[r == 0.] = rm
-            # print u
-            # print r
-            # ind = np.nonzero(r == 0.)[0]
-            # print ind, ind-1
-            # r[ind] = r[ind - 1]
-            u[:,0] /= r
-            u[:,1] /= r
-            Y[::2,:] = X - w * u
-            Y[1::2,:] = X + w * u
-            position = Y
-            x = Y[:,0]
-            y = Y[:,1]
-            # print x
-            # print y
-            self.primitive_type = 'TRIANGLE_STRIP'
-            
-            
-        # register the bounds
-        if nsamples <= 1:
-            self.bounds = [0, self.size]
+        # handle thickness: the lines are extruded in the vertex shader
+        if thickness and index is None and nsamples >= 2:
+            self.nplots = nprimitives
+            line = self.thick_line_compound(position)
+            self.size = line['size']
+            self.bounds = line['bounds']
+            self.primitive_type = line['primitive_type']
+            # number of vertices per plot
+            nsamples = 2 * nsamples + 4
         else:
-            self.bounds = np.arange(0, self.size + 1, nsamples)
+            thickness = None
+            
+            # register the bounds
+            if nsamples <= 1:
+                self.bounds = [0, self.size]
+            else:
+                self.bounds = np.arange(0, self.size + 1, nsamples)
         
         # normalize position
         # if viewbox:
@@ -148,8 +248,17 @@ class PlotVisual(Visual):
             colors_ndim = len(color)
         
         # set position attribute
-        self.add_attribute("position", ndim=2, data=position, 
-            autonormalizable=autonormalizable)
+        if thickness:
+            # the raw samples are updated with the position compound
+            self.position_attribute_name = 'line'
+            self.add_attribute("line", ndim=3, data=line['line'], offset=2,
+                autonormalizable=autonormalizable)
+            self.add_compound("position", fun=self.thick_line_compound,
+                data=position)
+            self.initialize_thickness(thickness)
+        else:
+            self.add_attribute("position", ndim=2, data=position, 
+                autonormalizable=autonormalizable)
         
         if index is not None:
             index = np.array(index)
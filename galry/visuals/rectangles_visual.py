@@ -41,9 +41,89 @@ class RectanglesVisual(PlotVisual):
         
         return dict(position=position)
     
+    def corners_compound(self, data):
+        """Compound function for the coordinates variable, in instanced mode.
+        
+        Arguments:
+          * data: a Nx4 array where each line contains the coordinates of the
+            rectangle corners as (x0, y0, x1, y1)
+        
+        Returns:
+          * dict(corner0=corner0, corner1=corner1): the lower left and upper
+            right corners of all rectangles, with one row per instance.
+        
+        """
+        if type(data) is tuple:
+            data = np.array(data, dtype=np.float32).reshape((1, -1))
+        data = np.asarray(data, dtype=np.float32)
+        corner0 = np.minimum(data[:,:2], data[:,2:])
+        corner1 = np.maximum(data[:,:2], data[:,2:])
+        return dict(corner0=corner0, corner1=corner1)
+    
+    def initialize_instanced(self, coordinates, color, autonormalizable):
+        """Initialize the visual in instanced mode: every rectangle is an
+        instance of a shared unit square, and only its corners and color
+        are stored per rectangle."""
+        nprimitives = coordinates.shape[0]
+        self.size = 4
+        self.instances = nprimitives
+        self.primitive_type = 'TRIANGLE_STRIP'
+        
+        # unit square shared by all instances
+        self.add_attribute("vertex", ndim=2, data=np.array(
+            [[0., 0.], [1., 0.], [0., 1.], [1., 1.]], dtype=np.float32))
+        corners = self.corners_compound(coordinates)
+        self.add_attribute("corner0", ndim=2, data=corners['corner0'],
+            divisor=1, autonormalizable=autonormalizable)
+        self.add_attribute("corner1", ndim=2, data=corners['corner1'],
+            divisor=1, autonormalizable=autonormalizable)
+        self.add_compound("coordinates", fun=self.corners_compound,
+            data=coordinates)
+        self.add_vertex_main("""
+            vec2 position = mix(corner0, corner1, vertex);
+        """)
+        
+        color = get_color(color)
+        if isinstance(color, np.ndarray):
+            # one color per rectangle
+            colors_ndim = color.shape[1]
+            self.add_attribute("color", ndim=colors_ndim, data=color,
+                divisor=1)
+            self.add_varying("varying_color", vartype="float",
+                ndim=colors_ndim)
+            self.add_vertex_main("""
+            varying_color = color;
+            """)
+            color_name = "varying_color"
+        else:
+            colors_ndim = len(color)
+            self.add_uniform("color", ndim=colors_ndim, data=color)
+            color_name = "color"
+        if colors_ndim == 3:
+            self.add_fragment_main("""
+            out_color = vec4(%s, 1.0);
+            """ % color_name)
+        else:
+            self.add_fragment_main("""
+            out_color = %s;
+            """ % color_name)
+    
     def initialize(self, coordinates=None, color=None, autocolor=None,
-        depth=None, autonormalizable=True):
+        depth=None, autonormalizable=True, instanced=False):
+        """Initialize the visual.
+        
+        Arguments:
+          * coordinates: a Nx4 array with the coordinates (x0, y0, x1, y1) of
+            the rectangles, or a 4-tuple for a single rectangle.
+          * color: a single color, or a Nx3 or Nx4 array with one color
+            per rectangle.
+          * instanced=False: whether to use instanced rendering, where
+            every rectangle is an instance of a shared unit square. Only
+            the corners and the color of each rectangle are stored in
+            memory. It requires OpenGL 3.3 or `ARB_instanced_arrays`,
+            otherwise the renderer repeats the square for every rectangle.
         
+        """
         if type(coordinates) is tuple:
             coordinates = np.array(coordinates, dtype=np.float32).reshape((1, -1))
         nprimitives = coordinates.shape[0]
@@ -53,6 +133,11 @@ class RectanglesVisual(PlotVisual):
         
         if color is None:
             color = self.default_color
+        
+        if instanced:
+            self.initialize_instanced(coordinates, color, autonormalizable)
+            self.depth = depth
+            return
             
         # If there is one color per rectangle, repeat the color array so
         # that there is one color per vertex.
@@ -5,10 +5,17 @@ from galry import get_color, get_next_color
     
 class SpriteVisual(Visual):
     """Template displaying one texture in multiple positions with
-    different colors."""
+    different colors.
+    
+    By default, every sprite is a point sprite, whose size is limited by the
+    driver. With `instanced=True`, every sprite is an instance of a shared
+    textured square, which can have any size.
+    
+    """
     
     def initialize(self, x=None, y=None, color=None, autocolor=None,
-            texture=None, position=None, point_size=None, zoomable=False):
+            texture=None, position=None, point_size=None, zoomable=False,
+            instanced=False):
             
         # if position is specified, it contains x and y as column vectors
         if position is not None:
@@ -20,14 +27,22 @@ class SpriteVisual(Visual):
         texsize = float(max(texture.shape[:2]))
         shape = texture.shape
         ncomponents = texture.shape[2]
-        self.size = position.shape[0]
         
         if shape[0] == 1:
             self.ndim = 1
         elif shape[0] > 1:
             self.ndim = 2
         
-        self.primitive_type = 'POINTS'
+        if instanced:
+            # one instance of a square with 4 vertices per sprite
+            self.size = 4
+            self.instances = position.shape[0]
+            self.primitive_type = 'TRIANGLE_STRIP'
+            divisor = 1
+        else:
+            self.size = position.shape[0]
+            self.primitive_type = 'POINTS'
+            divisor = 0
         
         # normalize position
         # if viewbox:
@@ -63,15 +78,17 @@ class SpriteVisual(Visual):
             
             
         texture_shader = """
-        out_color = texture%NDIM%(tex_sampler, gl_PointCoord%POINTCOORD%) * %COLOR%;
+        out_color = texture%NDIM%(tex_sampler, %POINTCOORD%) * %COLOR%;
         """
             
         
         shader_ndim = "%dD" % self.ndim
-        if self.ndim == 1:
-            shader_pointcoord = ".x"
+        if instanced:
+            shader_pointcoord = "varying_tex_coords"
         else:
-            shader_pointcoord = ""
+            shader_pointcoord = "gl_PointCoord"
+        if self.ndim == 1:
+            shader_pointcoord += ".x"
             
         # single color case: no need for a color buffer, just use default color
         if single_color:
@@ -79,7 +96,8 @@ class SpriteVisual(Visual):
             shader_color_name = "color"
         # multiple colors case: color attribute
         else:
-            self.add_attribute("color", ndim=colors_ndim, data=color)
+            self.add_attribute("color", ndim=colors_ndim, data=color,
+                divisor=divisor)
             self.add_varying("varying_color", vartype="float", ndim=colors_ndim)
             self.add_vertex_main("""
             varying_color = color;
@@ -98,7 +116,7 @@ class SpriteVisual(Visual):
         
         # add variables
         self.add_attribute("position", vartype="float", ndim=2, data=position,
-            autonormalizable=True)
+            autonormalizable=True, divisor=divisor)
         self.add_texture("tex_sampler", size=shape, ndim=self.ndim,
             ncomponents=ncomponents)
         self.add_compound("texture", fun=lambda texture: \
@@ -110,7 +128,7 @@ class SpriteVisual(Visual):
         
         if isinstance(point_size, np.ndarray):
             self.add_attribute("point_size", vartype="float", ndim=1,
-                data=point_size)
+                data=point_size, divisor=divisor)
         else:
             self.add_uniform("point_size", vartype="float", ndim=1, data=point_size)
         
@@ -118,11 +136,30 @@ class SpriteVisual(Visual):
         if zoomable:
             # The size of the points increases with zoom.
             self.add_vertex_main("""
-            gl_PointSize = point_size * max(scale.x, scale.y);
+            float sprite_size = point_size * max(scale.x, scale.y);
+            """)
+        else:
+            self.add_vertex_main("""
+            float sprite_size = point_size;
+            """)
+        
+        if instanced:
+            # square in [-1, 1]^2 shared by all sprites
+            self.add_attribute("vertex", vartype="float", ndim=2,
+                data=np.array([[-1., -1.], [1., -1.], [-1., 1.], [1., 1.]],
+                    dtype=np.float32))
+            self.add_varying("varying_tex_coords", vartype="float", ndim=2)
+            # same orientation as gl_PointCoord
+            self.add_vertex_main("""
+            varying_tex_coords = vec2(1. + vertex.x, 1. - vertex.y) / 2.;
             """)
+            # offset in pixels from the sprite center
+            self.add_vertex_main("""
+            gl_Position.xy += vertex * sprite_size / window_size;
+            """, after='viewport')
         else:
             self.add_vertex_main("""
-            gl_PointSize = point_size;
+            gl_PointSize = sprite_size;
             """)
             
         
\ No newline at end of file
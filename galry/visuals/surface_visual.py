@@ -28,31 +28,113 @@ def colormap(x):
     return hsv_to_rgb(col0 + (col1 - col0) * x)
 
     
-__all__ = ['SurfaceVisual']
+__all__ = ['get_grid_index', 'SurfaceVisual']
+
+def get_grid_index(n, m, strip=False):
+    """Return the index array of the tesselation of a grid.
+    
+    Arguments:
+      * n, m: the number of rows and columns of the grid. The vertex (i, j)
+        has the index `i * m + j`.
+      * strip=False: whether to return the index of a single triangle strip,
+        with degenerate triangles between the rows of the grid, instead of
+        independent triangles.
+    
+    Returns:
+      * index: a 1D uint32 array with `6 * (n - 1) * (m - 1)` indices, or
+        `(n - 1) * (2 * m + 2) - 2` indices in strip mode.
+    
+    """
+    if n < 2 or m < 2:
+        return np.zeros(0, dtype=np.uint32)
+    if strip:
+        rows = (np.arange(n - 1, dtype=np.uint32) * m).reshape((-1, 1))
+        j = np.arange(m, dtype=np.uint32).reshape((1, -1))
+        index = np.empty((n - 1, 2 * m + 2), dtype=np.uint32)
+        index[:,1:-1:2] = rows + j
+        index[:,2:-1:2] = rows + m + j
+        # repeat the first and last vertices of every row
+        index[:,0] = index[:,1]
+        index[:,-1] = index[:,-2]
+        return index.ravel()[1:-1]
+    # first vertex of every quad
+    a = (np.arange(n - 1, dtype=np.uint32).reshape((-1, 1)) * m +
+         np.arange(m - 1, dtype=np.uint32).reshape((1, -1))).ravel()
+    index = np.empty((a.size, 6), dtype=np.uint32)
+    index[:,0] = a
+    index[:,1] = a + m
+    index[:,2] = a + 1
+    index[:,3] = a + m
+    index[:,4] = a + 1
+    index[:,5] = a + m + 1
+    return index.ravel()
+    
+
+# Vertex shader of the GPU mode: the height, the normal and the color of
+# every vertex are computed from the height texture.
+GPU_VERTEX_SHADER = """
+    // texture coordinates of the vertex, at the texel center
+    vec2 texel = 1.0 / grid_size;
+    vec2 tex = (position.xz + 1.0) * .5 * (1.0 - texel) + .5 * texel;
+    float z = texture2D(height, tex).r;
+    gl_Position = vec4(position.x, z, position.z, 1.0);
+    
+    // normal from the central differences of the heights
+    float dzx = texture2D(height, tex + vec2(texel.x, 0.0)).r -
+                texture2D(height, tex - vec2(texel.x, 0.0)).r;
+    float dzy = texture2D(height, tex + vec2(0.0, texel.y)).r -
+                texture2D(height, tex - vec2(0.0, texel.y)).r;
+    vec2 step = 4.0 / (grid_size - 1.0);
+    vec3 w = cross(vec3(step.x, 0.0, dzx), vec3(0.0, step.y, dzy));
+    vec3 normal = w.xzy;
+    
+    // color from the normalized height
+    float c = (z - zrange.x) / max(zrange.y - zrange.x, 1e-9);
+    vec4 color = vec4(texture1D(colormap, clamp(c, 0.0, 1.0)).rgb, 1.0);
+    
+    // compute the amount of light
+    float light = dot(light_direction, normalize(mat3(camera) * mat3(transform) * normal));
+    light = clamp(light, 0, 1);
+    // add the ambient term
+    light = clamp(ambient_light + light, 0, 1);
+    // compute the final color
+    varying_color = color * light;
+    // keep the transparency
+    varying_color.w = color.w;
+"""
 
 class SurfaceVisual(MeshVisual):
-    def initialize(self, Z, *args, **kwargs):
-        
-        assert Z.ndim == 2, "Z must have exactly two dimensions"
+    def height_compound(self, Z):
+        """Return the height texture and the height range, for Z values on
+        the grid of the visual (GPU mode)."""
+        assert Z.shape == self.grid_shape, ("Z must have the same shape as "
+            "the initial grid")
+        n, m = Z.shape
+        return dict(height=np.asarray(Z, dtype=np.float32).reshape((n, m, 1)),
+            zrange=(float(Z.min()), float(Z.max())))
         
+    def z_compound(self, Z):
+        """Return the position, normal and color of the vertices, for Z
+        values on the grid of the visual."""
+        assert Z.shape == self.grid_shape, ("Z must have the same shape as "
+            "the initial grid")
+        X, Y = self.grid
         n, m = Z.shape
-
-        # generate grid
-        x = np.linspace(-1., 1., m)
-        y = np.linspace(-1., 1., n)
-        X, Y = np.meshgrid(x, y)
-
+        
         # generate vertices positions
-        position = np.hstack((X.reshape((-1, 1)), Z.reshape((-1, 1)), Y.reshape((-1, 1)),))
+        position = np.empty((n * m, 3), dtype=np.float32)
+        position[:,0] = X.ravel()
+        position[:,1] = Z.ravel()
+        position[:,2] = Y.ravel()
 
         #color
-        m, M = Z.min(), Z.max()
-        if m != M:
-            Znormalized = (Z - m) / (M - m)
+        zmin, zmax = Z.min(), Z.max()
+        if zmin != zmax:
+            Znormalized = (Z - zmin) / (zmax - zmin)
         else:
             Znormalized = Z
-        color = colormap(Znormalized).reshape((-1, 3))
-        color = np.hstack((color, np.ones((n*n,1))))
+        color = np.ones((n * m, 4), dtype=np.float32)
+        color[:,:3] = colormap(Znormalized).reshape((-1, 3))
 
         # normal
         U = np.dstack((X[:,1:] - X[:,:-1],
@@ -61,33 +143,83 @@ class SurfaceVisual(MeshVisual):
         V = np.dstack((X[1:,:] - X[:-1,:],
                        Y[1:,:] - Y[:-1,:],
                        Z[1:,:] - Z[:-1,:]))
-        U = np.hstack((U, U[:,-1,:].reshape((-1,1,3))))
-        V = np.vstack((V, V[-1,:,:].reshape((1,-1,3))))
-        W = np.cross(U, V)
-        normal0 = W.reshape((-1, 3))
-        normal = np.zeros_like(normal0)
-        normal[:,0] = normal0[:,0]
-        normal[:,1] = normal0[:,2]
-        normal[:,2] = normal0[:,1]
-
+        U = np.hstack((U, U[:,-1:,:]))
+        V = np.vstack((V, V[-1:,:,:]))
+        W = np.cross(U, V).reshape((-1, 3))
+        normal = np.empty((n * m, 3), dtype=np.float32)
+        normal[:,0] = W[:,0]
+        normal[:,1] = W[:,2]
+        normal[:,2] = W[:,1]
+        
+        return dict(position=position, normal=normal, color=color)
+        
+    def initialize(self, Z, *args, **kwargs):
+        """Initialize the surface.
+        
+        Arguments:
+          * Z: a n x m array with the heights of the surface on a regular
+            grid in [-1, 1]^2.
+          * strip=False: whether to render the grid as a single triangle
+            strip, which uses a smaller index buffer.
+          * gpu=False: whether to upload only the heights, in a float
+            texture, and to compute the positions, normals and colors in
+            the vertex shader. The GPU must support texture fetches in
+            vertex shaders.
+        
+        The heights can then be changed with `set_data(Z=Z)`: only the
+        positions, normals and colors are updated (or only the height
+        texture in GPU mode), the index buffer is kept.
+        
+        """
+        assert Z.ndim == 2, "Z must have exactly two dimensions"
+        strip = kwargs.pop('strip', False)
+        gpu = kwargs.pop('gpu', False)
+        
+        n, m = Z.shape
+        
+        # the index does not change when the grid has the same shape
+        reuse_index = (self.reinitialization and
+            getattr(self, 'grid_shape', None) == Z.shape)
+        
+        # generate grid
+        self.grid_shape = Z.shape
+        x = np.linspace(-1., 1., m)
+        y = np.linspace(-1., 1., n)
+        self.grid = np.meshgrid(x, y)
+        
+        if gpu:
+            # static grid, the heights are in the texture
+            X, Y = self.grid
+            position = np.zeros((n * m, 3), dtype=np.float32)
+            position[:,0] = X.ravel()
+            position[:,2] = Y.ravel()
+            kwargs.update(position=position, vertex_shader=GPU_VERTEX_SHADER)
+            compound = self.height_compound
+        else:
+            kwargs.update(**self.z_compound(Z))
+            compound = self.z_compound
+        
         # tesselation of the grid
-        index = []
-        for i in xrange(n-1):
-            for j in xrange(n-1):
-                index.extend([i*n+j, (i+1)*n+j, i*n+j+1,
-                              (i+1)*n+j, i*n+j+1, (i+1)*n+j+1])
-        index = np.array(index)
-
-        kwargs.update(
-            position=position,
-            normal=normal,
-            color=color, 
-            index=index,
-        )        
+        if not reuse_index:
+            kwargs.update(index=get_grid_index(n, m, strip=strip))
+        if strip:
+            self.primitive_type = 'TRIANGLE_STRIP'
+        
         super(SurfaceVisual, self).initialize(*args, **kwargs)
-    
         
-    
-    
-    
-    
\ No newline at end of file
+        if gpu:
+            heights = self.height_compound(Z)
+            self.add_uniform("grid_size", vartype="float", ndim=2,
+                data=(float(m), float(n)))
+            self.add_uniform("zrange", vartype="float", ndim=2,
+                data=heights['zrange'])
+            self.add_texture("height", ncomponents=1, ndim=2, vertex=True,
+                floating=True, data=heights['height'])
+            # the colormap is applied in the vertex shader
+            self.add_texture("colormap", ncomponents=3, ndim=1, vertex=True,
+                data=colormap(np.linspace(0., 1., 256).reshape((1, -1))),
+                magfilter='LINEAR', minfilter='LINEAR')
+        
+        # Z-only updates, the data has already been computed above
+        if not self.reinitialization:
+            self.add_foo('compound', 'Z', fun=compound, data=Z)
@@ -1,7 +1,7 @@
 import numpy as np
 import os
 from galry import log_debug, log_info, log_warn, get_color
-from fontmaps import load_font
+from fontmaps import get_font_atlas
 from visual import Visual
 
 __all__ = ['TextVisual']
@@ -46,6 +46,43 @@ else
 """ % background_transparent_shader
     return fs
 
+# Signed distance field fonts: every character is a quad
+VS_SDF = """
+gl_Position.x += (offset - text_width / 2) * spacing.x / window_size.x;
+gl_Position.y -= index * spacing.y / window_size.y;
+
+gl_Position.xy = gl_Position.xy + posoffset / window_size;
+
+// the quad is where the point sprite of the character would be, with the
+// margins of the distance field around it
+vec2 quad = text_map.zw * glyph_scale;
+vec2 shift = vec2(corner.x * quad.x - .5 * line_height - glyph_padding,
+                  .5 * line_height + glyph_padding - corner.y * quad.y);
+gl_Position.xy += 2. * shift / window_size;
+
+varying_tex_coords = text_map.xy + corner * text_map.zw;
+"""
+
+def FS_SDF(background_transparent=True):
+    if background_transparent:
+        background_transparent_shader = "letter_alpha"
+    else:
+        background_transparent_shader = "1."
+    fs = """
+// the edge of the character is at .5 in the distance field, and it is
+// smoothed over about one pixel on the screen
+float distance = texture2D(tex_sampler, varying_tex_coords).a;
+float width = fwidth(distance);
+float letter_alpha = smoothstep(.5 - width, .5 + width, distance);
+out_color = color * letter_alpha;
+out_color.a = %s;
+""" % background_transparent_shader
+    return fs
+
+# corners of the quad of a character, as two triangles
+QUAD = np.array([[0., 0.], [1., 0.], [0., 1.],
+                 [1., 0.], [0., 1.], [1., 1.]], dtype=np.float32)
+
 
 class TextVisual(Visual):
     """Template for displaying short text on a single line.
@@ -61,7 +98,16 @@ class TextVisual(Visual):
     size of every character. The software used to generate font maps is
     AngelCode Bitmap Font Generator.
     
-    For now, there is only the Segoe font.
+    For now, there is only the Segoe font in bitmap format. Other fonts
+    (a system font name or the path to a TrueType file) are rasterized at
+    runtime with matplotlib. Font atlases are loaded once per process
+    (see `get_font_atlas`), and visuals with the same font share a single
+    texture in a given OpenGL context.
+    
+    With `sdf=True`, the font atlas contains signed distance fields, and
+    every character is a quad rather than a point sprite. Text is then sharp
+    at any size, it is not limited by the maximum point size of the driver,
+    and a single atlas serves all font sizes.
     
     """
                 
@@ -76,6 +122,8 @@ class TextVisual(Visual):
             
         coordinates = np.array(coordinates)
         position = np.repeat(coordinates, self.textsizes, axis=0)
+        if self.sdf:
+            position = np.repeat(position, 6, axis=0)
         return dict(position=position)
     
     def text_compound(self, text):
@@ -93,10 +141,10 @@ class TextVisual(Visual):
             if type(coordinates) != list:
                 coordinates = [coordinates] * len(self.textsizes)
             index = np.repeat(np.arange(len(self.textsizes)), self.textsizes)
-            text_map = self.get_map(text)
+            text_map, advance = self.get_glyphs(text)
             
             # offset for all characters in the merging of all texts
-            offset = np.hstack((0., np.cumsum(text_map[:, 2])[:-1]))
+            offset = np.hstack((0., np.cumsum(advance)[:-1]))
             
             # for each text, the cumsum of the length of all texts strictly
             # before
@@ -109,8 +157,8 @@ class TextVisual(Visual):
                 
         else:
             self.textsizes = len(text)
-            text_map = self.get_map(text)
-            offset = np.hstack((0., np.cumsum(text_map[:, 2])[:-1]))    
+            text_map, advance = self.get_glyphs(text)
+            offset = np.hstack((0., np.cumsum(advance)[:-1]))    
             text_width = offset[-1]
             index = np.zeros(len(text))
             
@@ -118,18 +166,33 @@ class TextVisual(Visual):
         
         d = dict(text_map=text_map, offset=offset, text_width=text_width,
             index=index)
+        # six vertices per character with quads
+        if self.sdf:
+            self.size *= 6
+            for name in ('text_map', 'offset', 'index'):
+                d[name] = np.repeat(d[name], 6, axis=0)
+            d['corner'] = np.tile(QUAD, (len(text), 1))
         d.update(self.position_compound(coordinates))
         
+        # upload the atlas again when new glyphs have been rasterized
+        if self.atlas.version != self.atlas_version:
+            self.atlas_version = self.atlas.version
+            d['tex_sampler'] = self.texture
+        
         return d
     
-    def initialize_font(self, font, fontsize):
+    def initialize_font(self, font, fontsize, sdf=False):
         """Initialize the specified font at a given size."""
-        self.texture, self.matrix, self.get_map = load_font(font, fontsize)
+        self.atlas = get_font_atlas(font, fontsize, sdf=sdf)
+        self.texture = self.atlas.texture
+        self.get_map = self.atlas.get_map
+        self.get_glyphs = self.atlas.get_glyphs
+        self.atlas_version = self.atlas.version
 
     def initialize(self, text, coordinates=(0., 0.), font='segoe', fontsize=24,
             color=None, letter_spacing=None, interline=0., autocolor=None,
             background_transparent=True,
-            prevent_constrain=False, depth=None, posoffset=None):
+            prevent_constrain=False, depth=None, posoffset=None, sdf=False):
         """Initialize the text template."""
         
         if prevent_constrain:
@@ -141,15 +204,22 @@ class TextVisual(Visual):
         if color is None:
             color = self.default_color
         
+        self.sdf = sdf
         self.size = len(text)
         self.primitive_type = 'POINTS'
         self.interline = interline
         
         text_length = self.size
-        self.initialize_font(font, fontsize)
+        self.initialize_font(font, fontsize, sdf=sdf)
         self.coordinates = coordinates
         
-        point_size = float(self.matrix[:,4].max() * self.texture.shape[1])
+        point_size = float(self.atlas.point_size)
+        if sdf:
+            self.size *= 6
+            self.primitive_type = 'TRIANGLES'
+            # the atlas glyphs are scaled to the font size
+            scale = fontsize / float(self.atlas.font_size)
+            point_size *= scale
 
         # template attributes and varyings
         self.add_attribute("position", vartype="float", ndim=2, data=np.zeros((self.size, 2)))
@@ -157,26 +227,34 @@ class TextVisual(Visual):
         self.add_attribute("offset", vartype="float", ndim=1)
         self.add_attribute("index", vartype="float", ndim=1)
         self.add_attribute("text_map", vartype="float", ndim=4)
-        self.add_varying("flat_text_map", vartype="float", flat=True, ndim=4)
+        if sdf:
+            self.add_attribute("corner", vartype="float", ndim=2)
+            self.add_varying("varying_tex_coords", vartype="float", ndim=2)
+            self.add_uniform("glyph_scale", vartype="float", ndim=1,
+                data=self.atlas.size * scale)
+            self.add_uniform("glyph_padding", vartype="float", ndim=1,
+                data=self.atlas.padding * scale)
+            self.add_uniform("line_height", vartype="float", ndim=1,
+                data=point_size)
+        else:
+            self.add_varying("flat_text_map", vartype="float", flat=True,
+                ndim=4)
        
         if posoffset is None:
             posoffset = (0., 0.)
         self.add_uniform('posoffset', vartype='float', ndim=2, data=posoffset)
        
-        # texture
-        self.add_texture("tex_sampler", size=self.texture.shape[:2], ndim=2,
-                            ncomponents=self.texture.shape[2],
-                            data=self.texture)
-        
-        # pure heuristic (probably bogus)
         if letter_spacing is None:
-            letter_spacing = (100 + 17. * fontsize)
+            letter_spacing = self.atlas.get_letter_spacing(fontsize)
         self.add_uniform("spacing", vartype="float", ndim=2,
                             data=(letter_spacing, interline))
-        self.add_uniform("point_size", vartype="float", ndim=1,
-                            data=point_size)
+        if not sdf:
+            self.add_uniform("point_size", vartype="float", ndim=1,
+                                data=point_size)
         # one color per
         if isinstance(color, np.ndarray) and color.ndim > 1:
+            if sdf:
+                color = np.repeat(color, 6, axis=0)
             self.add_attribute('color0', vartype="float", ndim=4, data=color)
             self.add_varying('color', vartype="float", ndim=4)
             self.add_vertex_main('color = color0;')
@@ -187,7 +265,23 @@ class TextVisual(Visual):
         # compound variables
         self.add_compound("text", fun=self.text_compound, data=text)
         self.add_compound("coordinates", fun=self.position_compound, data=coordinates)
+        
+        # texture, shared with the other visuals using the same font atlas,
+        # added once the glyphs of the text have been rasterized; distance
+        # fields are interpolated
+        filter = 'LINEAR' if sdf else None
+        self.add_texture("tex_sampler", size=self.texture.shape[:2], ndim=2,
+                            ncomponents=self.texture.shape[2],
+                            data=self.texture, shared=self.atlas.name,
+                            version=self.atlas.version,
+                            minfilter=filter, magfilter=filter)
 
+        if sdf:
+            self.add_vertex_main(VS_SDF, after='viewport')
+            self.add_fragment_main(FS_SDF(background_transparent))
+            self.depth = depth
+            return
+            
         # vertex shader
         self.add_vertex_main(VS, after='viewport')
 
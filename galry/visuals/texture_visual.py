@@ -2,6 +2,7 @@ import numpy as np
 from visual import Visual, RefVar
     
 from galry.tools import hsv_to_rgb
+from galry.colors import get_colormap
 
 def colormap(x):
     """Colorize a 2D grayscale array.
@@ -28,8 +29,19 @@ def colormap(x):
 
     
     
+# Number of colors in the colormap lookup table of scalar textures.
+COLORMAP_SIZE = 256
+    
 class TextureVisual(Visual):
-    """Visual that displays a colored texture."""
+    """Visual that displays a colored texture.
+    
+    A 2D array (without color components) is displayed with a colormap:
+    the raw values are uploaded in a float texture, and the colors are
+    obtained in the fragment shader from a lookup table. The contrast is
+    changed with `set_data(vmin=..., vmax=...)` and the colormap with
+    `set_data(colormap=...)`, without uploading the texture again.
+    
+    """
     
     def points_compound(self, points=None):
         """Compound function for the coordinates of the texture."""
@@ -49,7 +61,15 @@ class TextureVisual(Visual):
         
     def texture_compound(self, texture):
         """Compound variable for the texture data."""
+        # scalar data, with one component in a float texture
+        if texture.ndim == 2:
+            texture = np.asarray(texture, dtype=np.float32).reshape(
+                texture.shape + (1,))
         return dict(tex_sampler=texture)
+        
+    def colormap_compound(self, colormap):
+        """Compound variable for the colormap of scalar textures."""
+        return dict(cmap=get_colormap(colormap, COLORMAP_SIZE))
     
     def initialize_fragment(self):
         """Set the fragment shader code."""
@@ -58,28 +78,46 @@ class TextureVisual(Visual):
         # else:
             # shader_pointcoord = ""
         shader_pointcoord = ""
-        fragment = """
+        if self.scalar:
+            # lookup of the normalized value in the colormap, at the texel
+            # centers
+            fragment = """
+        float value = texture%dD(tex_sampler, varying_tex_coords%s).r;
+        value = clamp((value - vmin) / max(vmax - vmin, 1e-9), 0., 1.);
+        out_color = texture1D(cmap, %.8f + value * %.8f);
+        """ % (self.ndim, shader_pointcoord,
+               .5 / COLORMAP_SIZE, 1. - 1. / COLORMAP_SIZE)
+        else:
+            fragment = """
         out_color = texture%dD(tex_sampler, varying_tex_coords%s);
         """ % (self.ndim, shader_pointcoord)
         # print fragment
         self.add_fragment_main(fragment)
     
     def initialize(self, texture=None, points=None,
-            mipmap=None, minfilter=None, magfilter=None):
+            mipmap=None, minfilter=None, magfilter=None,
+            colormap=None, vmin=None, vmax=None):
         
+        self.scalar = False
         if isinstance(texture, RefVar):
             targettex = self.resolve_reference(texture)['data']
             shape, ncomponents = targettex.shape[:2], targettex.shape[2]
         elif texture is not None:
             
             if texture.ndim == 2:
-                m, M = texture.min(), texture.max()
-                if m < M:
-                    texture = (texture - m) / (M - m)
-                texture = colormap(texture)
-                
-            shape = texture.shape[:2]
-            ncomponents = texture.shape[2]
+                self.scalar = True
+                # the contrast is given by the data range by default
+                if vmin is None:
+                    vmin = float(texture.min())
+                if vmax is None:
+                    vmax = float(texture.max())
+                if colormap is None:
+                    colormap = 'rainbow'
+                shape = texture.shape
+                ncomponents = 1
+            else:
+                shape = texture.shape[:2]
+                ncomponents = texture.shape[2]
         else:
             shape = (2, 2)
             ncomponents = 3
@@ -131,11 +169,21 @@ class TextureVisual(Visual):
                 mipmap=mipmap,
                 minfilter=minfilter,
                 magfilter=magfilter,
+                floating=self.scalar,
                 )
             # HACK: to avoid conflict in GLSL shader with the "texture" function
             # we redirect the "texture" variable here to "tex_sampler" which
             # is the real name of the variable in the shader
             self.add_compound("texture", fun=self.texture_compound, data=texture)
+            
+        # colormap of scalar data
+        if self.scalar:
+            self.add_uniform("vmin", vartype="float", ndim=1, data=vmin)
+            self.add_uniform("vmax", vartype="float", ndim=1, data=vmax)
+            self.add_texture("cmap", ndim=1, ncomponents=3,
+                magfilter='LINEAR', minfilter='LINEAR')
+            self.add_compound("colormap", fun=self.colormap_compound,
+                data=colormap)
 
         # pass the texture coordinates to the varying variable
         self.add_vertex_main("""
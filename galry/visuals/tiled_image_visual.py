@@ -0,0 +1,122 @@
+import numpy as np
+from visual import Visual
+from galry import ImagePyramid, TileCache
+
+__all__ = ['TiledImageVisual']
+
+class TiledImageVisual(Visual):
+    """Visual that displays a very large image with tiles.
+
+    The image is cut into a pyramid of tiles (see `ImagePyramid`), and only
+    the visible tiles, at a level adapted to the zoom, are loaded in a
+    texture atlas with a fixed number of slots. The tiles are loaded by
+    `TiledImageEventProcessor` after every navigation event. The coarsest
+    level is always displayed below, while the finer tiles are being loaded.
+
+    """
+    def get_quads(self, slots):
+        """Return the position and texture coordinates of the quads
+        displaying tiles.
+
+        Arguments:
+          * slots: a list of `(key, slot)` pairs, the tiles being displayed
+            in this order.
+
+        Returns:
+          * dict(position=position, tex_coords=tex_coords): the vertex
+            attributes, with 6 vertices (2 triangles) per slot. Unused
+            quads are degenerate.
+
+        """
+        position = np.zeros((6 * self.nslots, 2), dtype=np.float32)
+        tex_coords = np.zeros((6 * self.nslots, 2), dtype=np.float32)
+        if not slots:
+            return dict(position=position, tex_coords=tex_coords)
+        x0, y0, x1, y1 = self.points
+        pyramid = self.pyramid
+        keys, slots = zip(*slots)
+        # tile boxes in image pixels, then in data coordinates
+        boxes = np.array([pyramid.get_tile_box(key) for key in keys],
+            dtype=np.float64)
+        tx0 = x0 + boxes[:,0] / pyramid.width * (x1 - x0)
+        tx1 = x0 + boxes[:,2] / pyramid.width * (x1 - x0)
+        ty0 = y1 - boxes[:,3] / pyramid.height * (y1 - y0)
+        ty1 = y1 - boxes[:,1] / pyramid.height * (y1 - y0)
+        # slots in the atlas, with a half texel margin to avoid sampling
+        # the neighbor tiles with linear filtering
+        slots = np.array(slots)
+        n = float(self.atlas_tiles)
+        margin = .5 / self.atlas_size
+        u0 = (slots % self.atlas_tiles) / n + margin
+        u1 = (slots % self.atlas_tiles + 1) / n - margin
+        v0 = (slots // self.atlas_tiles) / n + margin
+        v1 = (slots // self.atlas_tiles + 1) / n - margin
+        # two triangles per tile
+        k = len(keys)
+        for i, (x, y, u, v) in enumerate([
+                (tx0, ty1, u0, v0), (tx1, ty1, u1, v0), (tx0, ty0, u0, v1),
+                (tx1, ty1, u1, v0), (tx0, ty0, u0, v1), (tx1, ty0, u1, v1)]):
+            position[i:6 * k:6,0] = x
+            position[i:6 * k:6,1] = y
+            tex_coords[i:6 * k:6,0] = u
+            tex_coords[i:6 * k:6,1] = v
+        return dict(position=position, tex_coords=tex_coords)
+
+    def initialize(self, image=None, points=None, tile_size=256,
+            atlas_size=4096, nthreads=None, magfilter=None, minfilter=None):
+        """Initialize the visual.
+
+        Arguments:
+          * image: a `(height, width)` or `(height, width, ncomponents)`
+            image (array, `np.memmap`, HDF5 dataset...), or an
+            `ImagePyramid`.
+          * points=None: the coordinates `(x0, y0, x1, y1)` of the image.
+            By default, the image fills the view with its aspect ratio.
+          * tile_size=256: the size of the tiles.
+          * atlas_size=4096: the size of the texture atlas containing the
+            tiles. It must not exceed `GL_MAX_TEXTURE_SIZE`.
+          * nthreads=None: the number of threads reading the tiles.
+
+        """
+        if not isinstance(image, ImagePyramid):
+            image = ImagePyramid(image, tile_size=tile_size)
+        self.pyramid = image
+        tile_size = image.tile_size
+        # the atlas contains atlas_tiles x atlas_tiles slots
+        self.atlas_tiles = max(1, atlas_size // tile_size)
+        self.atlas_size = self.atlas_tiles * tile_size
+        self.nslots = self.atlas_tiles ** 2
+        self.cache = TileCache(image, self.nslots, nthreads=nthreads)
+
+        if points is None:
+            ratio = image.width / float(image.height)
+            if ratio < 1:
+                points = (-ratio, -1., ratio, 1.)
+            else:
+                points = (-1., -1. / ratio, 1., 1. / ratio)
+        self.points = points
+
+        self.size = 6 * self.nslots
+        self.primitive_type = 'TRIANGLES'
+
+        quads = self.get_quads([])
+        self.add_attribute("position", vartype="float", ndim=2,
+            data=quads['position'])
+        self.add_attribute("tex_coords", vartype="float", ndim=2,
+            data=quads['tex_coords'])
+        self.add_varying("varying_tex_coords", vartype="float", ndim=2)
+
+        # the texture atlas, filled by the processor
+        atlas = np.zeros((self.atlas_size, self.atlas_size,
+            image.ncomponents), dtype=np.uint8)
+        self.add_texture("atlas", size=atlas.shape[:2], ndim=2,
+            ncomponents=image.ncomponents, data=atlas,
+            magfilter=magfilter or 'LINEAR', minfilter=minfilter or 'LINEAR')
+
+        self.add_vertex_main("""
+            varying_tex_coords = tex_coords;
+        """)
+        self.add_fragment_main("""
+            out_color = texture2D(atlas, varying_tex_coords);
+        """)
+
@@ -1,6 +1,7 @@
 import numpy as np
 import collections
 from textwrap import dedent
+from galry import get_color
 
 __all__ = ['OLDGLSL', 'RefVar', 'Visual', 'CompoundVisual']
 
@@ -377,6 +378,9 @@ class ShaderCreator(object):
         if shader == 'vertex':
             header += "".join([get_uniform_declaration(uniform) for uniform in self.uniforms])
             header += "".join([get_attribute_declaration(attribute) for attribute in self.attributes])
+            # textures used in the vertex shader
+            header += "".join([get_texture_declaration(texture) for texture in self.textures
+                if texture.get('vertex', None)])
         elif shader == 'fragment':
             header += "".join([get_uniform_declaration(uniform) for uniform in self.uniforms])
             header += "".join([get_texture_declaration(texture) for texture in self.textures])
@@ -540,9 +544,12 @@ class BaseVisual(object):
         
     def extract_common_parameters(self, **kwargs):
         self.size = kwargs.pop('size', 0)
+        self.instances = kwargs.pop('instances', None)
         self.default_color = kwargs.pop('default_color', (1., 1., 0., 1.))
         self.bounds = kwargs.pop('bounds', None)
         self.is_static = kwargs.pop('is_static', False)
+        self.pickable = kwargs.pop('pickable', True)
+        self.selection_color = kwargs.pop('selection_color', None)
         self.position_attribute_name = kwargs.pop('position_attribute_name', 'position')
         self.primitive_type = kwargs.pop('primitive_type', None)
         self.constrain_ratio = kwargs.pop('constrain_ratio', False)
@@ -649,7 +656,7 @@ class Visual(BaseVisual):
     def get_data_updating(self):
         """Return the dictionary with the updated variable data."""
         # add some special keywords, if they are specified in self.initialize
-        special_keywords = ['size', 'bounds', 'primitive_type']
+        special_keywords = ['size', 'bounds', 'primitive_type', 'instances']
         for keyword in special_keywords:
             val = getattr(self, keyword)
             if val is not None and keyword not in self.data_updating:
@@ -707,7 +714,10 @@ class Visual(BaseVisual):
         data = kwargs['data']
         kwargs = fun(data)
         for name, value in kwargs.iteritems():
-            self.variables[name]['data'] = value
+            # special keywords like size or bounds are only used when
+            # updating the data
+            if name in self.variables:
+                self.variables[name]['data'] = value
         
     
     # Option methods
@@ -763,6 +773,33 @@ class Visual(BaseVisual):
         """Default initialization for all child visuals."""
         self.initialize_navigation()
         self.initialize_viewport()
+        if self.selection_color is not None:
+            self.initialize_selection()
+        
+    def initialize_selection(self):
+        """Highlight the selected points with `selection_color`. The
+        `selection` attribute contains 1 for the selected points, and 0
+        for the others (see `SelectionEventProcessor`)."""
+        position = self.variables.get('position', None)
+        if position is None or position['shader_type'] != 'attribute':
+            return
+        divisor = position.get('divisor', 0)
+        if divisor:
+            size = self.instances
+        else:
+            size = self.size
+        self.add_attribute("selection", vartype="float", ndim=1,
+            data=np.zeros(size, dtype=np.float32), divisor=divisor)
+        self.add_uniform("selection_color", vartype="float", ndim=4,
+            data=get_color(self.selection_color))
+        self.add_varying("varying_selection", vartype="float", ndim=1)
+        self.add_vertex_main("""
+            varying_selection = selection;
+        """)
+        self.add_fragment_main("""
+            out_color.rgb = mix(out_color.rgb, selection_color.rgb,
+                varying_selection * selection_color.a);
+        """, position='last')
         
     def initialize_viewport(self):
         """Handle window resize in shaders."""
@@ -850,9 +887,11 @@ class Visual(BaseVisual):
         """Return the dict representation of the visual."""
         dic = {
             'size': self.size,
+            'instances': self.instances,
             'bounds': self.bounds,
             'visible': self.visible,
             'is_static': self.is_static,
+            'pickable': self.pickable,
             'options': self.options,
             'primitive_type': self.primitive_type,
             'constrain_ratio': self.constrain_ratio,